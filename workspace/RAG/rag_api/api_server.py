@@ -1,15 +1,19 @@
 """
 RAG WebAPI サーバー（FastAPI）
-検索機能とファイル一覧取得機能をRESTful APIとして提供
+検索・ファイル一覧取得・ファイル登録（ジョブ）・削除機能をRESTful APIとして提供
 
 このサーバーは Streamlit UI と独立して動作します。
 ChromaDB と Embedder はローカル Ollama から共有リソースを使用します。
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional
+import threading
+import time
 import yaml
 import os
 import sys
@@ -18,16 +22,44 @@ import sys
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(parent_dir, "rag_chroma_app"))
 
+from services.Ingest.job_store import JOB_STATUSES, create_job_store
+from services.Ingest.worker import create_worker_pool
 from services.RAG.rag_service import RAGService
-from services.Vector.generic_embedder import GenericEmbedder
-from services.Vector.azure_openai_embedder import AzureOpenAIEmbedder
-from services.Vector.sentence_transformer_service import SentenceTransformerEmbedder
+from services.RAG.chunker import create_chunker
+from services.RAG.collection_factory import create_collection_settings
+from services.RAG.lexical_index import create_lexical_index, hybrid_search_options
+from services.RAG.reranker import create_reranker
+from services.RAG.search_cache import create_search_cache
+from services.RAG.semantic_cache import create_semantic_cache
+from services.concurrency import configure_executors, resolve_max_workers, run_blocking, shutdown_executors
+from services.metrics import HTTP_SECONDS, METRICS, configure_metrics
+from services.Vector.base_embedder import BaseEmbedder
+from services.Vector.registry import create_embedder
+from utils import SUPPORTED_EXTENSIONS, extract_text_to_file, pdf_extraction_options
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    アプリケーションのライフサイクル管理。
+    ワーカー起動時に Embedder と RAGService を一度だけ構築し、全リクエストで再利用する。
+    """
+    app.state.resources = RAGResources()
+    app.state.resources.load()
+    app.state.resources.start_ingest_workers()
+    yield
+    app.state.resources.stop_ingest_workers()
+    app.state.resources = None
+    shutdown_executors()
+    METRICS.clear_sinks()
+
 
 # FastAPI アプリケーションの初期化
 app = FastAPI(
     title="RAG WebAPI",
     description="ChromaDB RAG アプリケーションの検索・ファイル一覧取得API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -35,11 +67,29 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    リクエストの処理時間（レスポンスのシリアライズを含む）をルートのパステンプレートごとに記録する。
+    /api/search の処理時間と rag_search_seconds の差がリクエストの検証・レスポンスのシリアライズの時間となる。
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    return response
+
+
 # ===================== リクエスト/レスポンスモデル =====================
 
 class SearchRequest(BaseModel):
@@ -47,6 +97,11 @@ class SearchRequest(BaseModel):
     query: str = Field(..., min_length=1, description="検索クエリ（必須、1文字以上）")
     threshold: float = Field(default=0.2, ge=0.0, le=1.0, description="類似度閾値（0.0～1.0、デフォルト: 0.2）")
     n_results: int = Field(default=5, ge=1, le=100, description="返却する最大件数（1～100、デフォルト: 5）")
+    group_by_file: bool = Field(default=False, description="ファイル単位の集約結果（files）も返すか（デフォルト: false）")
+    allow_semantic_cache: bool = Field(default=True, description="埋め込みの近い過去のクエリの結果を再利用してよいか（デフォルト: true）")
+    mode: str = Field(default="vector", pattern="^(vector|lexical|hybrid)$",
+                      description="検索方式（vector: ベクトル検索, lexical: BM25 キーワード検索, hybrid: 両者を RRF で統合。デフォルト: vector）")
+    rerank: bool = Field(default=True, description="CrossEncoder による再ランキングを行うか（config の reranker 有効時のみ。デフォルト: true）")
 
 
 class FileInfo(BaseModel):
@@ -55,12 +110,17 @@ class FileInfo(BaseModel):
     directory: str
     created_at: str
     doc_id: Optional[str]
+    chunk_count: int = 1
 
 
 class FilesResponse(BaseModel):
     """ファイル一覧レスポンス"""
     files: List[FileInfo]
     total_count: int
+    offset: int = 0
+    limit: Optional[int] = None
+    next_offset: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class SearchResult(BaseModel):
@@ -70,6 +130,34 @@ class SearchResult(BaseModel):
     score: float
     document: str
     created_at: Optional[str]
+    chunk_index: int = 0
+    start_char: Optional[int] = None
+    end_char: Optional[int] = None
+    vector_score: Optional[float] = None
+    lexical_score: Optional[float] = None
+    rerank_score: Optional[float] = None
+
+
+class FileHit(BaseModel):
+    """検索結果（ファイル単位の集約）"""
+    filename: str
+    score: float
+    hit_count: int
+    chunk_indices: List[int]
+
+
+class CacheInfo(BaseModel):
+    """検索結果キャッシュの利用状況"""
+    status: str = Field(default="miss", description="exact: 完全一致キャッシュ, semantic: セマンティックキャッシュ, miss: ChromaDB 検索")
+    similarity: Optional[float] = Field(default=None, description="セマンティックキャッシュ使用時のクエリ埋め込みのコサイン類似度")
+
+
+class RerankInfo(BaseModel):
+    """再ランキングの実行状況"""
+    candidates: int = Field(description="再ランキング対象の候補数")
+    reranked: int = Field(description="CrossEncoder でスコアリングした候補数")
+    truncated: bool = Field(description="latency budget 超過でスコアリングを打ち切ったか")
+    elapsed_ms: float = Field(description="再ランキングの処理時間（ミリ秒）")
 
 
 class SearchResponse(BaseModel):
@@ -78,6 +166,34 @@ class SearchResponse(BaseModel):
     threshold: float
     hit_count: int
     results: List[SearchResult]
+    files: Optional[List[FileHit]] = None
+    cache: Optional[CacheInfo] = None
+    rerank: Optional[RerankInfo] = None
+
+
+class BatchSearchQuery(BaseModel):
+    """一括検索リクエスト（個別クエリ）"""
+    query: str = Field(..., min_length=1, description="検索クエリ（必須、1文字以上）")
+    threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="類似度閾値（省略時はリクエスト全体の値）")
+    n_results: Optional[int] = Field(default=None, ge=1, le=100, description="返却する最大件数（省略時はリクエスト全体の値）")
+
+
+class BatchSearchRequest(BaseModel):
+    """一括検索リクエスト"""
+    queries: List[BatchSearchQuery] = Field(..., min_length=1, max_length=1000, description="検索クエリリスト（1～1000件）")
+    threshold: float = Field(default=0.2, ge=0.0, le=1.0, description="類似度閾値の既定値（デフォルト: 0.2）")
+    n_results: int = Field(default=5, ge=1, le=100, description="返却する最大件数の既定値（デフォルト: 5）")
+    group_by_file: bool = Field(default=False, description="ファイル単位の集約結果（files）も返すか（デフォルト: false）")
+    allow_semantic_cache: bool = Field(default=True, description="埋め込みの近い過去のクエリの結果を再利用してよいか（デフォルト: true）")
+    mode: str = Field(default="vector", pattern="^(vector|lexical|hybrid)$", description="検索方式（デフォルト: vector）")
+    rerank: bool = Field(default=True, description="CrossEncoder による再ランキングを行うか（デフォルト: true）")
+
+
+class BatchSearchResponse(BaseModel):
+    """一括検索レスポンス"""
+    query_count: int
+    total_hit_count: int
+    items: List[SearchResponse]
 
 
 class SuccessResponseFiles(BaseModel):
@@ -92,6 +208,98 @@ class SuccessResponseSearch(BaseModel):
     data: SearchResponse
 
 
+class SuccessResponseBatchSearch(BaseModel):
+    """成功レスポンス（一括検索）"""
+    success: bool = True
+    data: BatchSearchResponse
+
+
+class ReloadResponse(BaseModel):
+    """設定再読み込みレスポンス"""
+    success: bool = True
+    reloaded: bool
+    config_path: str
+    embedder_type: str
+
+
+class CacheStatsResponse(BaseModel):
+    """キャッシュ統計レスポンス"""
+    success: bool = True
+    collection_version: int
+    search_cache: Optional[Dict] = None
+    semantic_cache: Optional[Dict] = None
+    embedding_cache: Optional[Dict] = None
+
+
+class IngestDocument(BaseModel):
+    """登録ジョブのファイル"""
+    filename: str = Field(..., min_length=1, description="ファイル名（同名ファイルは上書き登録）")
+    text: str = Field(..., description="登録するテキスト")
+
+
+class IngestJobRequest(BaseModel):
+    """登録ジョブ作成リクエスト"""
+    documents: List[IngestDocument] = Field(..., min_length=1, max_length=10000, description="登録するファイルリスト（1～10000件）")
+
+
+class IngestFileStatus(BaseModel):
+    """登録ジョブのファイルごとの状態"""
+    seq: int
+    filename: str
+    status: str = Field(description="queued, succeeded, failed, canceled のいずれか")
+    chunks: int = 0
+    embedded: int = 0
+    error: Optional[str] = None
+
+
+class IngestJob(BaseModel):
+    """登録ジョブの状態"""
+    job_id: str
+    status: str = Field(description="queued, running, succeeded, failed, canceled のいずれか")
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    total_files: int
+    processed_files: int = Field(description="処理済み（成功・失敗）のファイル数")
+    failed_files: int
+    chunks: int = Field(description="処理済みファイルのチャンク数")
+    chunks_to_embed: int = Field(description="ベクトル化対象のチャンク数（処理中のファイルを含む）")
+    chunks_embedded: int = Field(description="ベクトル化済みのチャンク数")
+    current_file: Optional[str] = None
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    summary: Optional[Dict] = None
+    files: Optional[List[IngestFileStatus]] = None
+
+
+class PdfPageError(BaseModel):
+    """テキスト抽出に失敗した PDF のページ"""
+    filename: str = Field(..., description="ファイル名")
+    page: int = Field(..., description="ページ番号（1始まり）")
+    error: str = Field(..., description="エラー内容")
+
+
+class SuccessResponseJob(BaseModel):
+    """成功レスポンス（登録ジョブ）"""
+    success: bool = True
+    data: IngestJob
+    page_errors: List[PdfPageError] = Field(default_factory=list,
+                                            description="テキスト抽出に失敗した PDF のページ（POST /api/documents のみ）")
+
+
+class SuccessResponseJobs(BaseModel):
+    """成功レスポンス（登録ジョブ一覧）"""
+    success: bool = True
+    data: List[IngestJob]
+
+
+class DeleteDocumentResponse(BaseModel):
+    """ファイル削除レスポンス"""
+    success: bool = True
+    filename: str
+    deleted_chunks: int
+
+
 class ErrorResponse(BaseModel):
     """エラーレスポンス"""
     success: bool = False
@@ -101,48 +309,185 @@ class ErrorResponse(BaseModel):
 
 # ===================== 設定ロード =====================
 
-def load_config():
-    """config.yaml から設定を読み込む"""
+def resolve_config_path():
+    """使用する config.yaml のパスを決定する"""
     # 環境変数 CONFIG_PATH があれば優先して使用（docker-compose で指定）
     env_path = os.environ.get("CONFIG_PATH")
     if env_path:
         if not os.path.exists(env_path):
             raise FileNotFoundError(f"config.yaml not found (CONFIG_PATH): {env_path}")
-        with open(env_path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
+        return env_path
 
     # 環境変数が無ければ、親ディレクトリから相対パスを参照
     config_path = os.path.join(parent_dir, "rag_chroma_app", "config.yaml")
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"config.yaml not found: {config_path}")
+    return config_path
+
 
-    with open(config_path, "r", encoding="utf-8") as f:
+def load_config():
+    """config.yaml から設定を読み込む"""
+    with open(resolve_config_path(), "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
-def create_embedder(config):
-    """config に基づいて適切な Embedder を作成"""
-    embedder_type = config.get('embedder', {}).get('type', 'generic')
-    
-    if embedder_type == 'generic':
-        return GenericEmbedder(
-            api_key=config['generic']['api_key'],
-            embedding_url=config['generic']['embedding_url'],
-            model=config['generic']['model']
-        )
-    elif embedder_type == 'azure-openai':
-        return AzureOpenAIEmbedder(
-            api_key=config['azure_openai']['api_key'],
-            endpoint=config['azure_openai']['endpoint'],
-            deployment_name=config['azure_openai']['deployment_name'],
-            api_version=config['azure_openai'].get('api_version', '2024-02-01')
+# ===================== 共有リソース =====================
+
+class LoadedResources(NamedTuple):
+    """config.yaml から構築したリソース一式（再読み込み時はまとめて差し替える）。"""
+    config: dict
+    config_path: str
+    config_mtime: float
+    embedder: BaseEmbedder
+    rag_service: RAGService
+    pdf_options: dict
+
+
+class RAGResources:
+    """
+    ワーカープロセス単位で共有するリソースのコンテナ。
+    config.yaml の解析、Embedder（モデルロードを含む）、ChromaDB クライアントの生成を
+    起動時に一度だけ行い、以降のリクエストでは同じインスタンスを再利用する。
+    config.yaml が更新された場合は reload() で明示的に作り直す。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded: Optional[LoadedResources] = None
+        self.job_store = None
+        self.ingest_pool = None
+
+    @property
+    def config(self) -> Optional[dict]:
+        """読み込み済みの設定値辞書。"""
+        return self.loaded.config if self.loaded else None
+
+    @property
+    def config_path(self) -> Optional[str]:
+        """読み込み済みの config.yaml のパス。"""
+        return self.loaded.config_path if self.loaded else None
+
+    @property
+    def config_mtime(self) -> Optional[float]:
+        """読み込み時点の config.yaml の更新日時。"""
+        return self.loaded.config_mtime if self.loaded else None
+
+    @property
+    def embedder(self) -> Optional[BaseEmbedder]:
+        """現在の Embedder。"""
+        return self.loaded.embedder if self.loaded else None
+
+    @property
+    def rag_service(self) -> Optional[RAGService]:
+        """現在の RAGService。"""
+        return self.loaded.rag_service if self.loaded else None
+
+    @property
+    def pdf_options(self) -> dict:
+        """アップロードされた PDF のテキスト抽出オプション。"""
+        return self.loaded.pdf_options if self.loaded else {}
+
+    def load(self) -> None:
+        """
+        config.yaml を読み込み、Embedder と RAGService を構築する。
+        スレッドプール・メトリクスの設定は構築に成功した後に適用し、設定・Embedder・RAGService は
+        1つの LoadedResources としてまとめて差し替える。構築に失敗した場合は何も変更しないため、
+        処理中のリクエストは旧インスタンスを使い続けられる。
+        Raises:
+            ValueError: 不正な設定の場合
+        """
+        config_path = resolve_config_path()
+        config_mtime = os.path.getmtime(config_path)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+
+        # 適用前にスレッドプールの設定を検証する
+        resolve_max_workers(config)
+        embedder = create_embedder(config)
+        reranker = create_reranker(config)
+        if reranker is not None:
+            # 初回検索のレイテンシにモデル読み込みが含まれないよう起動時に読み込む
+            reranker.load()
+        rag_service = RAGService(
+            embedder=embedder,
+            chroma_persist_directory=config['chroma']['persist_directory'],
+            chunker=create_chunker(config),
+            search_cache=create_search_cache(config),
+            semantic_cache=create_semantic_cache(config),
+            lexical_index=create_lexical_index(config),
+            reranker=reranker,
+            collection_settings=create_collection_settings(config),
+            **hybrid_search_options(config)
         )
-    elif embedder_type == 'sentence-transformer':
-        return SentenceTransformerEmbedder(
-            model_name=config['sentence_transformer']['model_name']
+        loaded = LoadedResources(
+            config=config,
+            config_path=config_path,
+            config_mtime=config_mtime,
+            embedder=embedder,
+            rag_service=rag_service,
+            pdf_options=pdf_extraction_options(config)
         )
-    else:
-        raise ValueError(f"不正な embedder.type: {embedder_type}")
+
+        # configure_metrics はシンクをすべて生成してから差し替えるため、失敗した場合は旧設定のまま残る
+        configure_metrics(config)
+        configure_executors(config)
+        # /metrics の出力時に最新の RAGService のキャッシュ統計・コレクションのレコード数を反映する
+        if self.rag_service is not None:
+            METRICS.remove_collector(self.rag_service.collect_metrics)
+        METRICS.add_collector(rag_service.collect_metrics)
+
+        self.loaded = loaded
+        if self.job_store is None:
+            # ジョブキューは設定の再読み込みをまたいで同じものを使用する
+            self.job_store = create_job_store(config)
+
+    def start_ingest_workers(self) -> None:
+        """
+        登録ジョブのワーカーを起動する。
+        ワーカーは登録のたびに最新の RAGService を参照するため、設定の再読み込み後も新しい Embedder で登録する。
+        """
+        if self.ingest_pool is None:
+            self.ingest_pool = create_worker_pool(self.config, self.job_store, lambda: self.rag_service)
+            self.ingest_pool.start()
+
+    def stop_ingest_workers(self) -> None:
+        """登録ジョブのワーカーを停止する（処理中のジョブは再起動後に再開される）。"""
+        if self.ingest_pool is not None:
+            self.ingest_pool.stop()
+            self.ingest_pool = None
+
+    def is_stale(self) -> bool:
+        """
+        読み込み済みの config.yaml が更新されているかを判定する。
+        Returns:
+            bool: 設定ファイルのパスまたは更新日時が変わっていれば True
+        """
+        config_path = resolve_config_path()
+        if config_path != self.config_path:
+            return True
+        return os.path.getmtime(config_path) != self.config_mtime
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        config.yaml が更新されていればリソースを再構築する。
+        Args:
+            force (bool): True の場合は更新有無に関わらず再構築する
+        Returns:
+            bool: 再構築を行った場合は True
+        """
+        with self._lock:
+            if not force and self.rag_service is not None and not self.is_stale():
+                return False
+            self.load()
+            return True
+
+
+def get_resources(request: Request) -> RAGResources:
+    """リクエストから共有リソースコンテナを取得する（FastAPI 依存性）"""
+    resources = getattr(request.app.state, "resources", None)
+    if resources is None or resources.rag_service is None:
+        raise HTTPException(status_code=503, detail="共有リソースが初期化されていません。")
+    return resources
 
 
 # ===================== ヘルスチェック =====================
@@ -164,47 +509,93 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Admin"])
+async def metrics():
+    """
+    処理段階ごとのレイテンシ・スループットのメトリクスを Prometheus のテキスト形式で返す
+    
+    埋め込み（バックエンド別）・ChromaDB 操作・検索・登録の所要時間のヒストグラム、登録したチャンク数・推定トークン数、
+    キャッシュのヒット率、コレクションのレコード数を含む。
+    値はワーカープロセスごとに集計されるため、複数ワーカーで起動する場合はワーカーごとに収集される。
+    
+    Returns:
+        PlainTextResponse: Prometheus のテキスト形式（version 0.0.4）
+    """
+    # コレクションのレコード数の取得を含むため ChromaDB 用スレッドプールで実行
+    body = await run_blocking("chroma", METRICS.render_prometheus)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ===================== ファイル一覧取得 API =====================
 
 @app.get("/api/files", response_model=SuccessResponseFiles, tags=["File Management"])
-async def get_files():
+async def get_files(
+    offset: int = Query(default=0, ge=0, description="読み飛ばす件数"),
+    limit: int = Query(default=100, ge=1, le=1000, description="取得件数（1～1000、デフォルト: 100）"),
+    cursor: Optional[str] = Query(default=None, description="前ページの next_cursor（指定時はその続きから取得）"),
+    directory: Optional[str] = Query(default=None, description="ディレクトリで絞り込み"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$", description="登録日時の並び順（desc: 新しい順, asc: 古い順）"),
+    resources: RAGResources = Depends(get_resources)
+):
     """
-    登録済みファイル一覧を取得する
+    登録済みファイル一覧をページ単位で取得する
+    
+    Args:
+        offset (int): 読み飛ばす件数
+        limit (int): 取得件数
+        cursor (str, optional): 前ページの next_cursor
+        directory (str, optional): ディレクトリで絞り込み
+        order (str): 登録日時の並び順
     
     Returns:
-        SuccessResponseFiles: ファイル情報リストと総件数
+        SuccessResponseFiles: ファイル情報リスト・総件数・次ページの位置
     
     Raises:
-        HTTPException: 処理エラーが発生した場合
+        HTTPException: 
+            - 400: パラメータ不正
+            - 500: 処理エラーが発生した場合
     """
     try:
-        config = load_config()
-        embedder = create_embedder(config)
-        
-        rag_service = RAGService(
-            embedder=embedder,
-            chroma_persist_directory=config['chroma']['persist_directory']
+        listing = await resources.rag_service.alist_files(
+            offset=offset,
+            limit=limit,
+            directory=directory,
+            sort_order=order,
+            cursor=cursor
         )
         
-        file_list = rag_service.get_file_list()
-        
         files = [
             FileInfo(
                 filename=f.get('filename', '(不明)'),
                 directory=f.get('directory', '/'),
                 created_at=f.get('created_at', '-'),
-                doc_id=f.get('doc_id')
+                doc_id=f.get('doc_id'),
+                chunk_count=f.get('chunk_count', 1)
             )
-            for f in file_list
+            for f in listing['files']
         ]
         
         return SuccessResponseFiles(
             data=FilesResponse(
                 files=files,
-                total_count=len(files)
+                total_count=listing['total_count'],
+                offset=listing['offset'],
+                limit=listing['limit'],
+                next_offset=listing['next_offset'],
+                next_cursor=listing['next_cursor']
             )
         )
     
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "リクエスト検証エラー",
+                "details": str(ve)
+            }
+        )
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -218,8 +609,51 @@ async def get_files():
 
 # ===================== 検索 API =====================
 
+def build_search_response(query: str, threshold: float, results: List[Dict], group_by_file: bool,
+                          cache: Optional[Dict] = None) -> SearchResponse:
+    """RAGService の検索結果（と search_with_info() のキャッシュ利用状況）を SearchResponse に変換する"""
+    search_results = [
+        SearchResult(
+            rank=i + 1,
+            filename=r['filename'],
+            score=r['score'],
+            document=r['document'],
+            created_at=r.get('created_at'),
+            chunk_index=r.get('chunk_index', 0),
+            start_char=r.get('start_char'),
+            end_char=r.get('end_char'),
+            vector_score=r.get('vector_score'),
+            lexical_score=r.get('lexical_score'),
+            rerank_score=r.get('rerank_score')
+        )
+        for i, r in enumerate(results)
+    ]
+    
+    files = None
+    if group_by_file:
+        files = [
+            FileHit(
+                filename=f['filename'],
+                score=f['score'],
+                hit_count=f['hit_count'],
+                chunk_indices=[c.get('chunk_index', 0) for c in f['chunks']]
+            )
+            for f in RAGService.aggregate_by_file(results)
+        ]
+    
+    return SearchResponse(
+        query=query,
+        threshold=threshold,
+        hit_count=len(results),
+        results=search_results,
+        files=files,
+        cache=CacheInfo(status=cache["cache"], similarity=cache.get("similarity")) if cache else None,
+        rerank=RerankInfo(**cache["rerank"]) if cache and cache.get("rerank") else None
+    )
+
+
 @app.post("/api/search", response_model=SuccessResponseSearch, tags=["Search"])
-async def search(request: SearchRequest):
+async def search(request: SearchRequest, resources: RAGResources = Depends(get_resources)):
     """
     キーワード検索を実行する
     
@@ -236,19 +670,15 @@ async def search(request: SearchRequest):
             - 500: サーバーエラー
     """
     try:
-        config = load_config()
-        embedder = create_embedder(config)
-        
-        rag_service = RAGService(
-            embedder=embedder,
-            chroma_persist_directory=config['chroma']['persist_directory']
-        )
-        
-        results = rag_service.search(
+        info = await resources.rag_service.asearch_with_info(
             query=request.query,
             n_results=request.n_results,
-            threshold=request.threshold
+            threshold=request.threshold,
+            allow_semantic=request.allow_semantic_cache,
+            mode=request.mode,
+            rerank=request.rerank
         )
+        results = info["results"]
         
         if not results:
             raise HTTPException(
@@ -260,24 +690,8 @@ async def search(request: SearchRequest):
                 }
             )
         
-        search_results = [
-            SearchResult(
-                rank=i + 1,
-                filename=r['filename'],
-                score=r['score'],
-                document=r['document'],
-                created_at=None
-            )
-            for i, r in enumerate(results)
-        ]
-        
         return SuccessResponseSearch(
-            data=SearchResponse(
-                query=request.query,
-                threshold=request.threshold,
-                hit_count=len(results),
-                results=search_results
-            )
+            data=build_search_response(request.query, request.threshold, results, request.group_by_file, cache=info)
         )
     
     except HTTPException:
@@ -304,6 +718,378 @@ async def search(request: SearchRequest):
         )
 
 
+@app.post("/api/search/batch", response_model=SuccessResponseBatchSearch, tags=["Search"])
+async def search_batch(request: BatchSearchRequest, resources: RAGResources = Depends(get_resources)):
+    """
+    複数クエリの検索を1回のリクエストで実行する
+    
+    全クエリを1回の埋め込み呼び出しでベクトル化し、1回の ChromaDB 検索で処理する。
+    クエリごとに threshold / n_results を指定でき、省略した場合はリクエスト全体の値を使用する。
+    ヒットしないクエリも空の結果として返す（404 にはしない）。
+    
+    Args:
+        request (BatchSearchRequest): 一括検索リクエスト
+    
+    Returns:
+        SuccessResponseBatchSearch: クエリ順の検索結果リスト
+    
+    Raises:
+        HTTPException: 
+            - 400: リクエスト検証エラー
+            - 500: サーバーエラー
+    """
+    try:
+        queries = [q.query for q in request.queries]
+        thresholds = [q.threshold if q.threshold is not None else request.threshold for q in request.queries]
+        n_results = [q.n_results if q.n_results is not None else request.n_results for q in request.queries]
+        
+        infos = await resources.rag_service.asearch_many_with_info(
+            queries=queries,
+            n_results=n_results,
+            threshold=thresholds,
+            allow_semantic=request.allow_semantic_cache,
+            mode=request.mode,
+            rerank=request.rerank
+        )
+        
+        items = [
+            build_search_response(query, threshold, info["results"], request.group_by_file, cache=info)
+            for query, threshold, info in zip(queries, thresholds, infos)
+        ]
+        
+        return SuccessResponseBatchSearch(
+            data=BatchSearchResponse(
+                query_count=len(items),
+                total_hit_count=sum(item.hit_count for item in items),
+                items=items
+            )
+        )
+    
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "リクエスト検証エラー",
+                "details": str(ve)
+            }
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "error": "一括検索処理でエラー",
+                "details": str(e)
+            }
+        )
+
+
+# ===================== 登録ジョブ API =====================
+
+async def get_job_or_404(resources: RAGResources, job_id: str, include_files: bool = False) -> Dict:
+    """
+    登録ジョブを取得する（存在しない場合は 404）
+    
+    JobStore は SQLite のロック待ちでブロックする場合があるため、ChromaDB 用スレッドプールで実行する。
+    """
+    job = await run_blocking("chroma", resources.job_store.get, job_id, include_files=include_files)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "success": False,
+                "error": "登録ジョブが見つかりません",
+                "details": {"job_id": job_id}
+            }
+        )
+    return job
+
+
+@app.post("/api/jobs", response_model=SuccessResponseJob, status_code=202, tags=["Ingest"])
+async def submit_job(request: IngestJobRequest, resources: RAGResources = Depends(get_resources)):
+    """
+    ファイルの登録（ベクトル化）ジョブを作成する
+    
+    テキストはスプールファイルに保存され、バックグラウンドのワーカーが順に登録する。
+    進捗は GET /api/jobs/{job_id} で確認する。
+    
+    Args:
+        request (IngestJobRequest): 登録するファイルリスト
+    
+    Returns:
+        SuccessResponseJob: 作成したジョブ（status: queued）
+    
+    Raises:
+        HTTPException: 500: ジョブ作成処理でエラーが発生した場合
+    """
+    try:
+        job_id = await run_blocking(
+            "chroma", resources.job_store.submit,
+            [doc.text for doc in request.documents],
+            [doc.filename for doc in request.documents]
+        )
+        job = await run_blocking("chroma", resources.job_store.get, job_id)
+        return SuccessResponseJob(data=IngestJob(**job))
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "error": "登録ジョブ作成処理でエラー",
+                "details": str(e)
+            }
+        )
+
+
+@app.get("/api/jobs", response_model=SuccessResponseJobs, tags=["Ingest"])
+async def list_jobs(
+    limit: int = Query(20, ge=1, le=1000, description="返却する最大件数"),
+    status: Optional[str] = Query(None, pattern=f"^({'|'.join(JOB_STATUSES)})$", description="状態で絞り込む"),
+    resources: RAGResources = Depends(get_resources)
+):
+    """
+    登録ジョブを新しい順に返す
+    
+    Returns:
+        SuccessResponseJobs: ジョブのリスト（ファイルごとの状態は含まない）
+    """
+    jobs = await run_blocking("chroma", resources.job_store.list_jobs, limit, status)
+    return SuccessResponseJobs(data=[IngestJob(**job) for job in jobs])
+
+
+@app.get("/api/jobs/{job_id}", response_model=SuccessResponseJob, tags=["Ingest"])
+async def get_job(
+    job_id: str,
+    include_files: bool = Query(False, description="ファイルごとの状態（files）を含めるか"),
+    resources: RAGResources = Depends(get_resources)
+):
+    """
+    登録ジョブの状態と進捗を返す
+    
+    Returns:
+        SuccessResponseJob: ジョブの状態
+    
+    Raises:
+        HTTPException: 404: ジョブが存在しない場合
+    """
+    return SuccessResponseJob(data=IngestJob(**await get_job_or_404(resources, job_id, include_files)))
+
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=SuccessResponseJob, tags=["Ingest"])
+async def cancel_job(job_id: str, resources: RAGResources = Depends(get_resources)):
+    """
+    登録ジョブをキャンセルする
+    
+    待機中のジョブはすぐにキャンセルされる。実行中のジョブは処理中のバッチの登録前に中断される
+    （cancel_requested が true になり、ワーカーが中断すると status が canceled になる）。
+    登録済みのファイルは削除しない。
+    
+    Returns:
+        SuccessResponseJob: キャンセル後のジョブの状態
+    
+    Raises:
+        HTTPException: 404: ジョブが存在しない場合
+    """
+    job = await run_blocking("chroma", resources.job_store.cancel, job_id)
+    if job is None:
+        await get_job_or_404(resources, job_id)
+    return SuccessResponseJob(data=IngestJob(**job))
+
+
+# ===================== ドキュメント登録・削除 API =====================
+
+@app.post("/api/documents", response_model=SuccessResponseJob, status_code=202, tags=["Ingest"])
+async def upload_documents(
+    files: List[UploadFile] = File(..., description="登録するファイル（.txt（UTF-8）/ .pdf、複数指定可）"),
+    resources: RAGResources = Depends(get_resources)
+):
+    """
+    ファイルをアップロードし、登録ジョブを作成する
+    
+    multipart/form-data で受け取ったファイルからテキストを1件ずつ抽出してスプールファイルに書き出す
+    （テキストファイルは一定サイズ、PDF はページ単位で書き出すため、メモリ使用量はファイル数に比例しない）。
+    登録はバックグラウンドのワーカーが行い、進捗は GET /api/jobs/{job_id} で確認する。
+    同名のファイルは上書き登録される。
+    PDF の一部のページの抽出に失敗した場合は、そのページを空として登録し page_errors で報告する。
+    
+    Args:
+        files (List[UploadFile]): 登録するファイル
+    
+    Returns:
+        SuccessResponseJob: 作成したジョブ（status: queued）
+    
+    Raises:
+        HTTPException: 400: 対応していない形式・UTF-8 でないテキストファイル・読み込めない PDF が含まれる場合
+        HTTPException: 500: テキスト抽出・ジョブ作成処理でエラーが発生した場合
+    """
+    unsupported = [f.filename for f in files
+                   if not f.filename or os.path.splitext(f.filename)[1].lower() not in SUPPORTED_EXTENSIONS]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": f"対応していないファイル形式です（{', '.join(SUPPORTED_EXTENSIONS)} のみ登録可能）",
+                "details": {"filenames": unsupported}
+            }
+        )
+
+    job_store = resources.job_store
+    pdf_options = resources.pdf_options
+    # スプールディレクトリの作成・スプールファイルへの書き出しはイベントループ外で実行する
+    job_id = await run_blocking("chroma", job_store.new_job_id)
+
+    def spool(seq: int, upload: UploadFile) -> tuple:
+        path = job_store.spool_path(job_id, seq)
+        return path, extract_text_to_file(upload.file, upload.filename, path, **pdf_options)
+
+    current = None
+    try:
+        spool_paths = []
+        page_errors = []
+        for seq, upload in enumerate(files):
+            current = upload.filename
+            path, extracted = await run_blocking("ingest", spool, seq, upload)
+            await upload.close()
+            spool_paths.append(path)
+            page_errors.extend({"filename": upload.filename, **error} for error in extracted["page_errors"])
+        await run_blocking("chroma", job_store.submit_files, job_id, [f.filename for f in files], spool_paths)
+        job = await run_blocking("chroma", job_store.get, job_id)
+        return SuccessResponseJob(data=IngestJob(**job), page_errors=page_errors)
+    
+    except UnicodeDecodeError as e:
+        # ValueError のサブクラスのため先に捕捉する
+        await run_blocking("chroma", job_store.remove_spool, job_id)
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "テキストファイルは UTF-8 である必要があります",
+                "details": {"filename": current, "reason": str(e)}
+            }
+        )
+    except ValueError as e:
+        # PDF として読み込めないファイル
+        await run_blocking("chroma", job_store.remove_spool, job_id)
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "success": False,
+                "error": "ファイルからテキストを抽出できません",
+                "details": {"filename": current, "reason": str(e)}
+            }
+        )
+    except Exception as e:
+        await run_blocking("chroma", job_store.remove_spool, job_id)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "error": "ファイル登録処理でエラー",
+                "details": {"filename": current, "reason": str(e)}
+            }
+        )
+
+
+@app.delete("/api/documents/{filename:path}", response_model=DeleteDocumentResponse, tags=["Ingest"])
+async def delete_document(filename: str, resources: RAGResources = Depends(get_resources)):
+    """
+    指定したファイル名のドキュメント（全チャンク）を削除する
+    
+    Args:
+        filename (str): 削除するファイル名
+    
+    Returns:
+        DeleteDocumentResponse: 削除したチャンク数
+    
+    Raises:
+        HTTPException: 404: ファイルが登録されていない場合
+        HTTPException: 500: 削除処理でエラーが発生した場合
+    """
+    try:
+        deleted = await run_blocking("chroma", resources.rag_service.delete_files, [filename])
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "error": "ファイル削除処理でエラー",
+                "details": str(e)
+            }
+        )
+    if deleted == 0:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "success": False,
+                "error": "ファイルが見つかりません",
+                "details": {"filename": filename}
+            }
+        )
+    return DeleteDocumentResponse(filename=filename, deleted_chunks=deleted)
+
+
+# ===================== 設定再読み込み API =====================
+
+@app.post("/api/reload", response_model=ReloadResponse, tags=["Admin"])
+async def reload_resources(force: bool = False, resources: RAGResources = Depends(get_resources)):
+    """
+    config.yaml の変更を反映し、Embedder と RAGService を再構築する
+    
+    Args:
+        force (bool): True の場合は設定ファイルの更新有無に関わらず再構築する
+    
+    Returns:
+        ReloadResponse: 再構築の有無と使用中の設定
+    
+    Raises:
+        HTTPException: 500: 再構築に失敗した場合（旧リソースは引き続き使用される）
+    """
+    try:
+        # 設定の読み込み・モデルの読み込み・ChromaDB の再オープンはイベントループ外（再構築用スレッドプール）で実行し、
+        # 処理中の検索を止めない
+        reloaded = await run_blocking("reload", resources.reload, force=force)
+        loaded = resources.loaded
+        return ReloadResponse(
+            reloaded=reloaded,
+            config_path=loaded.config_path,
+            embedder_type=loaded.config.get('embedder', {}).get('type', 'generic')
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "error": "設定再読み込み処理でエラー",
+                "details": str(e)
+            }
+        )
+
+
+@app.get("/api/cache/stats", response_model=CacheStatsResponse, tags=["Admin"])
+async def cache_stats(resources: RAGResources = Depends(get_resources)):
+    """
+    検索結果キャッシュ・埋め込みキャッシュのヒット率などの統計を返す
+    
+    Returns:
+        CacheStatsResponse: コレクションバージョンと各キャッシュの統計（無効なキャッシュは null）
+    """
+    rag_service = resources.rag_service
+    search_cache = rag_service.search_cache
+    semantic_cache = rag_service.semantic_cache
+    embedder_stats = getattr(resources.embedder, "stats", None)
+    return CacheStatsResponse(
+        collection_version=rag_service.version.current(),
+        search_cache=search_cache.stats() if search_cache is not None else None,
+        semantic_cache=semantic_cache.stats() if semantic_cache is not None else None,
+        embedding_cache=embedder_stats() if callable(embedder_stats) else None
+    )
+
+
 # ===================== エラーハンドラ =====================
 
 @app.exception_handler(HTTPException)
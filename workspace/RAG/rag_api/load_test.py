@@ -0,0 +1,125 @@
+"""
+RAG WebAPI の負荷テストスクリプト。
+同時接続数を段階的に増やしながら /api/search を呼び出し、スループットとレイテンシを計測する。
+単一ワーカー（uvicorn --workers 1）で起動したサーバーに対して実行し、
+同時接続数に応じてスループットが伸びること（リクエストが重なって処理されること）を確認する。
+
+使い方:
+    python3 -m uvicorn api_server:app --host 0.0.0.0 --port 8000 --workers 1
+    python3 load_test.py --url http://localhost:8000 --concurrency 1 2 4 8 16 --requests 64
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_QUERIES = [
+    "Google",
+    "内閣総理大臣",
+    "Microsoft の本社所在地",
+    "Apple の主力製品",
+    "Tencent",
+    "Prime Minister",
+]
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    """スレッドごとに HTTP セッションを保持する。"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def _send(url: str, query: str, threshold: float, n_results: int, timeout: float):
+    """
+    検索リクエストを1件送信する。
+    Returns:
+        tuple: (レイテンシ秒, 成功したかどうか)
+    """
+    start = time.perf_counter()
+    try:
+        response = _session().post(
+            f"{url}/api/search",
+            json={"query": query, "threshold": threshold, "n_results": n_results},
+            timeout=timeout
+        )
+        ok = response.status_code in (200, 404)
+    except requests.exceptions.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(url: str, concurrency: int, total_requests: int, queries, threshold: float, n_results: int, timeout: float) -> dict:
+    """
+    指定した同時接続数で total_requests 件のリクエストを送信し、計測結果を返す。
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        futures = [
+            pool.submit(_send, url, queries[i % len(queries)], threshold, n_results, timeout)
+            for i in range(total_requests)
+        ]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if not r[1])
+    p95_index = max(0, int(len(latencies) * 0.95) - 1)
+    return {
+        "concurrency": concurrency,
+        "throughput": total_requests / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[p95_index] * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="RAG WebAPI 負荷テスト")
+    parser.add_argument("--url", default="http://localhost:8000", help="API サーバーのURL")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="同時接続数（複数指定可）")
+    parser.add_argument("--requests", type=int, default=64, help="各同時接続数で送信するリクエスト数")
+    parser.add_argument("--threshold", type=float, default=0.0, help="検索の類似度閾値")
+    parser.add_argument("--n-results", type=int, default=5, help="検索の返却件数")
+    parser.add_argument("--timeout", type=float, default=60.0, help="リクエストタイムアウト（秒）")
+    parser.add_argument("--min-scaling", type=float, default=0.0,
+                        help="最大同時接続数でのスループットが同時接続数1の何倍以上であるべきか（0で判定しない）")
+    parser.add_argument("--query", action="append", help="検索クエリ（複数指定可、省略時は組み込みのクエリ）")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    queries = args.query or DEFAULT_QUERIES
+
+    # ウォームアップ（接続確立・モデルロードの影響を除外）
+    _send(url, queries[0], args.threshold, args.n_results, args.timeout)
+
+    print(f"{'同時接続数':>10} {'req/s':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'エラー':>8} {'倍率':>8}")
+    baseline = None
+    report = None
+    for concurrency in args.concurrency:
+        report = run_level(url, concurrency, args.requests, queries, args.threshold, args.n_results, args.timeout)
+        if baseline is None:
+            baseline = report["throughput"]
+        scaling = report["throughput"] / baseline if baseline else 0.0
+        print(f"{concurrency:>10} {report['throughput']:>10.2f} {report['p50_ms']:>10.1f} "
+              f"{report['p95_ms']:>10.1f} {report['errors']:>8} {scaling:>7.2f}x")
+
+    if args.min_scaling and baseline and report:
+        scaling = report["throughput"] / baseline
+        if scaling < args.min_scaling:
+            print(f"スループットのスケーリングが不足しています: {scaling:.2f}x < {args.min_scaling:.2f}x")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
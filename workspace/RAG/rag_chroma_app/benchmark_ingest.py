@@ -0,0 +1,103 @@
+"""
+登録パイプラインのベンチマークスクリプト。
+テキスト読み込みと埋め込みにそれぞれ一定の遅延を入れ、段階を順に実行する vectorize_and_register と
+IngestPipeline の処理時間を比較する。パイプラインでは段階が並行に進むため、処理時間は最も遅い段階の合計時間に近づく。
+
+埋め込み API の影響を除くため、テキストのハッシュから決定的なベクトルを生成する Embedder を使用する。
+一時ディレクトリに ChromaDB を作成するため、既存の chroma_db には影響しない。
+
+--metrics-file を指定すると、段階ごとの所要時間などの計測値（services.metrics）を JSON Lines 形式で書き出す。
+
+使い方:
+    python benchmark_ingest.py --files 200 --extract-ms 10 --embed-ms 30
+    python benchmark_ingest.py --files 200 --metrics-file ../metrics.jsonl
+"""
+
+import argparse
+import shutil
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from benchmark_registration import HashEmbedder
+from services.Ingest.pipeline import IngestPipeline
+from services.metrics import CHROMA_SECONDS, INGEST_SECONDS, METRICS, JsonLinesSink
+from services.RAG.chunker import TextChunker
+from services.RAG.rag_service import RAGService
+
+
+class SlowEmbedder(HashEmbedder):
+    """1回の呼び出しごとに一定時間待機する Embedder（埋め込み API のレイテンシを模擬する）。"""
+
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+
+    def embed(self, texts):
+        time.sleep(self.delay)
+        return super().embed(texts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="登録パイプラインのベンチマーク")
+    parser.add_argument("--files", type=int, default=200, help="登録するファイル数")
+    parser.add_argument("--extract-ms", type=float, default=10, help="1ファイルあたりのテキスト読み込み時間（ミリ秒）")
+    parser.add_argument("--embed-ms", type=float, default=30, help="1回の埋め込み呼び出しの時間（ミリ秒）")
+    parser.add_argument("--extract-workers", type=int, default=2, help="パイプラインのテキスト読み込みのスレッド数")
+    parser.add_argument("--embed-workers", type=int, default=2, help="パイプラインのベクトル化のスレッド数")
+    parser.add_argument("--metrics-file", help="計測値を JSON Lines 形式で書き出すファイル")
+    args = parser.parse_args()
+
+    if args.metrics_file:
+        METRICS.add_sink(JsonLinesSink(args.metrics_file))
+
+    filenames = [f"bench_{i}.txt" for i in range(args.files)]
+
+    def load(filename: str) -> str:
+        time.sleep(args.extract_ms / 1000)
+        return f"benchmark document {filename} " * 20
+
+    work_dir = tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        def new_service(name: str) -> RAGService:
+            return RAGService(
+                embedder=SlowEmbedder(args.embed_ms),
+                chroma_persist_directory=os.path.join(work_dir, name),
+                chunker=TextChunker(strategy="none")
+            )
+
+        # 逐次: ファイルごとに読み込み → ベクトル化 → 書き込み
+        rag_service = new_service("sequential")
+        start = time.perf_counter()
+        for filename in filenames:
+            rag_service.vectorize_and_register([load(filename)], [filename])
+        sequential = time.perf_counter() - start
+
+        rag_service = new_service("pipeline")
+        pipeline = IngestPipeline(rag_service, extract_workers=args.extract_workers,
+                                  embed_workers=args.embed_workers, file_batch_size=8)
+        start = time.perf_counter()
+        pipeline.run([{"filename": fn} for fn in filenames], lambda item: load(item["filename"]))
+        pipelined = time.perf_counter() - start
+
+        print(f"ファイル数: {args.files}、読み込み {args.extract_ms} ms/件、埋め込み {args.embed_ms} ms/回")
+        print(f"逐次         : {sequential:8.2f} 秒 ({args.files / sequential:8.1f} 件/秒)")
+        print(f"パイプライン : {pipelined:8.2f} 秒 ({args.files / pipelined:8.1f} 件/秒)")
+        print("段階ごとの所要時間（逐次・パイプラインの合計）:")
+        for label, histogram, labels in (("差分判定", INGEST_SECONDS, {"stage": "plan"}),
+                                         ("ベクトル化", INGEST_SECONDS, {"stage": "embed"}),
+                                         ("書き込み", INGEST_SECONDS, {"stage": "write"}),
+                                         ("  うち upsert", CHROMA_SECONDS, {"operation": "upsert"})):
+            summary = histogram.summary(**labels)
+            print(f"    {label:12}: 合計 {summary['sum']:8.2f} 秒、{summary['count']:6} 回、"
+                  f"平均 {summary['mean'] * 1000:8.2f} ms")
+    finally:
+        METRICS.clear_sinks()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+ファイル登録・削除のコレクションサイズ依存性を計測するベンチマークスクリプト。
+コレクションのレコード数 M を増やしながら、N ファイルの上書き登録・ファイル名指定の削除・取得にかかる時間を計測し、
+where 条件付き操作により M に依存せずほぼ一定であることを確認する。
+
+埋め込み API の影響を除くため、テキストのハッシュから決定的なベクトルを生成する Embedder を使用する。
+一時ディレクトリに ChromaDB を作成するため、既存の chroma_db には影響しない。
+
+使い方:
+    python benchmark_registration.py --sizes 1000 5000 20000 --files 10
+"""
+
+import argparse
+import hashlib
+import random
+import shutil
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.RAG.chunker import TextChunker
+from services.RAG.rag_service import RAGService
+from services.Vector.base_embedder import BaseEmbedder
+
+DIMENSION = 64
+
+
+class HashEmbedder(BaseEmbedder):
+    """テキストのハッシュから決定的なベクトルを生成するベンチマーク用 Embedder。"""
+
+    @property
+    def model_id(self) -> str:
+        return f"benchmark-hash:{DIMENSION}"
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+            vectors.append([rng.uniform(-1.0, 1.0) for _ in range(DIMENSION)])
+        return vectors
+
+
+def fill_collection(rag_service: RAGService, target_size: int, batch_size: int = 1000) -> None:
+    """コレクションのレコード数が target_size になるまでダミーファイルを登録する。"""
+    current = rag_service.collection.count()
+    while current < target_size:
+        count = min(batch_size, target_size - current)
+        texts = [f"filler document {current + i} " * 8 for i in range(count)]
+        filenames = [f"filler_{current + i}.txt" for i in range(count)]
+        rag_service.vectorize_and_register(texts, filenames)
+        current = rag_service.collection.count()
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """func を repeat 回実行し、最小実行時間（ミリ秒）を返す。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ファイル登録・削除のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="計測するコレクションのレコード数")
+    parser.add_argument("--files", type=int, default=10, help="1回の登録で上書きするファイル数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        rag_service = RAGService(
+            embedder=HashEmbedder(),
+            chroma_persist_directory=work_dir,
+            chunker=TextChunker(strategy="none")
+        )
+        filenames = [f"target_{i}.txt" for i in range(args.files)]
+        version = {"n": 0}
+
+        def register_changed():
+            # 毎回内容を変えて上書き登録（埋め込み・upsert が発生する）
+            version["n"] += 1
+            rag_service.vectorize_and_register([f"target {fn} v{version['n']}" for fn in filenames], filenames)
+
+        def register_unchanged():
+            rag_service.vectorize_and_register([f"target {fn} v{version['n']}" for fn in filenames], filenames)
+
+        def lookup():
+            rag_service.get_documents_by_filename(filenames)
+
+        def delete_and_restore():
+            rag_service.delete_files(filenames)
+            register_changed()
+
+        print(f"{'レコード数':>10} {'上書き登録(ms)':>16} {'変更なし再登録(ms)':>20} {'ファイル名検索(ms)':>18} {'削除+再登録(ms)':>16}")
+        for size in sorted(args.sizes):
+            fill_collection(rag_service, size)
+            register_changed()
+            print(f"{rag_service.collection.count():>10} "
+                  f"{timed(register_changed):>16.1f} "
+                  f"{timed(register_unchanged):>20.1f} "
+                  f"{timed(lookup):>18.1f} "
+                  f"{timed(delete_and_restore):>16.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Streamlit ページ・API サーバーの起動時の import 時間を `python -X importtime` で計測し、予算内に収まるかを確認するスクリプト。
+以下のいずれかに該当する場合は終了コード 1 を返すため、CI やコンテナのビルド時の確認に使用できる。
+
+- import 時間の合計が --budget-ms を超えた場合
+- 埋め込みバックエンド用の重いライブラリ（torch、sentence_transformers、onnxruntime など）が import 時に読み込まれた場合
+  （これらは services.Vector.registry.create_embedder() で該当する embedder.type が選択された場合のみ読み込む）
+
+計測は別プロセスで --runs 回行い、最も短い結果を使用する（初回のバイトコードのコンパイル・ディスクキャッシュの影響を除く）。
+
+使い方:
+    python check_import_time.py
+    python check_import_time.py --target api --budget-ms 2000 --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(os.path.dirname(APP_DIR), "rag_api")
+
+# 計測対象: 名前 → (作業ディレクトリ, 実行するコード)
+TARGETS = {
+    # Streamlit ページがモジュールの先頭で import するサービス群（ページ自体は Streamlit の実行時にしか import できない）
+    "streamlit": (APP_DIR, "import services.RAG.rag_service, services.RAG.chunker, services.RAG.lexical_index, "
+                           "services.RAG.reranker, services.RAG.search_cache, services.RAG.semantic_cache, "
+                           "services.Ingest.job_store, services.Ingest.worker, services.Vector.registry, utils"),
+    "api": (API_DIR, "import api_server"),
+}
+
+# import 時に読み込まれてはならないモジュール（埋め込みバックエンド・再ランキングの使用時のみ読み込む）
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "onnxruntime", "tokenizers")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def measure(cwd: str, code: str) -> Dict:
+    """
+    別プロセスで code を `python -X importtime` 付きで実行し、import 時間を集計する。
+    Args:
+        cwd (str): 作業ディレクトリ
+        code (str): 実行するコード
+    Returns:
+        Dict: {"total_ms", "top"（最上位の import の (累積ミリ秒, モジュール名) リスト）, "modules"（読み込まれたモジュール名）}
+    Raises:
+        RuntimeError: コードの実行に失敗した場合
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(errors[-10:]))
+
+    total_us = 0
+    top: List = []
+    modules = set()
+    for line in process.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        total_us += self_us
+        modules.add(name)
+        # 字下げが1文字のものが実行したコードから直接 import されたモジュール
+        if len(indent) == 1:
+            top.append((cumulative_us / 1000, name))
+    return {"total_ms": total_us / 1000, "top": sorted(top, reverse=True), "modules": modules}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="起動時の import 時間の予算を確認する")
+    parser.add_argument("--target", choices=list(TARGETS) + ["all"], default="all", help="計測対象")
+    parser.add_argument("--budget-ms", type=float, default=3000, help="import 時間の合計の上限（ミリ秒）")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（最も短い結果を使用する）")
+    parser.add_argument("--top", type=int, default=10, help="表示する import 時間の長いモジュール数")
+    args = parser.parse_args()
+
+    targets = list(TARGETS) if args.target == "all" else [args.target]
+    ok = True
+    for target in targets:
+        cwd, code = TARGETS[target]
+        try:
+            result = min((measure(cwd, code) for _ in range(max(1, args.runs))), key=lambda r: r["total_ms"])
+        except RuntimeError as e:
+            print(f"[{target}] import に失敗しました:\n{e}")
+            ok = False
+            continue
+
+        heavy = sorted(name for name in result["modules"] if name in HEAVY_MODULES)
+        within_budget = result["total_ms"] <= args.budget_ms
+        print(f"[{target}] import 時間: {result['total_ms']:.0f} ms（予算 {args.budget_ms:.0f} ms）"
+              f"{'' if within_budget else ' ※予算超過'}")
+        for cumulative_ms, name in result["top"][:args.top]:
+            print(f"    {cumulative_ms:8.1f} ms  {name}")
+        if heavy:
+            print(f"[{target}] import 時に読み込まれた重いモジュール: {', '.join(heavy)}")
+        ok = ok and within_budget and not heavy
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,9 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from services.Vector.generic_embedder import GenericEmbedder
+from services.RAG.collection_factory import create_collection_settings
 from services.RAG.rag_service import RAGService
+from services.RAG.scoring import distance_to_similarity
 import yaml
 
 def load_config():
@@ -27,7 +29,8 @@ embedder = GenericEmbedder(
 # RAGService を初期化
 rag_service = RAGService(
     embedder=embedder,
-    chroma_persist_directory=config['chroma']['persist_directory']
+    chroma_persist_directory=config['chroma']['persist_directory'],
+    collection_settings=create_collection_settings(config)
 )
 
 # テストクエリと登録済みドキュメントを比較
@@ -42,6 +45,7 @@ print("デバッグ: スコア計算")
 print("=" * 80)
 print(f"使用モデル: {config['generic']['model']}")
 print(f"エンドポイント: {config['generic']['embedding_url']}")
+print(f"距離空間: {rag_service.space}（正規化: {rag_service.normalize}）")
 print()
 
 # 登録済みドキュメントを取得
@@ -73,13 +77,13 @@ if len(all_docs.get('documents', [])) > 0:
         print(f"\n検索結果数: {len(docs)}")
         
         for i, (doc, meta, raw_score) in enumerate(zip(docs, metadatas, scores)):
-            # スコアを類似度に変換
-            similarity = 1 - raw_score
+            # コレクションの距離空間に応じて類似度に変換（検索 API と同じ変換式）
+            similarity = distance_to_similarity(raw_score, rag_service.space, rag_service.normalize)
             
             print(f"\n  結果 {i+1}:")
             print(f"    ファイル名: {meta.get('filename', '(不明)')}")
             print(f"    距離（生値）: {raw_score:.6f}")
-            print(f"    類似度（1-距離）: {similarity:.6f}")
+            print(f"    類似度: {similarity:.6f}")
             print(f"    ドキュメント（先頭50文字）: {doc[:50]}")
 
 else:
@@ -0,0 +1,157 @@
+"""
+Sentence-Transformers のモデルを ONNX に変換し、OnnxEmbedder（embedder.type: "onnx"）で使用するモデルディレクトリを作成するスクリプト。
+変換後に動的 int8 量子化したモデルも作成し、PyTorch のモデルとの精度差（コサイン類似度・最近傍の一致率）と
+1 CPU コアあたりのスループットを比較する。精度差が --min-cosine を下回った場合は終了コード 1 を返す。
+
+作成するファイル:
+    model.onnx         変換した float32 のモデル
+    model.int8.onnx    動的 int8 量子化したモデル（--no-quantize 指定時は作成しない）
+    tokenizer.json     tokenizers（Rust 実装）用のトークナイザー
+    onnx_config.json   モデル名・プーリング方法・正規化の有無・最大トークン数
+
+使い方:
+    python export_onnx_model.py --model all-mpnet-base-v2 --output ../onnx_models/all-mpnet-base-v2
+    python export_onnx_model.py --output ../onnx_models/all-mpnet-base-v2 --check-only --texts-file sample.txt
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.Vector.onnx_embedder import (
+    CONFIG_FILE, MODEL_FILE, QUANTIZED_MODEL_FILE, TOKENIZER_FILE, OnnxEmbedder, check_parity, quantize_model
+)
+from services.Vector.sentence_transformer_service import SentenceTransformerEmbedder
+
+# 精度・速度の比較に使用する既定のテキスト
+SAMPLE_TEXTS = [
+    "ChromaDB はオープンソースのベクトルデータベースである。",
+    "埋め込みベクトルを使って意味的に近い文書を検索する。",
+    "Retrieval-augmented generation combines search with a language model.",
+    "The quick brown fox jumps over the lazy dog.",
+    "PDF ファイルからテキストを抽出し、チャンクに分割して登録する。",
+    "今日の東京の天気は晴れのち曇りである。",
+    "ONNX Runtime runs exported models efficiently on CPU.",
+    "量子化により重みを int8 で保持し、推論を高速化する。",
+    "A cat is sitting on the windowsill, watching the birds outside.",
+    "検索結果はスコアの高い順に並べて返却する。",
+    "Python is a popular programming language for machine learning.",
+    "登録済みのファイルはファイル名を指定して削除できる。",
+]
+
+
+def export(model_name: str, output: str) -> None:
+    """
+    Sentence-Transformers のモデルの Transformer 部分を ONNX に変換し、トークナイザー・設定を保存する。
+    プーリング・正規化は OnnxEmbedder が numpy で行う。
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    tokenizer = transformer.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError(f"Fast トークナイザーが無いモデルは変換できません: {model_name}")
+    pooling = model[1] if len(model) > 1 else None
+    pooling_mode = "cls" if getattr(pooling, "pooling_mode_cls_token", False) else "mean"
+    normalize = any(type(module).__name__ == "Normalize" for module in model)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        """Transformer の最終層の出力のみを返すラッパー。"""
+
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)), return_dict=False)[0]
+
+    os.makedirs(output, exist_ok=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(transformer.auto_model).eval(),
+            tuple(sample[name] for name in input_names),
+            os.path.join(output, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.backend_tokenizer.save(os.path.join(output, TOKENIZER_FILE))
+    with open(os.path.join(output, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "pooling": pooling_mode,
+            "normalize": normalize,
+            "max_length": int(model.max_seq_length),
+            "pad_token_id": int(tokenizer.pad_token_id or 0),
+            "dimension": int(model.get_sentence_embedding_dimension())
+        }, f, ensure_ascii=False, indent=2)
+    print(f"変換完了: {output}（pooling: {pooling_mode}、normalize: {normalize}、max_length: {model.max_seq_length}）")
+
+
+def throughput(embedder, texts, repeat: int) -> float:
+    """テキストを repeat 回ベクトル化し、1秒あたりの埋め込み件数を返す。"""
+    embedder.embed_array(texts)  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(repeat):
+        embedder.embed_array(texts)
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sentence-Transformers のモデルを ONNX に変換し、精度・速度を比較する")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="変換する Sentence-Transformers のモデル名")
+    parser.add_argument("--output", required=True, help="モデルディレクトリ（config.yaml の onnx.model_directory）")
+    parser.add_argument("--no-quantize", action="store_true", help="int8 量子化したモデルを作成しない")
+    parser.add_argument("--check-only", action="store_true", help="変換せず、既存のモデルディレクトリの精度・速度のみを比較する")
+    parser.add_argument("--texts-file", help="比較に使用するテキストファイル（1行1テキスト、未指定時は内蔵のサンプル）")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="合格とするコサイン類似度の最小値")
+    parser.add_argument("--threads", type=int, default=1, help="比較時の推論スレッド数（1 コアあたりのスループットを比較する）")
+    parser.add_argument("--repeat", type=int, default=5, help="スループット計測の繰り返し回数")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export(args.model, args.output)
+        if not args.no_quantize:
+            quantize_model(os.path.join(args.output, MODEL_FILE), os.path.join(args.output, QUANTIZED_MODEL_FILE))
+            print(f"int8 量子化完了: {os.path.join(args.output, QUANTIZED_MODEL_FILE)}")
+
+    if args.texts_file:
+        with open(args.texts_file, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS
+    with open(os.path.join(args.output, CONFIG_FILE), "r", encoding="utf-8") as f:
+        model_name = json.load(f)["model_name"]
+
+    # PyTorch 側も同じスレッド数に揃えて比較する
+    import torch
+    torch.set_num_threads(args.threads)
+    reference = SentenceTransformerEmbedder(model_name)
+    candidates = [("float32", False)] + ([] if args.no_quantize else [("int8", True)])
+
+    passed = True
+    print(f"テキスト数: {len(texts)}、スレッド数: {args.threads}")
+    print(f"PyTorch      : {throughput(reference, texts, args.repeat):8.1f} 件/秒")
+    for label, quantize in candidates:
+        embedder = OnnxEmbedder(args.output, quantize=quantize, threads=args.threads)
+        parity = check_parity(reference, embedder, texts, min_cosine=args.min_cosine)
+        passed = passed and parity["passed"]
+        print(f"ONNX {label:8}: {throughput(embedder, texts, args.repeat):8.1f} 件/秒"
+              f"（最小コサイン類似度 {parity['min_cosine']}、平均 {parity['mean_cosine']}、"
+              f"最近傍の一致率 {parity['nearest_neighbor_agreement']}）{'' if parity['passed'] else ' ※基準未満'}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
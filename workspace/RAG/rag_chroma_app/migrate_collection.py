@@ -0,0 +1,120 @@
+"""
+rag_collection を config.yaml の chroma 設定（距離空間・HNSW パラメータ・ベクトル正規化）で作り直す移行スクリプト。
+ChromaDB のコレクションは作成後に距離空間（hnsw:space）や構築パラメータ（construction_ef, M）を変更できないため、
+新しい設定で一時コレクションを作成し、既存の埋め込みベクトル・本文・メタデータをバッチ単位でコピーしてから置き換える。
+埋め込みの再計算は行わない（正規化を有効にした場合はコピー時にベクトルを正規化する）。
+ドキュメントIDは変わらないため、語彙インデックスの再構築は不要である。
+
+使い方:
+    python migrate_collection.py --dry-run
+    python migrate_collection.py --batch-size 1000
+"""
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import chromadb
+import yaml
+
+from services.RAG.collection_factory import COLLECTION_NAME, create_collection_settings, current_hnsw_metadata
+from services.RAG.collection_version import CollectionVersion
+from services.RAG.scoring import normalize_vectors
+
+# 移行中に使用する一時コレクション名
+TEMP_COLLECTION_NAME = f"{COLLECTION_NAME}_migrating"
+# 正規化の有無を表す embedding_model の接尾辞（RAGService._embedding_model_id と同じ）
+NORMALIZED_SUFFIX = ":normalized"
+
+
+def load_config(config_path: str) -> dict:
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def convert_metadata(meta: dict, normalize: bool) -> dict:
+    """正規化の有無に合わせて embedding_model を付け替えたメタデータを返す（不要な再埋め込みを防ぐ）。"""
+    meta = dict(meta or {})
+    model_id = meta.get("embedding_model")
+    if model_id:
+        if model_id.endswith(NORMALIZED_SUFFIX):
+            model_id = model_id[:-len(NORMALIZED_SUFFIX)]
+        meta["embedding_model"] = model_id + (NORMALIZED_SUFFIX if normalize else "")
+    return meta
+
+
+def copy_collection(source, target, normalize: bool, batch_size: int) -> int:
+    """source の全レコードを target にコピーし、コピーした件数を返す。"""
+    copied = 0
+    offset = 0
+    while True:
+        result = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        ids = result.get("ids", [])
+        if len(ids) == 0:
+            break
+        embeddings = [list(vector) for vector in result.get("embeddings")]
+        if normalize:
+            embeddings = normalize_vectors(embeddings)
+        target.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=result.get("documents"),
+            metadatas=[convert_metadata(meta, normalize) for meta in result.get("metadatas")]
+        )
+        copied += len(ids)
+        print(f"  コピー済み: {copied}")
+        if len(ids) < batch_size:
+            break
+        offset += batch_size
+    return copied
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="rag_collection を config.yaml の chroma 設定で作り直す")
+    parser.add_argument("--config", default="config.yaml", help="設定ファイルのパス")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1回にコピーするレコード数")
+    parser.add_argument("--dry-run", action="store_true", help="現在の設定と移行後の設定を表示するのみで変更しない")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    settings = create_collection_settings(config)
+    persist_directory = config['chroma']['persist_directory']
+    client = chromadb.PersistentClient(path=persist_directory)
+
+    try:
+        source = client.get_collection(COLLECTION_NAME)
+    except Exception:
+        print(f"コレクション {COLLECTION_NAME} が存在しません。移行は不要です。")
+        return 0
+
+    print(f"現在のメタデータ: {current_hnsw_metadata(source)}")
+    print(f"移行後のメタデータ: {settings['metadata']}（normalize: {settings['normalize']}）")
+    print(f"レコード数: {source.count()}")
+    if args.dry_run:
+        return 0
+
+    # 前回の移行が中断されていた場合は一時コレクションを作り直す
+    try:
+        client.delete_collection(TEMP_COLLECTION_NAME)
+    except Exception:
+        pass
+    target = client.create_collection(TEMP_COLLECTION_NAME, metadata=settings['metadata'])
+
+    copied = copy_collection(source, target, settings['normalize'], args.batch_size)
+    if target.count() != source.count():
+        client.delete_collection(TEMP_COLLECTION_NAME)
+        print(f"件数が一致しないため移行を中止しました（元: {source.count()}、コピー: {target.count()}）。")
+        return 1
+
+    client.delete_collection(COLLECTION_NAME)
+    target.modify(name=COLLECTION_NAME)
+    # 検索結果キャッシュを無効化する
+    CollectionVersion(persist_directory, COLLECTION_NAME).bump()
+    print(f"移行完了: {copied} 件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,93 @@
 """
 ファイルアップロード・ベクトル化・ChromaDB登録を行うStreamlitページ。
 PDF・テキストファイルの読み込み、埋め込み生成、同名ファイルの上書き登録に対応。
+ベクトル化は登録ジョブとしてキューに追加し、バックグラウンドのワーカーが処理する（ページは進捗を定期的に表示する）。
 設定ファイルで Generic（OpenRouter/Ollama）, Azure OpenAI, Sentence-Transformers を選択可能。
 """
 import streamlit as st
 import os
 import sys
+import time
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app import config
-from services.RAG.rag_service import RAGService
-from services.Vector.generic_embedder import GenericEmbedder
-from services.Vector.azure_openai_embedder import AzureOpenAIEmbedder
-from services.Vector.sentence_transformer_service import SentenceTransformerEmbedder
-from utils import extract_text_from_pdf
+from services.Ingest.job_store import FINISHED_STATUSES, create_job_store
+from services.Ingest.worker import create_worker_pool
+from streamlit_resources import get_rag_service
+from utils import extract_text_from_pdf, pdf_extraction_options
 
 
-def create_embedder():
+@st.cache_resource
+def get_pdf_options():
     """
-    config.yaml の embedder.type に基づいて、適切な Embedder インスタンスを作成する。
+    PDF テキスト抽出のオプション（並列抽出の設定・抽出結果のキャッシュ）を作成する。
     Returns:
-        BaseEmbedder: GenericEmbedder, AzureOpenAIEmbedder, または SentenceTransformerEmbedder のインスタンス
-    Raises:
-        ValueError: 不正な embedder.type が指定された場合
+        dict: extract_text_from_pdf() に渡すオプション
     """
-    embedder_type = config.get('embedder', {}).get('type', 'generic')
-    
-    if embedder_type == 'generic':
-        return GenericEmbedder(
-            api_key=config['generic']['api_key'],
-            embedding_url=config['generic']['embedding_url'],
-            model=config['generic']['model']
-        )
-    elif embedder_type == 'azure-openai':
-        return AzureOpenAIEmbedder(
-            api_key=config['azure_openai']['api_key'],
-            endpoint=config['azure_openai']['endpoint'],
-            deployment_name=config['azure_openai']['deployment_name'],
-            api_version=config['azure_openai'].get('api_version', '2024-02-01')
-        )
-    elif embedder_type == 'sentence-transformer':
-        return SentenceTransformerEmbedder(
-            model_name=config['sentence_transformer']['model_name']
+    return pdf_extraction_options(config)
+
+
+@st.cache_resource
+def get_job_store():
+    """
+    登録ジョブのキューを作成する。
+    Returns:
+        JobStore: ジョブキュー（API サーバーと同じ SQLite ファイルを共有する）
+    """
+    return create_job_store(config)
+
+
+@st.cache_resource
+def get_ingest_pool():
+    """
+    登録ジョブのワーカーを起動する。
+    st.cache_resource でプロセスに1つだけ起動するため、ページの再実行やブラウザの切断後も処理は継続する。
+    Returns:
+        IngestWorkerPool: 起動済みのワーカープール
+    """
+    rag_service = get_rag_service()
+    pool = create_worker_pool(config, get_job_store(), lambda: rag_service)
+    pool.start()
+    return pool
+
+
+def show_job(job: dict) -> None:
+    """
+    登録ジョブの進捗を表示する。
+    Args:
+        job (dict): JobStore.get() の戻り値
+    """
+    total = max(job['total_files'], 1)
+    st.progress(job['processed_files'] / total,
+                text=f"ファイル {job['processed_files']} / {job['total_files']} 件（状態: {job['status']}）")
+    if job['chunks_to_embed']:
+        st.progress(min(job['chunks_embedded'] / job['chunks_to_embed'], 1.0),
+                    text=f"チャンクのベクトル化 {job['chunks_embedded']} / {job['chunks_to_embed']} 件")
+    if job['current_file'] and job['status'] == 'running':
+        st.caption(f"処理中: {job['current_file']}")
+    if job['status'] == 'succeeded':
+        summary = job['summary'] or {}
+        st.success("ベクトル化＆ChromaDB登録が完了しました。")
+        st.caption(
+            f"ファイル {job['total_files']} 件（変更なし {summary.get('unchanged_files', 0)} 件）、"
+            f"チャンク {summary.get('chunks', 0)} 件のうち {summary.get('embedded', 0)} 件をベクトル化しました。"
         )
-    else:
-        raise ValueError(f"不正な embedder.type: {embedder_type}。'generic', 'azure-openai', または 'sentence-transformer' を指定してください。")
+    elif job['status'] == 'failed':
+        st.error(f"ベクトル化処理でエラー: {job['error']}")
+        failed = [f for f in job.get('files') or [] if f['status'] == 'failed']
+        for f in failed:
+            st.caption(f"{f['filename']}: {f['error']}")
+    elif job['status'] == 'canceled':
+        st.warning(f"キャンセルしました（登録済み {job['processed_files']} 件は保持されます）。")
 
 
 st.title("ファイル登録ページ")
 
+# ワーカーの起動（起動済みの場合は何もしない）
+ingest_config = config.get('ingest', {}) or {}
+if int(ingest_config.get('workers', 1)) > 0:
+    get_ingest_pool()
+job_store = get_job_store()
+
 # セッション状態の初期化
 if 'uploaded_files' not in st.session_state:
     st.session_state['uploaded_files'] = []
@@ -55,56 +95,92 @@ if 'texts' not in st.session_state:
     st.session_state['texts'] = []
 if 'vectorized' not in st.session_state:
     st.session_state['vectorized'] = False
+if 'ingest_job_id' not in st.session_state:
+    st.session_state['ingest_job_id'] = None
 
 uploaded_files = st.file_uploader("テキストファイルまたはPDFをアップロード", type=["txt", "pdf"], accept_multiple_files=True)
 
 # ファイルアップロード処理
-if uploaded_files:
+upload_key = [(f.name, f.size) for f in uploaded_files] if uploaded_files else None
+if uploaded_files and upload_key != st.session_state.get('upload_key'):
     """
     アップロードされたファイルを読み込み、テキスト抽出・セッション保存を行う。
     同名ファイルは上書き対象とする。
+    進捗表示の再実行のたびに抽出し直さないよう、アップロード内容が変わった場合のみ処理する。
     """
+    st.session_state['upload_key'] = upload_key
     st.session_state['uploaded_files'] = []
     st.session_state['texts'] = []
     for uploaded_file in uploaded_files:
         if uploaded_file.name.endswith('.txt'):
             text = uploaded_file.read().decode('utf-8')
         elif uploaded_file.name.endswith('.pdf'):
-            text = extract_text_from_pdf(uploaded_file)
+            page_errors = []
+            try:
+                text = extract_text_from_pdf(uploaded_file, page_errors=page_errors, **get_pdf_options())
+            except ValueError as e:
+                st.error(f"{uploaded_file.name}: {e}")
+                continue
+            if page_errors:
+                pages = ", ".join(str(error['page']) for error in page_errors)
+                st.warning(f"{uploaded_file.name}: {len(page_errors)} ページのテキスト抽出に失敗しました（ページ {pages}）。")
         else:
             text = ''
         st.session_state['uploaded_files'].append(uploaded_file.name)
         st.session_state['texts'].append(text)
     st.session_state['vectorized'] = False
-    st.success(f"{len(uploaded_files)}件のファイルを読み込みました。")
+    st.success(f"{len(st.session_state['uploaded_files'])}件のファイルを読み込みました。")
 
 # ベクトル化・ChromaDB登録処理
 if st.button("ベクトル化"):
     """
-    アップロード済みテキストを config で指定された Embedder を使用してベクトル化し、ChromaDBに登録する。
-    既存ファイル名は上書き登録とする。
+    アップロード済みテキストを登録ジョブとしてキューに追加する。
+    ワーカーが config で指定された Embedder でベクトル化し、ChromaDBに登録する（既存ファイル名は上書き登録）。
     """
     if not st.session_state['texts']:
         st.warning("先にファイルをアップロードしてください。")
     else:
         try:
-            # config で指定された Embedder を作成
-            embedder = create_embedder()
-            
-            # RAGService を初期化（embedder をインジェクション）
-            rag_service = RAGService(
-                embedder=embedder,
-                chroma_persist_directory=config['chroma']['persist_directory']
-            )
-            
-            # ベクトル化・登録
-            rag_service.vectorize_and_register(
+            st.session_state['ingest_job_id'] = job_store.submit(
                 st.session_state['texts'],
                 st.session_state['uploaded_files']
             )
             st.session_state['vectorized'] = True
-            embedder_type = config.get('embedder', {}).get('type', 'openrouter')
-            st.success(f"ベクトル化（{embedder_type}）＆ChromaDB登録が完了しました。")
         except Exception as e:
-            st.error(f"ベクトル化処理でエラー: {e}")
+            st.error(f"登録ジョブの作成でエラー: {e}")
+
+# 登録ジョブの進捗表示（実行中は定期的に再表示する）
+job_id = st.session_state['ingest_job_id']
+if job_id:
+    job = job_store.get(job_id, include_files=True)
+    if job is None:
+        st.session_state['ingest_job_id'] = None
+    else:
+        st.subheader("登録ジョブ")
+        show_job(job)
+        if job['status'] not in FINISHED_STATUSES:
+            if st.button("キャンセル", disabled=job['cancel_requested']):
+                job_store.cancel(job_id)
+            time.sleep(float(ingest_config.get('poll_interval_seconds', 1.0)))
+            st.rerun()
 
+# 最近のジョブ（別のセッション・API から登録したジョブを含む）
+with st.expander("最近の登録ジョブ"):
+    recent = job_store.list_jobs(limit=10)
+    if recent:
+        st.dataframe(
+            [
+                {
+                    "ジョブID": j['job_id'][:8],
+                    "状態": j['status'],
+                    "ファイル": f"{j['processed_files']} / {j['total_files']}",
+                    "失敗": j['failed_files'],
+                    "作成日時": j['created_at'],
+                    "完了日時": j['finished_at'] or ""
+                }
+                for j in recent
+            ],
+            use_container_width=True
+        )
+    else:
+        st.caption("登録ジョブはありません。")
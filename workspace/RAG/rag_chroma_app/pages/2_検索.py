@@ -8,73 +8,59 @@ import streamlit as st
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from app import config
 from services.RAG.rag_service import RAGService
-from services.Vector.generic_embedder import GenericEmbedder
-from services.Vector.azure_openai_embedder import AzureOpenAIEmbedder
-from services.Vector.sentence_transformer_service import SentenceTransformerEmbedder
+from streamlit_resources import collection_version, get_rag_service, get_reranker, search
 
 
-def create_embedder():
-    """
-    config.yaml の embedder.type に基づいて、適切な Embedder インスタンスを作成する。
-    Returns:
-        BaseEmbedder: GenericEmbedder, AzureOpenAIEmbedder, または SentenceTransformerEmbedder のインスタンス
-    Raises:
-        ValueError: 不正な embedder.type が指定された場合
-    """
-    embedder_type = config.get('embedder', {}).get('type', 'generic')
-    
-    if embedder_type == 'generic':
-        return GenericEmbedder(
-            api_key=config['generic']['api_key'],
-            embedding_url=config['generic']['embedding_url'],
-            model=config['generic']['model']
-        )
-    elif embedder_type == 'azure-openai':
-        return AzureOpenAIEmbedder(
-            api_key=config['azure_openai']['api_key'],
-            endpoint=config['azure_openai']['endpoint'],
-            deployment_name=config['azure_openai']['deployment_name'],
-            api_version=config['azure_openai'].get('api_version', '2024-02-01')
-        )
-    elif embedder_type == 'sentence-transformer':
-        return SentenceTransformerEmbedder(
-            model_name=config['sentence_transformer']['model_name']
-        )
-    else:
-        raise ValueError(f"不正な embedder.type: {embedder_type}。'generic', 'azure-openai', または 'sentence-transformer' を指定してください。")
+st.title("検索ページ")
 
+# 検索条件はフォームにまとめ、「検索」ボタンを押した場合のみ再実行する（入力・スライダー操作のたびに検索しない）
+with st.form("search_form"):
+    query = st.text_input("検索ワードを入力してください")
+    # 類似度閾値をUIで調整可能に
+    threshold = st.slider("スコア閾値（0.0〜1.0）", min_value=0.0, max_value=1.0, value=0.2, step=0.01,
+                          help="ベクトル検索の類似度に適用します（キーワード検索の結果には適用されません）")
 
-st.title("検索ページ")
+    # プレビュー文字数の設定
+    preview_chars = st.slider("プレビュー表示文字数", min_value=50, max_value=2000, value=500, step=50)
+
+    # 検索方式
+    mode_labels = {"vector": "ベクトル検索", "lexical": "キーワード検索（BM25）", "hybrid": "ハイブリッド（ベクトル + キーワード）"}
+    mode = st.radio("検索方式", list(mode_labels), format_func=mode_labels.get, horizontal=True)
 
-query = st.text_input("検索ワードを入力してください")
-# 類似度閾値をUIで調整可能に
-threshold = st.slider("スコア閾値（0.0〜1.0）", min_value=0.0, max_value=1.0, value=0.2, step=0.01)
+    # 再ランキング（config の reranker 有効時のみ表示）
+    rerank = False
+    if get_reranker() is not None:
+        rerank = st.checkbox("CrossEncoder で再ランキング", value=True)
 
-# プレビュー文字数の設定
-preview_chars = st.slider("プレビュー表示文字数", min_value=50, max_value=2000, value=500, step=50)
+    # ファイル単位の集約表示
+    group_by_file = st.checkbox("ファイル単位でまとめて表示", value=False)
+    submitted = st.form_submit_button("検索")
 
 # 検索処理
-if st.button("検索"):
+if submitted:
     """
     入力クエリを config で指定された Embedder を使用してベクトル化し、ChromaDBで類似検索を実行する。
     スコア閾値以上の結果のみを表示する。
+    Embedder・RAGService はプロセスで共有し、同じ条件の検索結果はコレクションが更新されるまで再利用する。
     """
     if not query:
         st.warning("検索ワードを入力してください。")
     else:
         try:
-            # config で指定された Embedder を作成
-            embedder = create_embedder()
-            
-            # RAGService を初期化（embedder をインジェクション）
-            rag_service = RAGService(
-                embedder=embedder,
-                chroma_persist_directory=config['chroma']['persist_directory']
-            )
-            
-            results = rag_service.search(query, n_results=5, threshold=threshold)
+            rag_service = get_rag_service()
+            info = search(collection_version(), query, 5, threshold, mode, rerank)
+            results = info["results"]
+            if info["rerank"]:
+                rerank_info = info["rerank"]
+                note = "（時間上限により打ち切り）" if rerank_info["truncated"] else ""
+                st.caption(f"再ランキング: {rerank_info['reranked']} / {rerank_info['candidates']} 件を "
+                           f"{rerank_info['elapsed_ms']:.0f} ms でスコアリング{note}")
+            if info["cache"] == "semantic":
+                st.caption(f"類似クエリ（類似度 {info['similarity']:.3f}）の検索結果を再利用しました")
+            if rag_service.search_cache is not None:
+                stats = rag_service.search_cache.stats()
+                st.caption(f"検索キャッシュ: ヒット率 {stats['hit_rate']:.0%}（{stats['hits']} / {stats['hits'] + stats['misses']} 件）")
             
             st.subheader(f"検索結果（閾値: {threshold:.2f} 以上のみ表示）")
             if results:
@@ -82,11 +68,21 @@ if st.button("検索"):
                 st.success(f"✓ {len(results)} 件ヒットしました")
                 st.divider()
                 
-                for i, result in enumerate(results):
-                    st.markdown(f"**{i+1}. ファイル名:** {result['filename']}")
-                    st.markdown(f"**スコア:** {result['score']}")
-                    st.text(f"内容: {result['document'][:preview_chars]}...")
-                    st.divider()
+                if group_by_file:
+                    for i, file_hit in enumerate(RAGService.aggregate_by_file(results)):
+                        st.markdown(f"**{i+1}. ファイル名:** {file_hit['filename']}（{file_hit['hit_count']} チャンク）")
+                        st.markdown(f"**スコア:** {file_hit['score']}")
+                        for chunk in file_hit['chunks']:
+                            st.text(f"[チャンク {chunk['chunk_index']}] {chunk['document'][:preview_chars]}...")
+                        st.divider()
+                else:
+                    for i, result in enumerate(results):
+                        st.markdown(f"**{i+1}. ファイル名:** {result['filename']}（チャンク {result['chunk_index']}）")
+                        st.markdown(f"**スコア:** {result['score']}")
+                        if result.get('rerank_score') is not None:
+                            st.markdown(f"**再ランキングスコア:** {result['rerank_score']}")
+                        st.text(f"内容: {result['document'][:preview_chars]}...")
+                        st.divider()
             else:
                 st.info("条件に合致する結果がありません。")
         except Exception as e:
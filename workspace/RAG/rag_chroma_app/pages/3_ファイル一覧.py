@@ -9,77 +9,63 @@ import streamlit as st
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from app import config
-from services.RAG.rag_service import RAGService
-from services.Vector.generic_embedder import GenericEmbedder
-from services.Vector.azure_openai_embedder import AzureOpenAIEmbedder
-from services.Vector.sentence_transformer_service import SentenceTransformerEmbedder
+from streamlit_resources import collection_version, get_rag_service, list_files
 
 
-def create_embedder():
-    """
-    config.yaml の embedder.type に基づいて、適切な Embedder インスタンスを作成する。
-    Returns:
-        BaseEmbedder: GenericEmbedder, AzureOpenAIEmbedder, または SentenceTransformerEmbedder のインスタンス
-    Raises:
-        ValueError: 不正な embedder.type が指定された場合
-    """
-    embedder_type = config.get('embedder', {}).get('type', 'generic')
-    
-    if embedder_type == 'generic':
-        return GenericEmbedder(
-            api_key=config['generic']['api_key'],
-            embedding_url=config['generic']['embedding_url'],
-            model=config['generic']['model']
-        )
-    elif embedder_type == 'azure-openai':
-        return AzureOpenAIEmbedder(
-            api_key=config['azure_openai']['api_key'],
-            endpoint=config['azure_openai']['endpoint'],
-            deployment_name=config['azure_openai']['deployment_name'],
-            api_version=config['azure_openai'].get('api_version', '2024-02-01')
-        )
-    elif embedder_type == 'sentence-transformer':
-        return SentenceTransformerEmbedder(
-            model_name=config['sentence_transformer']['model_name']
-        )
-    else:
-        raise ValueError(f"不正な embedder.type: {embedder_type}。'generic', 'azure-openai', または 'sentence-transformer' を指定してください。")
+st.title("登録ファイル一覧")
 
+# 絞り込み条件はフォームにまとめ、「表示」ボタンを押した場合のみ一覧を取得し直す（入力のたびに再取得しない）
+with st.form("file_filter_form"):
+    col_dir, col_order, col_size = st.columns([4, 2, 2])
+    directory_filter = col_dir.text_input("ディレクトリで絞り込み（空欄で全件）", value="")
+    order_label = col_order.selectbox("並び順", ["新しい順", "古い順"])
+    page_size = col_size.selectbox("表示件数", [50, 100, 200, 500], index=1)
+    submitted = st.form_submit_button("表示")
 
-st.title("登録ファイル一覧")
+# ページ番号は入力欄の作成前に補正する（絞り込み条件・表示件数を変更した場合は1ページ目に戻し、
+# 件数が減って最終ページを超えた場合は最終ページにする）
+if submitted:
+    st.session_state['file_list_page'] = 1
+elif 'file_list_page_clamp' in st.session_state:
+    st.session_state['file_list_page'] = st.session_state.pop('file_list_page_clamp')
+
+# 保存結果のメッセージ（保存後の再実行で表示する）
+if 'dir_save_message' in st.session_state:
+    st.success(st.session_state.pop('dir_save_message'))
 
 # ファイル一覧取得・表示処理
+saved = False
 try:
     """
-    ChromaDBコレクションから全ドキュメントのファイル名を抽出し、リスト表示する。
+    ChromaDBコレクションから表示ページ分のファイル情報（メタデータのみ）を取得し、表形式で表示する。
+    一覧はコレクションのバージョンをキーにキャッシュするため、登録・削除・更新が無い限りコレクションを読み直さない。
     """
-    # config で指定された Embedder を作成
-    embedder = create_embedder()
-    
-    # RAGService を初期化（embedder をインジェクション）
-    rag_service = RAGService(
-        embedder=embedder,
-        chroma_persist_directory=config['chroma']['persist_directory']
+    page = st.number_input("ページ", min_value=1, step=1, key="file_list_page")
+    listing = list_files(
+        collection_version(),
+        offset=(int(page) - 1) * page_size,
+        limit=page_size,
+        directory=directory_filter or None,
+        sort_order="desc" if order_label == "新しい順" else "asc"
     )
-    file_list = rag_service.get_file_list()
+    file_list = listing['files']
+    total_pages = max(1, -(-listing['total_count'] // page_size))
+    if int(page) > total_pages:
+        st.session_state['file_list_page_clamp'] = total_pages
     
     st.subheader("登録済みファイル一覧（表形式）")
+    st.caption(f"全 {listing['total_count']} 件（{int(page)} / {total_pages} ページ）")
     if file_list:
-        # 一括編集用のセッション状態を初期化
-        if 'dir_edits' not in st.session_state or len(st.session_state['dir_edits']) != len(file_list):
-            st.session_state['dir_edits'] = [f['directory'] for f in file_list]
-
-        # テーブルの各行にテキストボックスを配置
         st.caption("※ディレクトリ列を参考にしてください。")
         # st.tableで静的表示
         import pandas as pd
         rows = []
-        for i, file_info in enumerate(file_list):
+        for file_info in file_list:
             rows.append({
                 "ファイル名": file_info['filename'],
-                "ディレクトリ": st.session_state['dir_edits'][i],
-                "登録日時": file_info['created_at']
+                "ディレクトリ": file_info['directory'],
+                "登録日時": file_info['created_at'],
+                "チャンク数": file_info['chunk_count']
             })
         df = pd.DataFrame(rows)
         st.table(df)
@@ -87,25 +73,38 @@ try:
         st.caption("※下の各行でディレクトリを編集後、『すべて保存』ボタンで一括反映できます。")
         st.markdown("---")
         st.write("### ディレクトリ編集欄")
-        for i, file_info in enumerate(file_list):
-            col1, col2, col3 = st.columns([1, 5, 6])
-            col1.write(i+1)
-            col2.write(file_info['filename'])
-            new_dir = col3.text_input("ディレクトリ", value=st.session_state['dir_edits'][i], key=f"edit_dir_{i}")
-            st.session_state['dir_edits'][i] = new_dir
-        
-        # 「すべて保存」ボタンをディレクトリ編集欄の下に配置
-        st.markdown("---")
-        if st.button("すべて保存", key="save_all"):
+        offset = listing['offset']
+        # 編集欄はフォームにまとめ、入力のたびにページを再実行しない
+        with st.form("dir_edit_form"):
+            new_directories = {}
+            for i, file_info in enumerate(file_list):
+                col1, col2, col3 = st.columns([1, 5, 6])
+                col1.write(offset + i + 1)
+                col2.write(file_info['filename'])
+                new_directories[file_info['doc_id']] = col3.text_input(
+                    "ディレクトリ", value=file_info['directory'], key=f"edit_dir_{file_info['doc_id']}")
+            
+            # 「すべて保存」ボタンをディレクトリ編集欄の下に配置
+            st.markdown("---")
+            save = st.form_submit_button("すべて保存")
+        if save:
             try:
+                # 変更された行のみを送信する
                 updates = []
-                for i, file_info in enumerate(file_list):
-                    updates.append({
-                        "doc_id": file_info['doc_id'],
-                        "new_directory": st.session_state['dir_edits'][i]
-                    })
-                rag_service.update_directories(updates)
-                st.success("すべてのディレクトリを更新しました。ページを再読み込みしてください。")
+                for file_info in file_list:
+                    new_directory = new_directories[file_info['doc_id']]
+                    if new_directory != file_info['directory']:
+                        updates.append({
+                            "doc_id": file_info['doc_id'],
+                            "new_directory": new_directory
+                        })
+                if updates:
+                    touched = get_rag_service().update_directories(updates)
+                    st.session_state['dir_save_message'] = (
+                        f"{len(updates)} 件のファイル（{touched} チャンク）のディレクトリを更新しました。")
+                    saved = True
+                else:
+                    st.info("変更されたディレクトリはありません。")
             except Exception as e:
                 st.error(f"保存処理でエラーが発生しました: {e}")
     else:
@@ -113,3 +112,7 @@ try:
 except Exception as e:
     st.error(f"ファイル一覧取得でエラー: {e}")
 
+# 更新によりコレクションのバージョンが進むため、再実行すると更新後の一覧を取得する
+# （最終ページを超えた場合も、補正したページ番号で再実行する）
+if saved or 'file_list_page_clamp' in st.session_state:
+    st.rerun()
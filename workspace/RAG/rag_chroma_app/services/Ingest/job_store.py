@@ -0,0 +1,423 @@
+"""
+登録（ベクトル化）ジョブの永続キュー。
+ジョブとファイルごとの処理状態を SQLite に保存し、登録するテキストはスプールディレクトリのファイルに書き出す。
+Streamlit のセッションや API リクエストとは独立して保持されるため、画面の再実行・切断・プロセス再起動後も処理を継続できる。
+ジョブの取得（claim）は SQLite のトランザクションで排他するため、複数のワーカー（スレッド・プロセス）が同じキューを共有できる。
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# ジョブの状態
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "canceled")
+# 終了状態
+FINISHED_STATUSES = ("succeeded", "failed", "canceled")
+
+_JOB_COLUMNS = (
+    "job_id", "status", "created_at", "started_at", "finished_at", "worker_id", "total_files",
+    "processed_files", "failed_files", "chunks", "chunks_to_embed", "chunks_embedded", "current_file",
+    "cancel_requested", "error", "summary"
+)
+_FILE_COLUMNS = ("seq", "filename", "status", "chunks", "embedded", "error")
+
+
+class JobStore:
+    """
+    SQLite に永続化する登録ジョブのキュー。
+    ジョブは queued → running → succeeded / failed / canceled の順に遷移する。
+    """
+
+    def __init__(self, db_path: str, spool_directory: str):
+        """
+        JobStoreの初期化。
+        Args:
+            db_path (str): ジョブを保存する SQLite ファイルのパス
+            spool_directory (str): 登録テキストを一時保存するディレクトリ
+        Raises:
+            ValueError: db_path または spool_directory が未指定の場合
+        """
+        if not db_path or not spool_directory:
+            raise ValueError("ジョブキューのパス（ingest.job_db, ingest.spool_directory）が未指定である。")
+        self.db_path = db_path
+        self.spool_directory = spool_directory
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        os.makedirs(spool_directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        # API サーバーと Streamlit が同じファイルを共有できるよう WAL モードを使用
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " created_at TEXT NOT NULL,"
+            " started_at TEXT,"
+            " finished_at TEXT,"
+            " worker_id TEXT,"
+            " heartbeat REAL,"
+            " total_files INTEGER NOT NULL,"
+            " processed_files INTEGER NOT NULL DEFAULT 0,"
+            " failed_files INTEGER NOT NULL DEFAULT 0,"
+            " chunks INTEGER NOT NULL DEFAULT 0,"
+            " chunks_to_embed INTEGER NOT NULL DEFAULT 0,"
+            " chunks_embedded INTEGER NOT NULL DEFAULT 0,"
+            " current_file TEXT,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " summary TEXT);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_files ("
+            " job_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " spool_path TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " chunks INTEGER NOT NULL DEFAULT 0,"
+            " embedded INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " PRIMARY KEY (job_id, seq)) WITHOUT ROWID;"
+        )
+
+    def spool_path(self, job_id: str, seq: int) -> str:
+        """
+        ジョブのファイルを保存するスプールファイルのパスを返す。
+        Args:
+            job_id (str): ジョブID
+            seq (int): ジョブ内のファイル番号
+        Returns:
+            str: スプールファイルのパス
+        """
+        return os.path.join(self.spool_directory, job_id, f"{seq:05d}.txt")
+
+    def new_job_id(self) -> str:
+        """
+        新しいジョブIDを生成し、スプールディレクトリを作成する。
+        Returns:
+            str: ジョブID
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.spool_directory, job_id), exist_ok=True)
+        return job_id
+
+    def submit(self, texts: List[str], filenames: List[str]) -> str:
+        """
+        テキストをスプールファイルに書き出し、登録ジョブを追加する。
+        Args:
+            texts (List[str]): 登録するテキストリスト
+            filenames (List[str]): 各テキストに対応するファイル名リスト
+        Returns:
+            str: ジョブID
+        Raises:
+            ValueError: ファイルが0件、または texts と filenames の件数が異なる場合
+        """
+        if len(texts) != len(filenames):
+            raise ValueError(f"texts と filenames の件数が一致しません: {len(texts)} != {len(filenames)}")
+        job_id = self.new_job_id()
+        paths = []
+        for seq, text in enumerate(texts):
+            path = self.spool_path(job_id, seq)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths.append(path)
+        return self.submit_files(job_id, filenames, paths)
+
+    def submit_files(self, job_id: str, filenames: List[str], spool_paths: List[str]) -> str:
+        """
+        スプールファイルに書き出し済みのテキストで登録ジョブを追加する。
+        スプールファイルはジョブ終了時に削除される。
+        Args:
+            job_id (str): new_job_id() で生成したジョブID
+            filenames (List[str]): ファイル名リスト
+            spool_paths (List[str]): 各ファイルのテキストを保存したスプールファイルのパス（UTF-8）
+        Returns:
+            str: ジョブID
+        Raises:
+            ValueError: ファイルが0件、または件数が異なる場合
+        """
+        if not filenames:
+            raise ValueError("登録するファイルが指定されていません。")
+        if len(filenames) != len(spool_paths):
+            raise ValueError(f"filenames と spool_paths の件数が一致しません: {len(filenames)} != {len(spool_paths)}")
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, status, created_at, total_files) VALUES (?, 'queued', ?, ?)",
+                    (job_id, now, len(filenames))
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_files (job_id, seq, filename, spool_path, status) VALUES (?, ?, ?, ?, 'queued')",
+                    [(job_id, seq, fn, path) for seq, (fn, path) in enumerate(zip(filenames, spool_paths))]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        最も古い待機中のジョブを取得し、実行中にする。
+        Args:
+            worker_id (str): 取得するワーカーの識別子
+        Returns:
+            Optional[Dict]: 取得したジョブ（待機中のジョブが無い場合は None）
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            # 書き込みロックを先に取得し、複数のワーカーが同じジョブを取得しないようにする
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = 'queued' AND cancel_requested = 0"
+                    " ORDER BY created_at, rowid LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat = ?,"
+                        " started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                        (worker_id, time.time(), now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def requeue_stale(self, lease_seconds: float) -> int:
+        """
+        一定時間ハートビートが無い実行中のジョブ（ワーカーの異常終了など）を待機中に戻す。
+        完了済みのファイルは再処理しない。
+        Args:
+            lease_seconds (float): ハートビートの有効期間（秒）
+        Returns:
+            int: 待機中に戻したジョブ数
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, cancel_requested FROM jobs WHERE status = 'running' AND heartbeat < ?",
+                (time.time() - lease_seconds,)
+            ).fetchall()
+            requeued = 0
+            for job_id, cancel_requested in rows:
+                if not cancel_requested:
+                    requeued += self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker_id = NULL, current_file = NULL"
+                        " WHERE job_id = ? AND status = 'running'",
+                        (job_id,)
+                    ).rowcount
+        # キャンセル要求済みのジョブは再実行せずにキャンセル済みにする
+        for job_id, cancel_requested in rows:
+            if cancel_requested:
+                self.finish_job(job_id, "canceled")
+        return requeued
+
+    def pending_files(self, job_id: str) -> List[Dict]:
+        """
+        ジョブの未処理ファイルを返す。
+        Args:
+            job_id (str): ジョブID
+        Returns:
+            List[Dict]: {"seq", "filename", "spool_path"} のリスト（ファイル番号順）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, filename, spool_path FROM job_files WHERE job_id = ? AND status = 'queued' ORDER BY seq",
+                (job_id,)
+            ).fetchall()
+        return [{"seq": seq, "filename": fn, "spool_path": path} for seq, fn, path in rows]
+
+    def update_progress(self, job_id: str, worker_id: str, current_file: str = None, chunks_to_embed: int = 0,
+                        chunks_embedded: int = 0) -> bool:
+        """
+        ジョブの進捗を加算し、ハートビートを更新する。
+        Args:
+            job_id (str): ジョブID
+            worker_id (str): 処理中のワーカーの識別子
+            current_file (str, optional): 処理中のファイル名
+            chunks_to_embed (int): ベクトル化対象のチャンク数の増分
+            chunks_embedded (int): ベクトル化済みのチャンク数の増分
+        Returns:
+            bool: 処理を続行してよい場合は True（キャンセル要求がある、または他のワーカーに引き継がれた場合は False）
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat = ?, current_file = COALESCE(?, current_file),"
+                " chunks_to_embed = chunks_to_embed + ?, chunks_embedded = chunks_embedded + ?"
+                " WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (time.time(), current_file, chunks_to_embed, chunks_embedded, job_id, worker_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return not row[0]
+
+    def finish_files(self, job_id: str, results: List[Dict]) -> None:
+        """
+        ファイルの処理結果を記録し、ジョブの処理済みファイル数に加算する。
+        Args:
+            job_id (str): ジョブID
+            results (List[Dict]): {"seq", "status"（"succeeded" / "failed"）, "chunks", "embedded", "error"} のリスト
+        """
+        if not results:
+            return
+        failed = sum(1 for r in results if r["status"] == "failed")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE job_files SET status = ?, chunks = ?, embedded = ?, error = ? WHERE job_id = ? AND seq = ?",
+                    [(r["status"], r.get("chunks", 0), r.get("embedded", 0), r.get("error"), job_id, r["seq"])
+                     for r in results]
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET processed_files = processed_files + ?, failed_files = failed_files + ?,"
+                    " chunks = chunks + ?, heartbeat = ? WHERE job_id = ?",
+                    (len(results), failed, sum(r.get("chunks", 0) for r in results), time.time(), job_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def finish_job(self, job_id: str, status: str, error: str = None, summary: Dict = None) -> None:
+        """
+        ジョブを終了状態にし、スプールファイルを削除する。
+        Args:
+            job_id (str): ジョブID
+            status (str): 終了状態（"succeeded", "failed", "canceled"）
+            error (str, optional): エラー内容
+            summary (Dict, optional): 登録結果の集計
+        Raises:
+            ValueError: 不正な status が指定された場合
+        """
+        if status not in FINISHED_STATUSES:
+            raise ValueError(f"status は {', '.join(FINISHED_STATUSES)} のいずれかである必要があります: {status}")
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, current_file = NULL, error = ?, summary = ?"
+                    " WHERE job_id = ?",
+                    (status, now, error, json.dumps(summary) if summary is not None else None, job_id)
+                )
+                self._conn.execute(
+                    "UPDATE job_files SET status = 'canceled' WHERE job_id = ? AND status = 'queued'", (job_id,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.remove_spool(job_id)
+
+    def remove_spool(self, job_id: str) -> None:
+        """
+        ジョブのスプールファイルを削除する（ジョブ作成に失敗した場合の後始末にも使用する）。
+        Args:
+            job_id (str): ジョブID
+        """
+        shutil.rmtree(os.path.join(self.spool_directory, job_id), ignore_errors=True)
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        ジョブをキャンセルする。
+        待機中のジョブはすぐにキャンセル済みにし、実行中のジョブはキャンセルを要求する
+        （ワーカーは処理中のファイルの登録前に中断する。登録済みのファイルは元に戻さない）。
+        Args:
+            job_id (str): ジョブID
+        Returns:
+            Optional[Dict]: キャンセル後のジョブ（存在しない場合は None）
+        """
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN ('queued', 'running')",
+                               (job_id,))
+            row = self._conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row[0] == "queued":
+            self.finish_job(job_id, "canceled")
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_files: bool = False) -> Optional[Dict]:
+        """
+        ジョブの状態を返す。
+        Args:
+            job_id (str): ジョブID
+            include_files (bool): ファイルごとの状態（"files"）を含めるか
+        Returns:
+            Optional[Dict]: ジョブ（存在しない場合は None）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            files = None
+            if row is not None and include_files:
+                files = self._conn.execute(
+                    f"SELECT {', '.join(_FILE_COLUMNS)} FROM job_files WHERE job_id = ? ORDER BY seq", (job_id,)
+                ).fetchall()
+        if row is None:
+            return None
+        job = self._to_job(row)
+        if files is not None:
+            job["files"] = [dict(zip(_FILE_COLUMNS, f)) for f in files]
+        return job
+
+    def list_jobs(self, limit: int = 20, status: str = None) -> List[Dict]:
+        """
+        ジョブを新しい順に返す。
+        Args:
+            limit (int): 返却する最大件数
+            status (str, optional): 状態で絞り込む場合に指定
+        Returns:
+            List[Dict]: ジョブのリスト
+        """
+        sql = f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs"
+        params = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def close(self) -> None:
+        """SQLite 接続を閉じる。"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_job(row) -> Dict:
+        """jobs テーブルの行を辞書に変換する。内部メソッド。"""
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["summary"] = json.loads(job["summary"]) if job["summary"] else None
+        return job
+
+
+def create_job_store(config: dict) -> JobStore:
+    """
+    config.yaml の ingest セクションから JobStore を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        JobStore: ジョブキュー
+    """
+    ingest_config = (config or {}).get('ingest', {}) or {}
+    return JobStore(
+        db_path=ingest_config.get('job_db', '../ingest_jobs.sqlite3'),
+        spool_directory=ingest_config.get('spool_directory', '../ingest_spool')
+    )
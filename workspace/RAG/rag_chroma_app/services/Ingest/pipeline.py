@@ -0,0 +1,356 @@
+"""
+登録処理のパイプライン。
+テキスト抽出 → チャンク分割・差分判定 → ベクトル化 → ChromaDB 書き込みの各段階を上限付きキューでつなぎ、
+段階ごとのスレッドで並行に処理する。キューが一杯になると前段が待機する（バックプレッシャー）ため、
+処理中のデータ量は queue_size に比例する範囲に抑えられ、全体の処理時間は最も遅い段階の処理時間に近づく。
+書き込みはユニット（数ファイル分）ごとにコミットするため、中断しても処理済みのファイルは登録済みとなる。
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from services.metrics import INGEST_SECONDS, record_ingest_throughput
+
+# 段階の終了を下流に伝える目印
+_DONE = object()
+# 異常終了時に待機中のスレッドを解放するための目印
+_ABORTED = object()
+
+
+class IngestPipeline:
+    """
+    RAGService の登録処理（plan_registration / commit_registration）を段階ごとに並行実行するパイプライン。
+    - extract: load(item) でテキストを取得する（extract_workers スレッド）
+    - plan: チャンク分割と既存レコードとの差分判定を行い、ベクトル化対象のチャンク数が embed_batch_size に
+      達するまでファイルをまとめてユニットにする（1スレッド）
+    - embed: ユニットの変更チャンクをベクトル化する（embed_workers スレッド）
+    - commit: ユニットを入力順に ChromaDB・語彙インデックスへ書き込む（呼び出し元のスレッド）
+    """
+
+    def __init__(self, rag_service, extract_workers: int = 2, embed_workers: int = 2, embed_batch_size: int = 64,
+                 file_batch_size: int = 8, queue_size: int = 4):
+        """
+        IngestPipelineの初期化。
+        Args:
+            rag_service (RAGService): 登録先の RAGService
+            extract_workers (int): テキスト抽出のスレッド数
+            embed_workers (int): ベクトル化のスレッド数
+            embed_batch_size (int): 1回でベクトル化するチャンク数（ユニットの大きさの目安）
+            file_batch_size (int): 1ユニットにまとめる最大ファイル数
+            queue_size (int): 段階間のキューの上限（ファイル数またはユニット数）
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
+        """
+        for name, value in (("extract_workers", extract_workers), ("embed_workers", embed_workers),
+                            ("embed_batch_size", embed_batch_size), ("file_batch_size", file_batch_size),
+                            ("queue_size", queue_size)):
+            if value < 1:
+                raise ValueError(f"ingest.{name} は1以上である必要があります: {value}")
+        self.rag_service = rag_service
+        self.extract_workers = extract_workers
+        self.embed_workers = embed_workers
+        self.embed_batch_size = embed_batch_size
+        self.file_batch_size = file_batch_size
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable[Dict], load: Callable[[Dict], str],
+            on_committed: Callable[[List[Dict]], None] = None,
+            on_embedded: Callable[[int, int], None] = None,
+            should_stop: Callable[[], bool] = None) -> Dict:
+        """
+        パイプラインを実行し、全ファイルの登録が終わるまで待つ。
+        Args:
+            items (Iterable[Dict]): 登録するファイル（"filename" を含む辞書。その他のキーは結果にそのまま引き継ぐ）。
+                ユニットをまたいだ差分判定が正しく行われるよう、ファイル名は重複しないこと
+            load (Callable[[Dict], str]): ファイルのテキストを返す関数（extract 段階で呼び出す）
+            on_committed (Callable[[List[Dict]], None], optional): ユニットの書き込み後に、各ファイルの結果
+                （item に "status"（"succeeded" / "failed"）, "chunks", "embedded", "error" を加えた辞書）で呼び出す
+            on_embedded (Callable[[int, int], None], optional): ベクトル化の進捗を (ベクトル化したチャンク数の増分,
+                ベクトル化対象のチャンク数の増分) で呼び出す（embed 段階のスレッドから呼び出される）
+            should_stop (Callable[[], bool], optional): True を返すと新しいファイルの投入とベクトル化を止める
+                （ベクトル化済みのユニットは書き込む）
+        Returns:
+            Dict: 登録結果（{"files", "chunks", "embedded", "tokens", "unchanged_files", "deleted", "failed_files",
+                  "canceled"}。tokens はベクトル化したチャンクの推定トークン数）
+        Raises:
+            Exception: いずれかの段階で回復できないエラーが発生した場合
+        """
+        should_stop = should_stop or (lambda: False)
+        started = time.perf_counter()
+        abort = threading.Event()
+        stopped = threading.Event()
+        inputs = queue.Queue(self.queue_size)
+        extracted = queue.Queue(self.queue_size)
+        units = queue.Queue(self.queue_size)
+        embedded = queue.Queue(self.queue_size)
+        errors: List[BaseException] = []
+
+        def guarded(func):
+            # 段階のスレッドで想定外の例外が発生した場合は全段階を止め、呼び出し元で送出する
+            def target(*args):
+                try:
+                    func(*args)
+                except BaseException as e:
+                    errors.append(e)
+                    abort.set()
+            return target
+
+        def check_stop() -> bool:
+            if not stopped.is_set() and should_stop():
+                stopped.set()
+            return stopped.is_set()
+
+        def feed():
+            for index, item in enumerate(items):
+                if check_stop() or not self._put(inputs, (index, item), abort):
+                    break
+            for _ in range(self.extract_workers):
+                self._put(inputs, _DONE, abort)
+
+        def extract():
+            while True:
+                entry = self._get(inputs, abort)
+                if entry is _DONE or entry is _ABORTED:
+                    self._put(extracted, _DONE, abort)
+                    return
+                index, item = entry
+                try:
+                    self._put(extracted, (index, item, load(item), None), abort)
+                except Exception as e:
+                    self._put(extracted, (index, item, None, e), abort)
+
+        def plan():
+            pending: Dict[int, tuple] = {}
+            next_index = 0
+            finished = 0
+            group: List[tuple] = []
+            unit_id = 0
+            while finished < self.extract_workers:
+                entry = self._get(extracted, abort)
+                if entry is _ABORTED:
+                    return
+                if entry is _DONE:
+                    finished += 1
+                else:
+                    pending[entry[0]] = entry
+                # 抽出は並行に行うため、入力順に並べ直してからユニットにまとめる
+                while next_index in pending:
+                    group.append(pending.pop(next_index))
+                    next_index += 1
+                    if self._group_full(group):
+                        self._put(units, self._make_unit(unit_id, group), abort)
+                        unit_id += 1
+                        group = []
+                # 後続の入力が届いていない場合は待たずにまとめたファイルを流す
+                if group and extracted.empty():
+                    self._put(units, self._make_unit(unit_id, group), abort)
+                    unit_id += 1
+                    group = []
+            if group:
+                self._put(units, self._make_unit(unit_id, group), abort)
+            for _ in range(self.embed_workers):
+                self._put(units, _DONE, abort)
+
+        def embed():
+            while True:
+                unit = self._get(units, abort)
+                if unit is _DONE or unit is _ABORTED:
+                    self._put(embedded, _DONE, abort)
+                    return
+                if unit["error"] is None and unit["to_embed"]:
+                    if check_stop():
+                        unit["canceled"] = True
+                    else:
+                        try:
+                            unit["embeddings"] = self._embed(unit["to_embed"], on_embedded)
+                        except Exception as e:
+                            unit["error"] = e
+                self._put(embedded, unit, abort)
+
+        threads = [threading.Thread(target=guarded(feed), name="rag-pipeline-feed", daemon=True),
+                   threading.Thread(target=guarded(plan), name="rag-pipeline-plan", daemon=True)]
+        threads += [threading.Thread(target=guarded(extract), name=f"rag-pipeline-extract-{i}", daemon=True)
+                    for i in range(self.extract_workers)]
+        threads += [threading.Thread(target=guarded(embed), name=f"rag-pipeline-embed-{i}", daemon=True)
+                    for i in range(self.embed_workers)]
+        for thread in threads:
+            thread.start()
+
+        totals = {"files": 0, "chunks": 0, "embedded": 0, "tokens": 0, "unchanged_files": 0, "deleted": 0,
+                  "failed_files": 0}
+        try:
+            self._commit_all(embedded, abort, totals, on_committed)
+        except BaseException as e:
+            errors.append(e)
+            abort.set()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        totals["canceled"] = stopped.is_set()
+        record_ingest_throughput(totals["embedded"], totals["tokens"], totals["files"], time.perf_counter() - started)
+        return totals
+
+    def _commit_all(self, embedded: queue.Queue, abort: threading.Event, totals: Dict,
+                    on_committed: Callable[[List[Dict]], None]) -> None:
+        """
+        ベクトル化済みのユニットを入力順に書き込む（commit 段階）。内部メソッド。
+        """
+        pending: Dict[int, Dict] = {}
+        next_id = 0
+        finished = 0
+        while finished < self.embed_workers:
+            unit = self._get(embedded, abort)
+            if unit is _ABORTED:
+                return
+            if unit is _DONE:
+                finished += 1
+                continue
+            pending[unit["id"]] = unit
+            # 同じファイル名が複数のユニットに含まれる場合も後の入力が優先されるよう、入力順に書き込む
+            while next_id in pending:
+                unit = pending.pop(next_id)
+                next_id += 1
+                if unit.get("canceled"):
+                    continue
+                results = self._commit_unit(unit, totals)
+                if on_committed is not None and results:
+                    on_committed(results)
+
+    def _commit_unit(self, unit: Dict, totals: Dict) -> List[Dict]:
+        """
+        ユニットを書き込み、ファイルごとの結果を返す。内部メソッド。
+        複数ファイルのユニットでベクトル化・書き込みに失敗した場合は1ファイルずつ登録し直し、失敗したファイルのみをエラーとする。
+        """
+        results = [self._failed(item, error) for item, error in unit["failed"]]
+        # 同じユニット内の同名ファイルは後の入力のみを登録する
+        results.extend(dict(item, status="succeeded", chunks=0, embedded=0, error=None)
+                       for item in unit.get("superseded", []))
+        if unit["plans"]:
+            try:
+                if unit["error"] is not None:
+                    raise unit["error"]
+                results.extend(self._commit_plans(unit["items"], unit["plans"], unit.get("embeddings", []), totals))
+            except Exception as e:
+                if len(unit["plans"]) == 1:
+                    results.append(self._failed(unit["items"][0], e))
+                else:
+                    for item, plan in zip(unit["items"], unit["plans"]):
+                        try:
+                            to_embed = [plan["texts"][i] for i in plan["changed"]]
+                            embeddings = self.rag_service.embedder.embed_array(to_embed)
+                            results.extend(self._commit_plans([item], [plan], embeddings, totals))
+                        except Exception as retry_error:
+                            results.append(self._failed(item, retry_error))
+        totals["failed_files"] += sum(1 for r in results if r["status"] == "failed")
+        return results
+
+    def _commit_plans(self, items: List[Dict], plans: List[Dict], embeddings: np.ndarray,
+                      totals: Dict) -> List[Dict]:
+        """登録計画を書き込み、集計に加算してファイルごとの結果を返す。内部メソッド。"""
+        summary = self.rag_service.commit_registration(plans, embeddings)
+        for key in ("files", "chunks", "embedded", "tokens", "unchanged_files", "deleted"):
+            totals[key] += summary[key]
+        return [
+            dict(item, status="succeeded", chunks=len(plan["ids"]), embedded=len(plan["changed"]), error=None)
+            for item, plan in zip(items, plans)
+        ]
+
+    def _make_unit(self, unit_id: int, group: List[tuple]) -> Dict:
+        """
+        抽出済みのファイルをチャンク分割・差分判定してユニットにする（plan 段階）。内部メソッド。
+        """
+        unit = {"id": unit_id, "items": [], "plans": [], "to_embed": [], "failed": [], "error": None}
+        ok = [(item, text) for _, item, text, error in group if error is None]
+        unit["failed"] = [(item, error) for _, item, _, error in group if error is not None]
+        if not ok:
+            return unit
+        try:
+            plans = self.rag_service.plan_registration([text for _, text in ok], [item["filename"] for item, _ in ok])
+        except Exception as e:
+            unit["failed"].extend((item, e) for item, _ in ok)
+            return unit
+        # plan_registration は同名ファイルを1件にまとめるため、計画に対応するファイルのみを残す（後の入力を優先）
+        items_by_name = {item["filename"]: item for item, _ in ok}
+        unit["items"] = [items_by_name[plan["filename"]] for plan in plans]
+        unit["plans"] = plans
+        unit["to_embed"] = [plan["texts"][i] for plan in plans for i in plan["changed"]]
+        unit["superseded"] = [item for item, _ in ok if items_by_name[item["filename"]] is not item]
+        return unit
+
+    def _group_full(self, group: List[tuple]) -> bool:
+        """ユニットにまとめるファイル数・テキスト量が上限に達したかを判定する。内部メソッド。"""
+        if len(group) >= self.file_batch_size:
+            return True
+        chunk_size = getattr(self.rag_service.chunker, "chunk_size", 0) or 0
+        if chunk_size <= 0:
+            return False
+        # チャンク分割前のため、テキスト長からチャンク数を見積もる
+        estimated = sum(len(text or "") for _, _, text, _ in group) / chunk_size
+        return estimated >= self.embed_batch_size
+
+    def _embed(self, texts: List[str], on_embedded: Callable[[int, int], None]) -> np.ndarray:
+        """
+        ユニットの変更チャンクを embed_batch_size ずつベクトル化する（embed 段階）。内部メソッド。
+        埋め込みは numpy 配列のまま commit 段階に渡す。
+        """
+        if on_embedded is not None:
+            on_embedded(0, len(texts))
+        batches = []
+        with INGEST_SECONDS.time(stage="embed"):
+            for start in range(0, len(texts), self.embed_batch_size):
+                batch = texts[start:start + self.embed_batch_size]
+                batches.append(self.rag_service.embedder.embed_array(batch))
+                if on_embedded is not None:
+                    on_embedded(len(batch), 0)
+        return np.concatenate(batches) if batches else self.rag_service.embedder.embed_array([])
+
+    @staticmethod
+    def _failed(item: Dict, error: BaseException) -> Dict:
+        """失敗したファイルの結果を作成する。内部メソッド。"""
+        return dict(item, status="failed", chunks=0, embedded=0, error=str(error))
+
+    @staticmethod
+    def _put(q: queue.Queue, value, abort: threading.Event) -> bool:
+        """キューに空きができるまで待って追加する（異常終了時は False を返す）。内部メソッド。"""
+        while not abort.is_set():
+            try:
+                q.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(q: queue.Queue, abort: threading.Event):
+        """キューから取り出す（異常終了時は _ABORTED を返す）。内部メソッド。"""
+        while not abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _ABORTED
+
+
+def create_pipeline(config: dict, rag_service) -> IngestPipeline:
+    """
+    config.yaml の ingest セクションから IngestPipeline を作成する。
+    Args:
+        config (dict): 設定値辞書
+        rag_service (RAGService): 登録先の RAGService
+    Returns:
+        IngestPipeline: 登録パイプライン
+    """
+    ingest_config = (config or {}).get('ingest', {}) or {}
+    return IngestPipeline(
+        rag_service,
+        extract_workers=int(ingest_config.get('extract_workers', 2)),
+        embed_workers=int(ingest_config.get('embed_workers', 2)),
+        embed_batch_size=int(ingest_config.get('embed_batch_size', 64)),
+        file_batch_size=int(ingest_config.get('file_batch_size', 8)),
+        queue_size=int(ingest_config.get('queue_size', 4))
+    )
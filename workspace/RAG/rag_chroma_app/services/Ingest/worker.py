@@ -0,0 +1,217 @@
+"""
+登録ジョブを処理するバックグラウンドワーカー。
+JobStore から待機中のジョブを取得し、IngestPipeline（抽出・ベクトル化・書き込みを並行に行う）で登録する。
+ファイルごとの処理結果と、チャンク単位のベクトル化の進捗を JobStore に記録する。
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from services.Ingest.job_store import JobStore
+from services.Ingest.pipeline import IngestPipeline
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWorkerPool:
+    """
+    登録ジョブを処理するワーカースレッドのプール。
+    各スレッドは独立してジョブを取得するため、同じ JobStore を共有する複数のプロセス
+    （API サーバーと Streamlit など）でそれぞれプールを起動しても同じジョブを二重に処理しない。
+    """
+
+    def __init__(self, store: JobStore, service_provider: Callable[[], object], workers: int = 1,
+                 file_batch_size: int = 8, embed_batch_size: int = 64, poll_interval: float = 1.0,
+                 lease_seconds: float = 300, extract_workers: int = 2, embed_workers: int = 2, queue_size: int = 4):
+        """
+        IngestWorkerPoolの初期化。
+        Args:
+            store (JobStore): ジョブキュー
+            service_provider (Callable[[], RAGService]): 登録に使用する RAGService を返す関数
+                                                         （設定の再読み込みで差し替えられた場合も最新のものを使用する）
+            workers (int): ワーカースレッド数（0 の場合は起動しない）
+            file_batch_size (int): 1回の書き込みにまとめる最大ファイル数
+            embed_batch_size (int): 1回でベクトル化するチャンク数
+            poll_interval (float): 待機中のジョブが無い場合の確認間隔（秒）
+            lease_seconds (float): この時間ハートビートが無い実行中のジョブを再実行の対象とする（秒）
+            extract_workers (int): 1ジョブあたりのテキスト読み込みのスレッド数
+            embed_workers (int): 1ジョブあたりのベクトル化のスレッド数
+            queue_size (int): パイプラインの段階間のキューの上限
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
+        """
+        if workers < 0:
+            raise ValueError(f"ingest.workers は0以上である必要があります: {workers}")
+        if file_batch_size < 1 or embed_batch_size < 1:
+            raise ValueError("ingest.file_batch_size, ingest.embed_batch_size は1以上である必要があります。")
+        self.store = store
+        self.service_provider = service_provider
+        self.workers = workers
+        self.file_batch_size = file_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.extract_workers = extract_workers
+        self.embed_workers = embed_workers
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # プロセス・スレッドをまたいで一意なワーカー識別子の接頭辞
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def start(self) -> None:
+        """ワーカースレッドを起動する（起動済みの場合は何もしない）。"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{self._worker_prefix}:{i}",),
+                                      name=f"rag-ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        ワーカースレッドを停止する。処理中のジョブは lease_seconds 経過後に他のワーカーが再開する。
+        Args:
+            timeout (float): 各スレッドの終了を待つ最大時間（秒）
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self, worker_id: str = None) -> Optional[Dict]:
+        """
+        待機中のジョブを1件取得して処理する。
+        Args:
+            worker_id (str, optional): ワーカー識別子
+        Returns:
+            Optional[Dict]: 処理したジョブの最終状態（待機中のジョブが無い場合は None）
+        """
+        worker_id = worker_id or f"{self._worker_prefix}:once"
+        self.store.requeue_stale(self.lease_seconds)
+        job = self.store.claim(worker_id)
+        if job is None:
+            return None
+        try:
+            self._process(job["job_id"], worker_id)
+        except Exception as e:
+            # 取得したジョブが lease_seconds の経過まで実行中のまま残らないよう、失敗として記録する
+            logger.exception("登録ジョブの処理でエラー（%s, %s）", job["job_id"], worker_id)
+            self._fail_claimed(job["job_id"], worker_id, f"{type(e).__name__}: {e}")
+        return self.store.get(job["job_id"])
+
+    def _fail_claimed(self, job_id: str, worker_id: str, error: str) -> None:
+        """
+        このワーカーが実行中のジョブを失敗として記録する（他のワーカーに引き継がれた場合は変更しない）。内部メソッド。
+        Args:
+            job_id (str): ジョブID
+            worker_id (str): ワーカー識別子
+            error (str): エラー内容
+        """
+        try:
+            job = self.store.get(job_id)
+            if job is not None and job["status"] == "running" and job["worker_id"] == worker_id:
+                self.store.finish_job(job_id, "failed", error=error)
+        except Exception:
+            # ジョブキュー自体に書き込めない場合は lease_seconds 経過後の再実行に任せる
+            logger.exception("登録ジョブの失敗を記録できませんでした（%s）", job_id)
+
+    def _run(self, worker_id: str) -> None:
+        """ワーカースレッドのメインループ。内部メソッド。"""
+        while not self._stop.is_set():
+            try:
+                job = self.run_once(worker_id)
+            except Exception:
+                logger.exception("登録ワーカーでエラー（%s）", worker_id)
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+
+    def _process(self, job_id: str, worker_id: str) -> None:
+        """
+        ジョブの未処理ファイルを登録パイプラインで登録する。
+        内部メソッド。登録はユニット（数ファイル）単位でコミットされるため、中断・再開時は未処理のファイルのみを処理する。
+        Args:
+            job_id (str): ジョブID
+            worker_id (str): ワーカー識別子
+        """
+        files = self.store.pending_files(job_id)
+        # 同名のファイルは後のもののみを登録する（前のものは登録済みとして扱う）
+        latest = {file["filename"]: file for file in files}
+        superseded = [file for file in files if latest[file["filename"]] is not file]
+        if superseded:
+            self.store.finish_files(job_id, [{"seq": f["seq"], "status": "succeeded"} for f in superseded])
+
+        def load(file: Dict) -> str:
+            with open(file["spool_path"], "r", encoding="utf-8") as f:
+                return f.read()
+
+        def on_embedded(embedded: int, to_embed: int) -> None:
+            self.store.update_progress(job_id, worker_id, chunks_to_embed=to_embed, chunks_embedded=embedded)
+
+        def on_committed(results: List[Dict]) -> None:
+            self.store.finish_files(job_id, results)
+            self.store.update_progress(job_id, worker_id, current_file=results[-1]["filename"])
+
+        def should_stop() -> bool:
+            # キャンセル要求がある、または他のワーカーに引き継がれた場合は中断する
+            return not self.store.update_progress(job_id, worker_id)
+
+        pipeline = IngestPipeline(
+            self.service_provider(),
+            extract_workers=self.extract_workers,
+            embed_workers=self.embed_workers,
+            embed_batch_size=self.embed_batch_size,
+            file_batch_size=self.file_batch_size,
+            queue_size=self.queue_size
+        )
+        try:
+            totals = pipeline.run(list(latest.values()), load, on_committed=on_committed,
+                                  on_embedded=on_embedded, should_stop=should_stop)
+        except Exception as e:
+            logger.exception("登録パイプラインでエラー（%s）", job_id)
+            self.store.finish_job(job_id, "failed", error=str(e))
+            return
+
+        summary = {key: totals[key] for key in ("chunks", "embedded", "unchanged_files", "deleted")}
+        job = self.store.get(job_id)
+        if totals["canceled"]:
+            # 他のワーカーに引き継がれた場合は状態を変更しない
+            if job is not None and job["status"] == "running" and job["worker_id"] == worker_id:
+                self.store.finish_job(job_id, "canceled", summary=summary)
+        elif job["failed_files"]:
+            self.store.finish_job(job_id, "failed", error=f"{job['failed_files']} 件のファイルの登録に失敗しました。",
+                                  summary=summary)
+        else:
+            self.store.finish_job(job_id, "succeeded", summary=summary)
+
+
+def create_worker_pool(config: dict, store: JobStore, service_provider: Callable[[], object]) -> IngestWorkerPool:
+    """
+    config.yaml の ingest セクションから IngestWorkerPool を作成する（起動は start() で行う）。
+    Args:
+        config (dict): 設定値辞書
+        store (JobStore): ジョブキュー
+        service_provider (Callable[[], RAGService]): 登録に使用する RAGService を返す関数
+    Returns:
+        IngestWorkerPool: ワーカープール
+    """
+    ingest_config = (config or {}).get('ingest', {}) or {}
+    return IngestWorkerPool(
+        store=store,
+        service_provider=service_provider,
+        workers=int(ingest_config.get('workers', 1)),
+        file_batch_size=int(ingest_config.get('file_batch_size', 8)),
+        embed_batch_size=int(ingest_config.get('embed_batch_size', 64)),
+        poll_interval=float(ingest_config.get('poll_interval_seconds', 1.0)),
+        lease_seconds=float(ingest_config.get('lease_seconds', 300)),
+        extract_workers=int(ingest_config.get('extract_workers', 2)),
+        embed_workers=int(ingest_config.get('embed_workers', 2)),
+        queue_size=int(ingest_config.get('queue_size', 4))
+    )
@@ -5,7 +5,12 @@ ChromaDBの管理を行うクラス群。
 """
 
 import chromadb
-from typing import List
+from typing import Dict, List
+
+from services.RAG.collection_factory import open_collection
+from services.RAG.document_id import content_hash, make_doc_id
+from services.RAG.scoring import normalize_vectors
+from services.metrics import InstrumentedCollection
 
 
 class ChromaManager:
@@ -14,33 +19,47 @@ class ChromaManager:
     ドキュメントの追加・検索・削除などの操作を提供する。
     """
 
-    def __init__(self, persist_directory: str):
+    def __init__(self, persist_directory: str, collection_settings: Dict = None):
         """
         ChromaDBの永続化ディレクトリを指定して初期化する。
         PersistentClientを利用し、指定パスにベクトルストアを永続化する。
         Args:
             persist_directory (str): ChromaDBの永続化ディレクトリパス
+            collection_settings (Dict, optional): create_collection_settings() で作成したコレクション設定
         Raises:
             ValueError: persist_directoryが未指定の場合
         """
         if not persist_directory:
             raise ValueError("ChromaDBの永続化ディレクトリ（persist_directory）が未指定である。設定ファイルで明示的に指定すること。")
         self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection("rag_collection")
+        collection, self.space = open_collection(self.client, collection_settings)
+        # コレクション操作ごとの所要時間を services.metrics に記録する
+        self.collection = InstrumentedCollection(collection)
+        self.normalize = bool((collection_settings or {}).get("normalize", False))
 
-    def add_documents(self, texts: List[str], metadatas: List[dict] = None, embeddings: List[List[float]] = None):
+    def add_documents(self, texts: List[str], metadatas: List[dict] = None, embeddings: List[List[float]] = None,
+                      ids: List[str] = None):
         """
-        ドキュメントをChromaDBコレクションに追加する。
+        ドキュメントをChromaDBコレクションに登録する（同じIDが存在する場合は上書き）。
         必要に応じてメタデータや埋め込みベクトルも同時に登録可能。
         Args:
             texts (List[str]): 登録するテキストリスト
             metadatas (List[dict], optional): 各テキストに対応するメタデータ辞書リスト
             embeddings (List[List[float]], optional): 各テキストの埋め込みベクトル
+            ids (List[str], optional): ドキュメントIDリスト（未指定時はファイル名・チャンク番号、無ければ本文ハッシュから生成）
         """
-        ids = [f"doc_{i}" for i in range(len(texts))]
-        self.collection.add(
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [
+                make_doc_id(meta["filename"], meta.get("chunk_index", 0)) if meta.get("filename")
+                else content_hash(text)
+                for text, meta in zip(texts, metadatas)
+            ]
+        if self.normalize and embeddings is not None and len(embeddings):
+            embeddings = normalize_vectors(embeddings)
+        self.collection.upsert(
             documents=texts,
-            metadatas=metadatas or [{} for _ in texts],
+            metadatas=metadatas,
             ids=ids,
             embeddings=embeddings
         )
@@ -55,6 +74,8 @@ class ChromaManager:
         Returns:
             dict: 検索結果（ドキュメント・メタデータ・スコア等）
         """
+        if self.normalize and embeddings is not None and len(embeddings):
+            embeddings = normalize_vectors(embeddings)
         return self.collection.query(
             query_texts=query_texts,
             n_results=n_results,
@@ -67,13 +88,8 @@ class ChromaManager:
         Args:
             filename (str): 削除対象のファイル名
         """
-        ids_to_delete = []
-        all = self.collection.get()
-        for doc_id, meta in zip(all.get('ids', []), all.get('metadatas', [])):
-            if meta.get('filename') == filename:
-                ids_to_delete.append(doc_id)
-        if ids_to_delete:
-            self.collection.delete(ids=ids_to_delete)
+        # where 条件付き削除（コレクション全体の走査は行わない）
+        self.collection.delete(where={"filename": filename})
 
     def update_metadata(self, doc_id: str, new_metadata: dict):
         """
@@ -0,0 +1,201 @@
+"""
+テキスト分割（チャンキング）クラス。
+長いドキュメントを検索可能な複数のパッセージに分割し、各チャンクの位置情報を保持する。
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# 段落区切り（空行）
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t　]*\n")
+# 文区切り（日本語の句点・感嘆符・疑問符の直後、英語の文末記号＋空白、改行）
+_SENTENCE_BREAK = re.compile(r"(?<=[。！？!?])|(?<=[.])(?=\s)|\n")
+# トークン（英数字の連続は1トークン、それ以外の記号・CJK文字は1文字1トークン）
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+Span = Tuple[int, int]
+
+
+class TextChunker:
+    """
+    テキストをチャンクに分割するクラス。
+
+    分割方式:
+    - paragraph: 空行区切りの段落を chunk_size 文字以内にまとめる（長い段落は文単位に分割）
+    - sentence: 文単位で chunk_size 文字以内にまとめる
+    - token: chunk_size トークンの固定長ウィンドウで分割する
+    - none: 分割しない（テキスト全体を1チャンクとする）
+
+    chunk_overlap を指定すると、直前のチャンク末尾をその分だけ次のチャンクの先頭に重複させる
+    （paragraph/sentence は文字数、token はトークン数）。
+    """
+
+    STRATEGIES = ("paragraph", "sentence", "token", "none")
+
+    def __init__(self, strategy: str = "paragraph", chunk_size: int = 800, chunk_overlap: int = 100):
+        """
+        TextChunkerの初期化。
+        Args:
+            strategy (str): 分割方式（"paragraph", "sentence", "token", "none"）
+            chunk_size (int): 1チャンクの最大サイズ（paragraph/sentence は文字数、token はトークン数）
+            chunk_overlap (int): チャンク間の重複サイズ（chunk_size 未満）
+        Raises:
+            ValueError: 不正な分割方式・サイズが指定された場合
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"不正な chunking.strategy: {strategy}。{', '.join(self.STRATEGIES)} のいずれかを指定してください。")
+        if chunk_size < 1:
+            raise ValueError(f"chunking.chunk_size は1以上である必要があります: {chunk_size}")
+        if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+            raise ValueError(f"chunking.chunk_overlap は0以上 chunk_size 未満である必要があります: {chunk_overlap}")
+        self.strategy = strategy
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def chunk(self, text: str) -> List[Dict]:
+        """
+        テキストをチャンクに分割する。
+        空のテキストでもファイルを登録できるよう、必ず1件以上のチャンクを返す。
+        Args:
+            text (str): 分割対象のテキスト
+        Returns:
+            List[Dict]: チャンクリスト（各要素は{"text", "chunk_index", "start_char", "end_char"}を含む辞書）
+        """
+        text = text or ""
+        if self.strategy == "none":
+            spans = [(0, len(text))]
+        elif self.strategy == "token":
+            spans = self._token_windows(text)
+        elif self.strategy == "sentence":
+            spans = self._merge_units(self._split_oversized(text, self._sentence_units(text, 0, len(text))))
+        else:
+            spans = self._merge_units(self._split_oversized(text, self._paragraph_units(text)))
+
+        if not spans:
+            spans = [(0, len(text))]
+
+        return [
+            {
+                "text": text[start:end],
+                "chunk_index": i,
+                "start_char": start,
+                "end_char": end
+            }
+            for i, (start, end) in enumerate(spans)
+        ]
+
+    # ===================== 分割単位の抽出 =====================
+
+    @staticmethod
+    def _split_spans(text: str, pattern: re.Pattern, start: int, end: int) -> List[Span]:
+        """
+        text[start:end] を区切りパターンで分割し、前後の空白を除いた位置リストを返す。
+        """
+        spans = []
+        pos = start
+        for m in pattern.finditer(text, start, end):
+            spans.append((pos, m.start()))
+            pos = m.end()
+        spans.append((pos, end))
+
+        units = []
+        for s, e in spans:
+            while s < e and text[s].isspace():
+                s += 1
+            while e > s and text[e - 1].isspace():
+                e -= 1
+            if e > s:
+                units.append((s, e))
+        return units
+
+    def _paragraph_units(self, text: str) -> List[Span]:
+        """空行区切りの段落の位置リストを返す。"""
+        return self._split_spans(text, _PARAGRAPH_BREAK, 0, len(text))
+
+    def _sentence_units(self, text: str, start: int, end: int) -> List[Span]:
+        """text[start:end] 内の文の位置リストを返す。"""
+        return self._split_spans(text, _SENTENCE_BREAK, start, end)
+
+    def _split_oversized(self, text: str, units: List[Span]) -> List[Span]:
+        """
+        chunk_size を超える単位を、文単位、さらに固定長の文字ウィンドウへと再分割する。
+        """
+        result = []
+        for start, end in units:
+            if end - start <= self.chunk_size:
+                result.append((start, end))
+                continue
+            for s, e in self._sentence_units(text, start, end):
+                if e - s <= self.chunk_size:
+                    result.append((s, e))
+                else:
+                    result.extend(self._char_windows(s, e))
+        return result
+
+    def _char_windows(self, start: int, end: int) -> List[Span]:
+        """start〜end を chunk_size 文字の固定長ウィンドウ（重複あり）に分割する。"""
+        step = self.chunk_size - self.chunk_overlap
+        windows = []
+        pos = start
+        while pos < end:
+            windows.append((pos, min(pos + self.chunk_size, end)))
+            if pos + self.chunk_size >= end:
+                break
+            pos += step
+        return windows
+
+    # ===================== チャンクの組み立て =====================
+
+    def _merge_units(self, units: List[Span]) -> List[Span]:
+        """
+        連続する単位を chunk_size 文字以内にまとめ、チャンク間に chunk_overlap 文字以内の重複を持たせる。
+        """
+        chunks = []
+        current: List[Span] = []
+        for unit in units:
+            if current and unit[1] - current[0][0] > self.chunk_size:
+                chunks.append((current[0][0], current[-1][1]))
+                # 直前チャンク末尾の単位を重複として引き継ぐ
+                kept: List[Span] = []
+                for prev in reversed(current):
+                    if current[-1][1] - prev[0] > self.chunk_overlap:
+                        break
+                    kept.insert(0, prev)
+                # 重複分を含めて chunk_size を超える場合は先頭から捨てる
+                while kept and unit[1] - kept[0][0] > self.chunk_size:
+                    kept.pop(0)
+                current = kept
+            current.append(unit)
+        if current:
+            chunks.append((current[0][0], current[-1][1]))
+        return chunks
+
+    def _token_windows(self, text: str) -> List[Span]:
+        """chunk_size トークンの固定長ウィンドウ（chunk_overlap トークン重複）の位置リストを返す。"""
+        tokens = [m.span() for m in _TOKEN_PATTERN.finditer(text)]
+        step = self.chunk_size - self.chunk_overlap
+        windows = []
+        pos = 0
+        while pos < len(tokens):
+            window = tokens[pos:pos + self.chunk_size]
+            windows.append((window[0][0], window[-1][1]))
+            if pos + self.chunk_size >= len(tokens):
+                break
+            pos += step
+        return windows
+
+
+def create_chunker(config: dict) -> TextChunker:
+    """
+    config.yaml の chunking セクションから TextChunker を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        TextChunker: チャンカー（chunking セクションが無い場合はデフォルト設定）
+    """
+    chunking = (config or {}).get('chunking', {}) or {}
+    return TextChunker(
+        strategy=chunking.get('strategy', 'paragraph'),
+        chunk_size=int(chunking.get('chunk_size', 800)),
+        chunk_overlap=int(chunking.get('chunk_overlap', 100))
+    )
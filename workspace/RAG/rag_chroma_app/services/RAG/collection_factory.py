@@ -0,0 +1,132 @@
+"""
+rag_collection の生成・取得を一元化するファクトリ。
+config.yaml の chroma セクションから距離空間（hnsw:space）・HNSW パラメータ・ベクトル正規化の設定を読み込み、
+RAGService と ChromaManager が同じ設定でコレクションを開くようにする。
+"""
+
+import warnings
+from typing import Dict, Tuple
+
+from services.RAG.scoring import SPACES
+
+# コレクション名
+COLLECTION_NAME = "rag_collection"
+
+# config.yaml の chroma.hnsw のキー → コレクションメタデータのキー
+_HNSW_KEYS = {
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef",
+    "M": "hnsw:M",
+}
+# 作成後に変更できる HNSW パラメータ
+_MUTABLE_KEYS = ("hnsw:search_ef",)
+# コレクションメタデータのキー → collection.configuration["hnsw"] のキー（chromadb 1.x）
+_CONFIGURATION_KEYS = {
+    "hnsw:space": "space",
+    "hnsw:construction_ef": "ef_construction",
+    "hnsw:search_ef": "ef_search",
+    "hnsw:M": "max_neighbors",
+}
+
+
+def create_collection_settings(config: dict) -> Dict:
+    """
+    config.yaml の chroma セクションからコレクション設定を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Dict: {"space", "normalize", "metadata"}（metadata はコレクション作成時に渡す hnsw:* の辞書）
+    Raises:
+        ValueError: 不正な space・HNSW パラメータが指定された場合
+    """
+    chroma_config = (config or {}).get('chroma', {}) or {}
+    space = chroma_config.get('space', 'l2')
+    if space not in SPACES:
+        raise ValueError(f"chroma.space は {', '.join(SPACES)} のいずれかである必要があります: {space}")
+    metadata = {"hnsw:space": space}
+    for key, value in (chroma_config.get('hnsw', {}) or {}).items():
+        if key not in _HNSW_KEYS:
+            raise ValueError(f"不正な chroma.hnsw のキー: {key}。{', '.join(_HNSW_KEYS)} を指定してください。")
+        if int(value) < 1:
+            raise ValueError(f"chroma.hnsw.{key} は1以上である必要があります: {value}")
+        metadata[_HNSW_KEYS[key]] = int(value)
+    return {
+        "space": space,
+        "normalize": bool(chroma_config.get('normalize', False)),
+        "metadata": metadata
+    }
+
+
+def current_hnsw_metadata(collection) -> Dict:
+    """
+    コレクションの現在の hnsw:* の値をメタデータのキーで返す。
+    chromadb 1.x では作成後に変更した値は configuration にのみ反映され、メタデータは作成時の値のままのため、
+    configuration の値を優先する。
+    Args:
+        collection: chromadb のコレクション
+    Returns:
+        Dict: コレクションメタデータに configuration の hnsw の値を上書きした辞書
+    """
+    current = dict(getattr(collection, "metadata", None) or {})
+    try:
+        hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    except Exception:
+        # configuration を持たない（または形式の異なる）chromadb 0.x はメタデータのみを使用する
+        hnsw = {}
+    for key, config_key in _CONFIGURATION_KEYS.items():
+        if hnsw.get(config_key) is not None:
+            current[key] = hnsw[config_key]
+    return current
+
+
+def _update_search_params(collection, changes: Dict) -> None:
+    """
+    作成後に変更できる HNSW パラメータを更新する。内部関数。
+    chromadb 1.x では configuration で更新する（メタデータに hnsw:space を含めると距離空間の変更とみなされ失敗する）。
+    configuration を受け付けない chromadb 0.x では、modify() がメタデータ全体を置き換えるため既存のメタデータと合わせて渡す。
+    """
+    try:
+        collection.modify(configuration={"hnsw": {_CONFIGURATION_KEYS[key]: value for key, value in changes.items()}})
+    except TypeError:
+        collection.modify(metadata={**dict(getattr(collection, "metadata", None) or {}), **changes})
+
+
+def open_collection(client, settings: Dict = None, name: str = COLLECTION_NAME) -> Tuple[object, str]:
+    """
+    コレクションを設定に従って開く（存在しない場合は作成する）。
+    既存コレクションの距離空間・構築パラメータは作成後に変更できないため、設定と異なる場合は警告し、
+    既存コレクションの距離空間をそのまま使用する（変更するには migrate_collection.py で移行する）。
+    検索時パラメータ（search_ef）は既存コレクションにも反映する。
+    Args:
+        client: chromadb のクライアント
+        settings (Dict, optional): create_collection_settings() の戻り値（未指定時は ChromaDB の既定値）
+        name (str): コレクション名
+    Returns:
+        Tuple[Collection, str]: (コレクション, 実際の距離空間)
+    """
+    settings = settings or {"space": "l2", "normalize": False, "metadata": {}}
+    metadata = settings.get("metadata") or {}
+    collection = client.get_or_create_collection(name, metadata=metadata or None)
+
+    current = current_hnsw_metadata(collection)
+    space = current.get("hnsw:space", "l2")
+    if space != settings.get("space", "l2"):
+        warnings.warn(
+            f"コレクション {name} の距離空間（{space}）が設定（{settings.get('space')}）と異なります。"
+            f"既存の距離空間で検索します。変更するには migrate_collection.py を実行してください。"
+        )
+
+    for key, value in metadata.items():
+        if key != "hnsw:space" and key not in _MUTABLE_KEYS and current.get(key, value) != value:
+            warnings.warn(
+                f"コレクション {name} の {key}（{current.get(key)}）は作成後に変更できません。"
+                f"設定（{value}）を反映するには migrate_collection.py を実行してください。"
+            )
+
+    changes = {key: metadata[key] for key in _MUTABLE_KEYS if key in metadata and current.get(key) != metadata[key]}
+    if changes:
+        try:
+            _update_search_params(collection, changes)
+        except Exception as e:
+            warnings.warn(f"コレクション {name} の HNSW 検索パラメータを更新できませんでした: {e}")
+    return collection, space
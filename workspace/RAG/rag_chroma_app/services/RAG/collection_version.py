@@ -0,0 +1,81 @@
+"""
+コレクションのバージョンカウンタ。
+登録・削除・メタデータ更新のたびにカウンタを進め、検索結果キャッシュの無効化に使用する。
+カウンタは ChromaDB の永続化ディレクトリ内のファイルに保存するため、
+同じディレクトリを共有する API サーバーと Streamlit の間でも変更が伝わる。
+"""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows など fcntl が無い環境ではプロセス内のロックのみ
+    fcntl = None
+
+
+class CollectionVersion:
+    """
+    ファイルに永続化されるコレクションのバージョンカウンタ。
+    読み取りはファイルの更新日時が変わった場合のみ行うため、検索ごとに呼び出しても軽量である。
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str = "rag_collection"):
+        """
+        CollectionVersionの初期化。
+        Args:
+            persist_directory (str): ChromaDBの永続化ディレクトリ
+            collection_name (str): コレクション名
+        """
+        os.makedirs(persist_directory, exist_ok=True)
+        self.path = os.path.join(persist_directory, f"{collection_name}.version")
+        self._lock = threading.Lock()
+        self._cached_stat = None
+        self._cached_value = 0
+
+    def current(self) -> int:
+        """
+        現在のバージョンを返す。
+        Returns:
+            int: バージョン（ファイルが無い場合は0）
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            if key != self._cached_stat:
+                self._cached_value = self._read()
+                self._cached_stat = key
+            return self._cached_value
+
+    def bump(self) -> int:
+        """
+        バージョンを1つ進める。複数プロセスから同時に呼び出されても値を取りこぼさない。
+        Returns:
+            int: 更新後のバージョン
+        """
+        with self._lock:
+            with open(self.path + ".lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    value = self._read() + 1
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(str(value))
+                    os.replace(tmp_path, self.path)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            self._cached_stat = None
+            return value
+
+    def _read(self) -> int:
+        """ファイルからバージョンを読み込む。内部メソッド。"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
@@ -0,0 +1,30 @@
+"""
+ドキュメントIDとコンテンツハッシュの生成関数群。
+IDはファイル名とチャンク番号から決定的に生成するため、同じファイルの再登録は同じIDへの上書き（upsert）となる。
+"""
+
+import hashlib
+
+
+def make_doc_id(filename: str, chunk_index: int = 0) -> str:
+    """
+    ファイル名とチャンク番号から決定的なドキュメントIDを生成する。
+    Args:
+        filename (str): ファイル名
+        chunk_index (int): ファイル内のチャンク番号
+    Returns:
+        str: ドキュメントID（例: "3f2a9c0d1e4b5a6f_00000"）
+    """
+    file_key = hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+    return f"{file_key}_{chunk_index:05d}"
+
+
+def content_hash(text: str) -> str:
+    """
+    チャンク本文のハッシュを生成する。再登録時に内容が変わったチャンクの判定に使用する。
+    Args:
+        text (str): チャンク本文
+    Returns:
+        str: SHA-256 ハッシュ（16進文字列）
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,238 @@
+"""
+BM25 による語彙検索用の転置インデックス。
+ChromaDB のコレクションと同じドキュメントID（チャンク単位）で SQLite に永続化し、
+登録・削除のたびに差分更新する。日本語などの CJK 文字列は文字 bigram、英数字は単語単位でトークン化する。
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 英数字の単語
+_WORD = r"[0-9a-z_]+(?:[.\-'][0-9a-z_]+)*"
+# CJK 文字の連続（ひらがな・カタカナ・漢字・ハングル）
+_CJK = r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+"
+_TOKEN = re.compile(f"{_WORD}|{_CJK}")
+
+# SQLite の IN 句に渡すキー数の上限
+_LOOKUP_CHUNK = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを検索用のトークン列に変換する。
+    NFKC 正規化・小文字化の後、英数字は単語単位、CJK 文字の連続は文字 bigram（1文字のみの場合はその文字）に分割する。
+    Args:
+        text (str): 対象テキスト
+    Returns:
+        List[str]: トークンリスト（出現順・重複あり）
+    """
+    tokens = []
+    for match in _TOKEN.finditer(unicodedata.normalize("NFKC", text).lower()):
+        run = match.group()
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    SQLite に永続化する BM25 転置インデックス。
+    ドキュメント（チャンク）ごとの長さと、語 → (ドキュメントID, 出現回数) のポスティングを保持する。
+    """
+
+    def __init__(self, index_path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        LexicalIndexの初期化。
+        Args:
+            index_path (str): インデックスを保存する SQLite ファイルのパス
+            k1 (float): BM25 の語頻度の飽和パラメータ
+            b (float): BM25 の文書長正規化パラメータ（0.0〜1.0）
+        Raises:
+            ValueError: index_path が未指定の場合
+        """
+        if not index_path:
+            raise ValueError("語彙インデックスのパス（lexical_index.path）が未指定である。")
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self._conn = sqlite3.connect(index_path, check_same_thread=False, timeout=30)
+        # API サーバーと Streamlit が同じファイルを共有できるよう WAL モードを使用
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id TEXT PRIMARY KEY,"
+            " filename TEXT NOT NULL,"
+            " length INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS docs_filename ON docs (filename);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL,"
+            " doc_id TEXT NOT NULL,"
+            " tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+        )
+        self._conn.commit()
+
+    def add_documents(self, ids: List[str], texts: List[str], filenames: List[str]) -> None:
+        """
+        ドキュメントをインデックスに追加する（同じIDが存在する場合は置き換える）。
+        Args:
+            ids (List[str]): ドキュメントIDリスト
+            texts (List[str]): 各ドキュメントの本文
+            filenames (List[str]): 各ドキュメントのファイル名
+        """
+        if not ids:
+            return
+        doc_rows = []
+        posting_rows = []
+        for doc_id, text, filename in zip(ids, texts, filenames):
+            counts = Counter(tokenize(text))
+            doc_rows.append((doc_id, filename, sum(counts.values())))
+            posting_rows.extend((term, doc_id, tf) for term, tf in counts.items())
+        with self._lock:
+            with self._conn:
+                self._delete_ids_locked(ids)
+                self._conn.executemany("INSERT INTO docs (doc_id, filename, length) VALUES (?, ?, ?)", doc_rows)
+                self._conn.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)", posting_rows)
+
+    def delete_ids(self, ids: Iterable[str]) -> None:
+        """
+        指定したIDのドキュメントをインデックスから削除する。
+        Args:
+            ids (Iterable[str]): ドキュメントIDリスト
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            with self._conn:
+                self._delete_ids_locked(ids)
+
+    def delete_filenames(self, filenames: Iterable[str]) -> None:
+        """
+        指定したファイル名のドキュメント（全チャンク）をインデックスから削除する。
+        Args:
+            filenames (Iterable[str]): ファイル名リスト
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if not filenames:
+            return
+        with self._lock:
+            with self._conn:
+                ids = []
+                for i in range(0, len(filenames), _LOOKUP_CHUNK):
+                    chunk = filenames[i:i + _LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT doc_id FROM docs WHERE filename IN ({placeholders})", chunk
+                    ).fetchall()
+                    ids.extend(row[0] for row in rows)
+                self._delete_ids_locked(ids)
+
+    def count(self) -> int:
+        """
+        インデックス済みのドキュメント数を返す。
+        Returns:
+            int: ドキュメント（チャンク）数
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def clear(self) -> None:
+        """インデックスを空にする。"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM postings")
+                self._conn.execute("DELETE FROM docs")
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """
+        BM25 でクエリに一致するドキュメントを検索する。
+        Args:
+            query (str): 検索クエリ
+            n_results (int): 返却する最大件数
+        Returns:
+            List[Tuple[str, float]]: スコアの降順の (ドキュメントID, BM25 スコア) リスト
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            doc_count, total_length = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            if doc_count == 0:
+                return []
+            avg_length = total_length / doc_count or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1.0 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = tf + self.k1 * (1.0 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+    def close(self) -> None:
+        """SQLite 接続を閉じる。"""
+        with self._lock:
+            self._conn.close()
+
+    def _delete_ids_locked(self, ids: List[str]) -> None:
+        """ドキュメントとポスティングを削除する（ロック・トランザクション取得済みで呼び出すこと）。内部メソッド。"""
+        for i in range(0, len(ids), _LOOKUP_CHUNK):
+            chunk = ids[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM docs WHERE doc_id IN ({placeholders})", chunk)
+
+
+def create_lexical_index(config: dict) -> Optional[LexicalIndex]:
+    """
+    config.yaml の lexical_index セクションから LexicalIndex を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Optional[LexicalIndex]: 語彙インデックス（無効な場合は None）
+    """
+    index_config = (config or {}).get('lexical_index', {}) or {}
+    if not index_config.get('enabled', False):
+        return None
+    return LexicalIndex(
+        index_path=index_config.get('path', '../lexical_index.sqlite3'),
+        k1=float(index_config.get('k1', 1.5)),
+        b=float(index_config.get('b', 0.75))
+    )
+
+
+def hybrid_search_options(config: dict) -> Dict:
+    """
+    config.yaml の lexical_index セクションから hybrid 検索のパラメータを取得する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Dict: RAGService に渡す {"rrf_k", "candidate_multiplier"}
+    """
+    index_config = (config or {}).get('lexical_index', {}) or {}
+    return {
+        "rrf_k": int(index_config.get('rrf_k', 60)),
+        "candidate_multiplier": int(index_config.get('candidate_multiplier', 4))
+    }
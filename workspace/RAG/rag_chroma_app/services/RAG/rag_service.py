@@ -5,15 +5,39 @@ ChromaDB操作もこのクラスに統合。
 任意の Embedder を使用可能（プラグイン型設計）。
 """
 
-from typing import List, Dict
+from typing import Callable, List, Dict, Tuple, Union
 from datetime import datetime
+import asyncio
+import base64
+import heapq
+import json
 import sys
 import os
+import time
 import chromadb
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from services.Vector.base_embedder import BaseEmbedder
+from services.RAG.chunker import TextChunker
+from services.RAG.collection_factory import COLLECTION_NAME, open_collection
+from services.RAG.collection_version import CollectionVersion
+from services.RAG.document_id import content_hash, make_doc_id
+from services.RAG.lexical_index import LexicalIndex
+from services.RAG.reranker import CrossEncoderReranker
+from services.RAG.scoring import distance_to_similarity, normalize_vectors
+from services.RAG.search_cache import SearchResultCache
+from services.RAG.semantic_cache import SemanticQueryCache
+from services.concurrency import get_executor, run_blocking
+from services.metrics import (
+    CACHE_HIT_RATE, CACHE_REQUESTS, CACHE_SIZE, COLLECTION_RECORDS, COLLECTION_VERSION, INGEST_CHUNKS, INGEST_FILES,
+    INGEST_SECONDS, INGEST_TOKENS, SEARCH_QUERIES, SEARCH_SECONDS, InstrumentedCollection, record_ingest_throughput
+)
+from services.Vector.batching import estimate_tokens
+
+# search() の mode に指定できる検索方式
+SEARCH_MODES = ("vector", "lexical", "hybrid")
 
 
 class RAGService:
@@ -24,12 +48,25 @@ class RAGService:
     任意の BaseEmbedder を使用可能。
     """
 
-    def __init__(self, embedder: BaseEmbedder, chroma_persist_directory: str):
+    def __init__(self, embedder: BaseEmbedder, chroma_persist_directory: str, chunker: TextChunker = None,
+                 search_cache: SearchResultCache = None, semantic_cache: SemanticQueryCache = None,
+                 lexical_index: LexicalIndex = None, rrf_k: int = 60, candidate_multiplier: int = 4,
+                 reranker: CrossEncoderReranker = None, collection_settings: Dict = None):
         """
         RAGサービスの初期化。
         Args:
             embedder (BaseEmbedder): 使用する埋め込みクライアント（OpenRouterEmbedder, OllamaEmbedder など）
             chroma_persist_directory (str): ChromaDBの永続ディレクトリ
+            chunker (TextChunker, optional): 登録時のテキスト分割に使用するチャンカー（未指定時はデフォルト設定）
+            search_cache (SearchResultCache, optional): 検索結果キャッシュ（未指定時はキャッシュしない）
+            semantic_cache (SemanticQueryCache, optional): 埋め込みの近いクエリの結果を再利用するキャッシュ
+            lexical_index (LexicalIndex, optional): BM25 語彙インデックス（指定時は登録・削除に合わせて更新し、
+                                                    mode="lexical" / "hybrid" の検索が可能になる）
+            rrf_k (int): hybrid 検索の Reciprocal Rank Fusion の定数 k
+            candidate_multiplier (int): hybrid 検索で各方式から取得する候補数の n_results に対する倍率
+            reranker (CrossEncoderReranker, optional): 検索結果の再ランキングに使用する CrossEncoder
+            collection_settings (Dict, optional): create_collection_settings() で作成したコレクション設定
+                                                  （距離空間・HNSW パラメータ・ベクトル正規化。未指定時は ChromaDB の既定値）
         Raises:
             ValueError: chroma_persist_directoryが未指定の場合、または embedder が BaseEmbedder でない場合
         """
@@ -40,59 +77,257 @@ class RAGService:
             raise ValueError(f"embedder は BaseEmbedder の実装である必要があります。受け取ったタイプ: {type(embedder)}")
         
         self.embedder = embedder
+        self.chunker = chunker or TextChunker()
         # ChromaDB初期化
         self.client = chromadb.PersistentClient(path=chroma_persist_directory)
-        self.collection = self.client.get_or_create_collection("rag_collection")
+        collection, self.space = open_collection(self.client, collection_settings)
+        # コレクション操作ごとの所要時間を services.metrics に記録する
+        self.collection = InstrumentedCollection(collection)
+        self.normalize = bool((collection_settings or {}).get("normalize", False))
+        # 登録・削除・メタデータ更新で進むバージョン（検索結果キャッシュの無効化に使用）
+        self.version = CollectionVersion(chroma_persist_directory, COLLECTION_NAME)
+        self.search_cache = search_cache
+        self.semantic_cache = semantic_cache
+        self.lexical_index = lexical_index
+        self.rrf_k = rrf_k
+        self.candidate_multiplier = max(1, candidate_multiplier)
+        self.reranker = reranker
+        # チャンク分割導入前に登録されたレコードには chunk_index が無く一覧に表示されないため、初回に補完する
+        self._chunk_marker_path = os.path.join(chroma_persist_directory, f"{COLLECTION_NAME}.chunk_metadata")
+        if not os.path.exists(self._chunk_marker_path):
+            self.backfill_chunk_metadata()
+        # 既存のコレクションに対して語彙インデックスを新たに有効にした場合は初回に構築する
+        if lexical_index is not None and lexical_index.count() == 0 and self.collection.count() > 0:
+            self.rebuild_lexical_index()
 
-    def vectorize_and_register(self, texts: List[str], filenames: List[str]) -> None:
+    def vectorize_and_register(self, texts: List[str], filenames: List[str],
+                               progress_callback: Callable[[int, int], None] = None, batch_size: int = 64) -> Dict:
         """
-        テキストリストをベクトル化し、ChromaDBに登録する。
+        テキストリストをチャンクに分割してベクトル化し、ChromaDBに登録する。
         既存のファイル名は上書き登録される。
+        ドキュメントIDはファイル名とチャンク番号から決定的に生成し、内容（ハッシュ）が変わったチャンクのみを
+        ベクトル化して upsert する。内容が同じファイルの再登録では埋め込み・書き込みを行わない。
         Args:
             texts (List[str]): 登録するテキストリスト
             filenames (List[str]): 各テキストに対応するファイル名リスト
+            progress_callback (Callable[[int, int], None], optional): 進捗の通知先。
+                指定時は batch_size チャンクごとにベクトル化し、(ベクトル化済みチャンク数, ベクトル化対象のチャンク数) で呼び出す。
+                コールバックが例外を送出した場合は ChromaDB に書き込まずに中断する
+            batch_size (int): progress_callback 指定時に1回でベクトル化するチャンク数
+        Returns:
+            Dict: 登録結果（{"files", "chunks", "embedded", "tokens", "unchanged_files", "deleted", "per_file"}。
+                  tokens はベクトル化したチャンクの推定トークン数、per_file はファイル名 → {"chunks", "embedded"}）
         Raises:
             Exception: ベクトル化・登録処理でエラーが発生した場合
         """
-        # embedder を使ってベクトル化
-        embeddings = self.embedder.embed(texts)
-        # 既存ファイルを削除してから登録
-        for fn in filenames:
-            self._delete_by_filename(fn)
-        # メタデータ作成（登録日時・ディレクトリ）
+        started = time.perf_counter()
+        plans = self.plan_registration(texts, filenames)
+        # 内容が変わったチャンクのみを embedder でベクトル化
+        to_embed = [plan["texts"][i] for plan in plans for i in plan["changed"]]
+        # 埋め込みは numpy 配列のまま ChromaDB に渡す（ベクトルごとの Python リストへの変換を行わない）
+        with INGEST_SECONDS.time(stage="embed"):
+            if progress_callback is None:
+                embeddings = self.embedder.embed_array(to_embed)
+            else:
+                batches = []
+                embedded = 0
+                progress_callback(0, len(to_embed))
+                for start in range(0, len(to_embed), max(1, batch_size)):
+                    batches.append(self.embedder.embed_array(to_embed[start:start + max(1, batch_size)]))
+                    embedded += len(batches[-1])
+                    progress_callback(embedded, len(to_embed))
+                embeddings = np.concatenate(batches) if batches else self.embedder.embed_array([])
+        summary = self.commit_registration(plans, embeddings)
+        record_ingest_throughput(summary["embedded"], summary["tokens"], summary["files"], time.perf_counter() - started)
+        return summary
+
+    def plan_registration(self, texts: List[str], filenames: List[str]) -> List[Dict]:
+        """
+        登録対象ファイルをチャンク分割し、既存レコードと比較して登録計画を作成する（ChromaDB への書き込みは行わない）。
+        計画の changed チャンクをベクトル化し、commit_registration() に渡して登録する。
+        IngestPipeline のように計画・ベクトル化・書き込みを別々のスレッドで行う場合に使用する。
+        Args:
+            texts (List[str]): 登録するテキストリスト
+            filenames (List[str]): 各テキストに対応するファイル名リスト
+        Returns:
+            List[Dict]: ファイルごとの登録計画（{"filename", "ids", "texts", "metadatas", "changed",
+                        "stale_ids", "is_new", "unchanged"}）
+        """
+        started = time.perf_counter()
+        # 同じファイル名が複数含まれる場合は後のものを優先
+        files = dict(zip(filenames, texts))
         now = datetime.now().isoformat(timespec='seconds')
-        metadatas = [{"filename": fn, "created_at": now, "directory": "/"} for fn in filenames]
-        # ChromaDB登録
-        self._add_documents(texts, metadatas=metadatas, embeddings=embeddings)
+        model_id = self._embedding_model_id()
+
+        chunked = {fn: self.chunker.chunk(text) for fn, text in files.items()}
+        all_ids = [make_doc_id(fn, c["chunk_index"]) for fn, chunks in chunked.items() for c in chunks]
+        existing = {}
+        if all_ids:
+            result = self.collection.get(ids=all_ids, include=["metadatas"])
+            existing = dict(zip(result.get("ids", []), result.get("metadatas", [])))
+
+        plans = []
+        for fn, chunks in chunked.items():
+            ids = [make_doc_id(fn, c["chunk_index"]) for c in chunks]
+            head = existing.get(ids[0])
+            old_count = int(head.get("chunk_count", 1)) if head else 0
+            # ユーザーが変更したディレクトリは再登録後も引き継ぐ
+            directory = head.get("directory", "/") if head else "/"
+
+            metadatas = []
+            changed = []
+            for i, (doc_id, chunk) in enumerate(zip(ids, chunks)):
+                digest = content_hash(chunk["text"])
+                old = existing.get(doc_id)
+                if not old or old.get("content_hash") != digest or old.get("embedding_model") != model_id:
+                    changed.append(i)
+                metadatas.append({
+                    "filename": fn,
+                    "created_at": now,
+                    "directory": directory,
+                    "chunk_index": chunk["chunk_index"],
+                    "chunk_count": len(chunks),
+                    "start_char": chunk["start_char"],
+                    "end_char": chunk["end_char"],
+                    "content_hash": digest,
+                    "embedding_model": model_id
+                })
+
+            stale_ids = [make_doc_id(fn, i) for i in range(len(chunks), old_count)]
+            plans.append({
+                "filename": fn,
+                "ids": ids,
+                "texts": [c["text"] for c in chunks],
+                "metadatas": metadatas,
+                "changed": changed,
+                "stale_ids": stale_ids,
+                "is_new": head is None,
+                "unchanged": head is not None and not changed and not stale_ids
+            })
+        INGEST_SECONDS.observe(time.perf_counter() - started, stage="plan")
+        return plans
+
+    def commit_registration(self, plans: List[Dict], embeddings: np.ndarray) -> Dict:
+        """
+        登録計画に従って ChromaDB に書き込み、コレクションのバージョンを進める。
+        embeddings は各計画の changed チャンクを計画順に並べたものに対応する。
+        Args:
+            plans (List[Dict]): plan_registration() の戻り値
+            embeddings (np.ndarray): 変更チャンクの埋め込みベクトル（リストも可）
+        Returns:
+            Dict: 登録結果（{"files", "chunks", "embedded", "tokens", "unchanged_files", "deleted", "per_file"}）
+        """
+        started = time.perf_counter()
+        upsert_ids, upsert_texts, upsert_metas = [], [], []
+        update_ids, update_metas = [], []
+        stale_ids = []
+        # 埋め込み中に識別子が確定した場合（Ollama のエンドポイント判定など）は確定後の識別子を記録する
+        model_id = self._embedding_model_id()
+        # 旧形式（doc_N）のIDで登録された同名ファイルは1回の条件付き削除でまとめて削除
+        self._delete_by_filenames([plan["filename"] for plan in plans if plan["is_new"]])
+        for plan in plans:
+            if plan["unchanged"]:
+                continue
+            changed = set(plan["changed"])
+            for i, (doc_id, text, meta) in enumerate(zip(plan["ids"], plan["texts"], plan["metadatas"])):
+                if i in changed:
+                    upsert_ids.append(doc_id)
+                    upsert_texts.append(text)
+                    upsert_metas.append({**meta, "embedding_model": model_id})
+                else:
+                    # 内容が同じチャンクは埋め込みを保持したままメタデータのみ更新
+                    update_ids.append(doc_id)
+                    update_metas.append(meta)
+            stale_ids.extend(plan["stale_ids"])
+
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        if upsert_ids:
+            self._add_documents(upsert_texts, metadatas=upsert_metas, embeddings=embeddings, ids=upsert_ids)
+        if update_ids:
+            self.collection.update(ids=update_ids, metadatas=update_metas)
+        if self.lexical_index is not None:
+            self.lexical_index.delete_filenames([plan["filename"] for plan in plans if plan["is_new"]])
+            self.lexical_index.delete_ids(stale_ids)
+            self.lexical_index.add_documents(upsert_ids, upsert_texts, [meta["filename"] for meta in upsert_metas])
+        if any(not plan["unchanged"] for plan in plans):
+            self.version.bump()
 
-    def _add_documents(self, texts: List[str], metadatas: List[dict] = None, embeddings: List[List[float]] = None) -> None:
+        tokens = sum(estimate_tokens(text) for text in upsert_texts)
+        INGEST_SECONDS.observe(time.perf_counter() - started, stage="write")
+        INGEST_CHUNKS.inc(len(upsert_ids))
+        INGEST_TOKENS.inc(tokens)
+        for status in ("new", "updated", "unchanged"):
+            count = sum(1 for plan in plans if self._plan_status(plan) == status)
+            if count:
+                INGEST_FILES.inc(count, status=status)
+        return {
+            "files": len(plans),
+            "chunks": sum(len(plan["ids"]) for plan in plans),
+            "embedded": len(upsert_ids),
+            "tokens": tokens,
+            "unchanged_files": sum(1 for plan in plans if plan["unchanged"]),
+            "deleted": len(stale_ids),
+            "per_file": {
+                plan["filename"]: {"chunks": len(plan["ids"]), "embedded": len(plan["changed"])}
+                for plan in plans
+            }
+        }
+
+    def _embedding_model_id(self) -> str:
+        """
+        embedding_model メタデータに記録する識別子を返す。内部メソッド。
+        正規化の有無が変わった場合も再登録の対象とするため識別子に含める。
         """
-        ドキュメントをChromaDBコレクションに追加する。
+        return self.embedder.model_id + (":normalized" if self.normalize else "")
+
+    @staticmethod
+    def _plan_status(plan: Dict) -> str:
+        """登録計画の種別（"new": 新規, "updated": 内容の変更, "unchanged": 変更なし）を返す。内部メソッド。"""
+        if plan["unchanged"]:
+            return "unchanged"
+        return "new" if plan["is_new"] else "updated"
+
+    def _add_documents(self, texts: List[str], metadatas: List[dict] = None, embeddings: np.ndarray = None,
+                       ids: List[str] = None) -> None:
+        """
+        ドキュメントをChromaDBコレクションに登録する（同じIDが存在する場合は上書き）。
         内部メソッド。必要に応じてメタデータや埋め込みベクトルも同時に登録可能。
         Args:
             texts (List[str]): 登録するテキストリスト
             metadatas (List[dict], optional): 各テキストに対応するメタデータ辞書リスト
-            embeddings (List[List[float]], optional): 各テキストの埋め込みベクトル
+            embeddings (np.ndarray, optional): 各テキストの埋め込みベクトル（リストも可）
+            ids (List[str], optional): ドキュメントIDリスト（未指定時はメタデータのファイル名・チャンク番号から生成）
         """
-        ids = [f"doc_{i}" for i in range(len(texts))]
-        self.collection.add(
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [
+                make_doc_id(meta["filename"], meta.get("chunk_index", 0)) if meta.get("filename")
+                else content_hash(text)
+                for text, meta in zip(texts, metadatas)
+            ]
+        if self.normalize and embeddings is not None and len(embeddings):
+            embeddings = normalize_vectors(embeddings)
+        self.collection.upsert(
             documents=texts,
-            metadatas=metadatas or [{} for _ in texts],
+            metadatas=metadatas,
             ids=ids,
             embeddings=embeddings
         )
 
-    def _query(self, query_texts: List[str] = None, n_results: int = 5, embeddings: List[List[float]] = None) -> Dict:
+    def _query(self, query_texts: List[str] = None, n_results: int = 5, embeddings: np.ndarray = None) -> Dict:
         """
         クエリテキストまたは埋め込みベクトルで類似検索を実行する。
         内部メソッド。
         Args:
             query_texts (List[str], optional): 検索クエリのテキストリスト
             n_results (int): 返却する最大件数
-            embeddings (List[List[float]], optional): クエリの埋め込みベクトル
+            embeddings (np.ndarray, optional): クエリの埋め込みベクトル（ベクトルのリストも可）
         Returns:
             dict: 検索結果（ドキュメント・メタデータ・スコア等）
         """
+        if self.normalize and embeddings is not None and len(embeddings):
+            embeddings = normalize_vectors(embeddings)
         return self.collection.query(
             query_texts=query_texts,
             n_results=n_results,
@@ -106,13 +341,157 @@ class RAGService:
         Args:
             filename (str): 削除対象のファイル名
         """
-        ids_to_delete = []
-        all_docs = self.collection.get()
-        for doc_id, meta in zip(all_docs.get('ids', []), all_docs.get('metadatas', [])):
-            if meta.get('filename') == filename:
-                ids_to_delete.append(doc_id)
-        if ids_to_delete:
-            self.collection.delete(ids=ids_to_delete)
+        self._delete_by_filenames([filename])
+
+    def _delete_by_filenames(self, filenames: List[str]) -> None:
+        """
+        指定したファイル名に一致するドキュメントを1回の where 条件付き削除でまとめて削除する。
+        コレクション全体の走査は行わない。
+        内部メソッド。
+        Args:
+            filenames (List[str]): 削除対象のファイル名リスト
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if filenames:
+            self.collection.delete(where=self._filename_filter(filenames))
+
+    @staticmethod
+    def _filename_filter(filenames: List[str]) -> Dict:
+        """
+        ファイル名で絞り込む ChromaDB の where 条件を作成する。
+        内部メソッド。
+        Args:
+            filenames (List[str]): ファイル名リスト（1件以上）
+        Returns:
+            Dict: where 条件
+        """
+        if len(filenames) == 1:
+            return {"filename": filenames[0]}
+        return {"filename": {"$in": list(filenames)}}
+
+    def get_documents_by_filename(self, filenames: List[str], include_documents: bool = False) -> List[Dict]:
+        """
+        指定したファイル名のドキュメント（チャンク）を where 条件付きで取得する。
+        Args:
+            filenames (List[str]): ファイル名リスト
+            include_documents (bool): ドキュメント本文も取得するか（False の場合はメタデータのみ）
+        Returns:
+            List[Dict]: ドキュメントリスト（各要素は{"doc_id", "metadata"}、include_documents 時は"document"も含む辞書）
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if not filenames:
+            return []
+        include = ["metadatas", "documents"] if include_documents else ["metadatas"]
+        result = self.collection.get(where=self._filename_filter(filenames), include=include)
+        documents = result.get("documents") or [None] * len(result.get("ids", []))
+        records = []
+        for doc_id, meta, doc in zip(result.get("ids", []), result.get("metadatas", []), documents):
+            record = {"doc_id": doc_id, "metadata": meta}
+            if include_documents:
+                record["document"] = doc
+            records.append(record)
+        return records
+
+    def delete_files(self, filenames: List[str]) -> int:
+        """
+        指定したファイル名のドキュメント（全チャンク）を削除する。
+        Args:
+            filenames (List[str]): 削除対象のファイル名リスト
+        Returns:
+            int: 削除したドキュメント（チャンク）数
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if not filenames:
+            return 0
+        ids = self.collection.get(where=self._filename_filter(filenames), include=[]).get("ids", [])
+        if ids:
+            self.collection.delete(ids=ids)
+            if self.lexical_index is not None:
+                self.lexical_index.delete_ids(ids)
+            self.version.bump()
+        return len(ids)
+
+    def backfill_chunk_metadata(self, batch_size: int = 1000) -> int:
+        """
+        チャンク分割の導入前に登録されたレコード（メタデータに chunk_index が無いもの）に
+        chunk_index = 0・chunk_count = 1 を補完する（当時は1ファイル1レコードで登録していた）。
+        補完しないとファイル一覧（先頭チャンクのみを取得する）に表示されない。
+        完了後は永続化ディレクトリに目印のファイルを作成し、以降の起動では走査しない。
+        Args:
+            batch_size (int): 1回に取得するレコード数
+        Returns:
+            int: 補完したレコード数
+        """
+        updated = 0
+        page_offset = 0
+        while True:
+            result = self.collection.get(include=["metadatas"], limit=batch_size, offset=page_offset)
+            ids = result.get("ids", [])
+            legacy_ids, legacy_metas = [], []
+            for doc_id, meta in zip(ids, result.get("metadatas", [])):
+                meta = meta or {}
+                if "chunk_index" not in meta:
+                    legacy_ids.append(doc_id)
+                    legacy_metas.append({**meta, "directory": meta.get("directory", "/"),
+                                         "chunk_index": 0, "chunk_count": 1})
+            if legacy_ids:
+                # 更新してもレコードの順序は変わらないため、offset による走査を続けてよい
+                self.collection.update(ids=legacy_ids, metadatas=legacy_metas)
+                updated += len(legacy_ids)
+            if len(ids) < batch_size:
+                break
+            page_offset += batch_size
+        if updated:
+            self.version.bump()
+        with open(self._chunk_marker_path, "w", encoding="utf-8") as f:
+            f.write(f"{updated}\n")
+        return updated
+
+    def rebuild_lexical_index(self, batch_size: int = 1000) -> int:
+        """
+        コレクションの全ドキュメントから語彙インデックスを作り直す。
+        Args:
+            batch_size (int): 1回に取得するドキュメント数
+        Returns:
+            int: インデックスに登録したドキュメント（チャンク）数
+        Raises:
+            ValueError: 語彙インデックスが無効な場合
+        """
+        if self.lexical_index is None:
+            raise ValueError("語彙インデックス（lexical_index）が無効である。")
+        self.lexical_index.clear()
+        indexed = 0
+        page_offset = 0
+        while True:
+            result = self.collection.get(include=["documents", "metadatas"], limit=batch_size, offset=page_offset)
+            ids = result.get("ids", [])
+            filenames = [(meta or {}).get("filename", "") for meta in result.get("metadatas", [])]
+            self.lexical_index.add_documents(ids, [doc or "" for doc in result.get("documents", [])], filenames)
+            indexed += len(ids)
+            if len(ids) < batch_size:
+                break
+            page_offset += batch_size
+        return indexed
+
+    def collect_metrics(self) -> None:
+        """
+        キャッシュのヒット率・保持件数とコレクションのレコード数・バージョンを services.metrics のゲージに反映する。
+        METRICS.add_collector() に登録し、/metrics の出力の直前に呼び出す。
+        """
+        caches = {"search": self.search_cache, "semantic": self.semantic_cache}
+        if hasattr(self.embedder, "stats"):
+            caches["embedding"] = self.embedder
+        for name, cache in caches.items():
+            if cache is None:
+                continue
+            stats = cache.stats()
+            hits = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+            CACHE_HIT_RATE.set(stats["hit_rate"], cache=name)
+            CACHE_REQUESTS.set(hits, cache=name, result="hit")
+            CACHE_REQUESTS.set(stats["misses"], cache=name, result="miss")
+            CACHE_SIZE.set(stats.get("size", stats.get("memory_size", 0)), cache=name)
+        COLLECTION_RECORDS.set(self.collection.count())
+        COLLECTION_VERSION.set(self.version.current())
 
     def _update_metadata(self, doc_id: str, new_metadata: dict) -> None:
         """
@@ -133,84 +512,660 @@ class RAGService:
             )
         except Exception as e:
             raise Exception(f"メタデータ更新エラー: {e}")
+        self.version.bump()
 
 
-    def search(self, query: str, n_results: int = 5, threshold: float = 0.7) -> List[Dict]:
+    def search(self, query: str, n_results: int = 5, threshold: float = 0.7, mode: str = "vector",
+               rerank: bool = True) -> List[Dict]:
         """
         クエリ検索を実行し、スコア閾値以上の結果を返す。
+        Args:
+            query (str): 検索クエリ
+            n_results (int): 最大返却件数
+            threshold (float): スコア閾値（0.0〜1.0）。ベクトル検索の類似度に適用する
+            mode (str): 検索方式（"vector": ベクトル検索, "lexical": BM25 語彙検索,
+                        "hybrid": 両者を Reciprocal Rank Fusion で統合）
+            rerank (bool): 再ランキング（reranker 設定時のみ有効）を行うか
+        Returns:
+            List[Dict]: 検索結果リスト（チャンク単位。各要素は{"filename", "score", "document", "chunk_index",
+                        "start_char", "end_char", "created_at"}を含む辞書。hybrid の場合は"vector_score",
+                        "lexical_score"、再ランキング時は"rerank_score"も含む）
+        Raises:
+            ValueError: 不正な mode、または語彙インデックスが無効な状態で lexical / hybrid を指定した場合
+        """
+        return self.search_with_info(query, n_results=n_results, threshold=threshold, mode=mode, rerank=rerank)["results"]
+
+    async def asearch(self, query: str, n_results: int = 5, threshold: float = 0.7, mode: str = "vector",
+                      rerank: bool = True) -> List[Dict]:
+        """
+        search() の非同期版。
+        埋め込みは Embedder の aembed()、ChromaDB 検索は ChromaDB 用スレッドプールで実行し、
+        イベントループをブロックしない。
         Args:
             query (str): 検索クエリ
             n_results (int): 最大返却件数
             threshold (float): スコア閾値（0.0〜1.0）
+            mode (str): 検索方式（"vector", "lexical", "hybrid"）
+            rerank (bool): 再ランキングを行うか
         Returns:
-            List[Dict]: 検索結果リスト（各要素は{"filename", "score", "document"}を含む辞書）
+            List[Dict]: 検索結果リスト（search() と同じ形式）
         """
-        # クエリをベクトル化
-        embedding = self.embedder.embed([query])[0]
-        
-        # ChromaDB検索
-        result = self._query(query_texts=None, n_results=n_results, embeddings=[embedding])
-        
-        docs = result.get("documents", [[]])[0]
-        metadatas = result.get("metadatas", [[]])[0]
-        scores = result.get("distances", [[]])[0]
+        return (await self.asearch_with_info(query, n_results=n_results, threshold=threshold, mode=mode,
+                                             rerank=rerank))["results"]
+
+    def search_with_info(self, query: str, n_results: int = 5, threshold: float = 0.7,
+                         allow_semantic: bool = True, mode: str = "vector", rerank: bool = True) -> Dict:
+        """
+        search() と同じ検索を行い、キャッシュの利用状況とあわせて返す。
+        Args:
+            query (str): 検索クエリ
+            n_results (int): 最大返却件数
+            threshold (float): スコア閾値（0.0〜1.0）
+            allow_semantic (bool): False の場合はセマンティックキャッシュを使用しない
+                                   （言い換えクエリの結果を流用できない、正確な結果が必要な呼び出し元向け）
+            mode (str): 検索方式（"vector", "lexical", "hybrid"）
+            rerank (bool): 再ランキングを行うか
+        Returns:
+            Dict: {"results": search() と同じ形式, "cache": "exact" | "semantic" | "miss",
+                   "similarity": セマンティックキャッシュ使用時の類似度（それ以外は None）,
+                   "rerank": 再ランキングを行った場合は{"candidates", "reranked", "truncated", "elapsed_ms"}（それ以外は None）}
+        """
+        return self.search_many_with_info([query], n_results=n_results, threshold=threshold,
+                                          allow_semantic=allow_semantic, mode=mode, rerank=rerank)[0]
+
+    async def asearch_with_info(self, query: str, n_results: int = 5, threshold: float = 0.7,
+                                allow_semantic: bool = True, mode: str = "vector", rerank: bool = True) -> Dict:
+        """
+        search_with_info() の非同期版。
+        Returns:
+            Dict: search_with_info() と同じ形式
+        """
+        return (await self.asearch_many_with_info([query], n_results=n_results, threshold=threshold,
+                                                  allow_semantic=allow_semantic, mode=mode, rerank=rerank))[0]
+
+    def search_many(self, queries: List[str], n_results: Union[int, List[int]] = 5,
+                    threshold: Union[float, List[float]] = 0.7, mode: str = "vector",
+                    rerank: bool = True) -> List[List[Dict]]:
+        """
+        複数クエリの検索をまとめて実行する。
+        全クエリを1回の埋め込み呼び出しでベクトル化し、1回の複数ベクトル ChromaDB 検索を行った後、
+        クエリごとの返却件数・スコア閾値を適用する。検索結果キャッシュにあるクエリは埋め込み・検索の対象から除く。
+        Args:
+            queries (List[str]): 検索クエリリスト
+            n_results (int | List[int]): 最大返却件数（クエリごとに指定する場合は queries と同じ長さのリスト）
+            threshold (float | List[float]): スコア閾値（クエリごとに指定する場合は queries と同じ長さのリスト）
+            mode (str): 検索方式（"vector", "lexical", "hybrid"）
+            rerank (bool): 再ランキングを行うか
+        Returns:
+            List[List[Dict]]: クエリ順の検索結果リスト（各要素は search() と同じ形式）
+        Raises:
+            ValueError: クエリごとの指定の長さが queries と一致しない場合、または不正な mode の場合
+        """
+        return [info["results"] for info in self.search_many_with_info(queries, n_results, threshold, mode=mode,
+                                                                      rerank=rerank)]
+
+    async def asearch_many(self, queries: List[str], n_results: Union[int, List[int]] = 5,
+                           threshold: Union[float, List[float]] = 0.7, mode: str = "vector",
+                           rerank: bool = True) -> List[List[Dict]]:
+        """
+        search_many() の非同期版。
+        Returns:
+            List[List[Dict]]: search_many() と同じ形式
+        """
+        return [info["results"] for info in await self.asearch_many_with_info(queries, n_results, threshold, mode=mode,
+                                                                             rerank=rerank)]
+
+    def search_many_with_info(self, queries: List[str], n_results: Union[int, List[int]] = 5,
+                              threshold: Union[float, List[float]] = 0.7, allow_semantic: bool = True,
+                              mode: str = "vector", rerank: bool = True) -> List[Dict]:
+        """
+        search_many() と同じ検索を行い、クエリごとのキャッシュの利用状況とあわせて返す。
+        完全一致キャッシュにヒットしたクエリは埋め込みも省略する。それ以外のクエリは必ず埋め込みを行い、
+        セマンティックキャッシュにもヒットしなかったクエリのみを ChromaDB で検索する。
+        lexical / hybrid の場合、語彙検索は埋め込みと並行して ChromaDB 用スレッドプールで実行する。
+        再ランキング時は候補を多めに取得し、CrossEncoder のスコアで並べ替えた上位 n_results 件を返す。
+        Args:
+            queries (List[str]): 検索クエリリスト
+            n_results (int | List[int]): 最大返却件数
+            threshold (float | List[float]): スコア閾値
+            allow_semantic (bool): False の場合はセマンティックキャッシュを使用しない（vector の場合のみ使用）
+            mode (str): 検索方式（"vector", "lexical", "hybrid"）
+            rerank (bool): 再ランキング（reranker 設定時のみ有効）を行うか
+        Returns:
+            List[Dict]: クエリ順のリスト（各要素は search_with_info() と同じ形式）
+        Raises:
+            ValueError: クエリごとの指定の長さが queries と一致しない場合、または不正な mode の場合
+        """
+        if not queries:
+            return []
+        started = time.perf_counter()
+        n_list, t_list = self._expand_per_query(queries, n_results, threshold)
+        self._check_mode(mode)
+        rerank = rerank and self.reranker is not None
+        infos, pending = self._cache_lookup_many(queries, n_list, t_list, mode, rerank)
+        if pending:
+            texts = [queries[entry[0]] for entry in pending]
+            n_candidates = self._candidate_count(max(n_list[entry[0]] for entry in pending), mode, rerank)
+            lexical_future = None
+            if mode != "vector":
+                lexical_future = get_executor("chroma").submit(self._lexical_search, texts, n_candidates)
+            remaining, result = [(entry, None) for entry in pending], None
+            if mode != "lexical":
+                embeddings = self.embedder.embed_array(texts)
+                remaining = self._semantic_lookup(infos, pending, embeddings, n_list, t_list,
+                                                  allow_semantic and mode == "vector", rerank)
+                if remaining:
+                    result = self._query(query_texts=None, n_results=n_candidates, embeddings=[e for _, e in remaining])
+            lexical = lexical_future.result() if lexical_future is not None else None
+            self._fill_pending(infos, remaining, result, queries, n_list, t_list, mode, lexical, rerank)
+        self._record_search(mode, infos, started)
+        return infos
+
+    async def asearch_many_with_info(self, queries: List[str], n_results: Union[int, List[int]] = 5,
+                                     threshold: Union[float, List[float]] = 0.7,
+                                     allow_semantic: bool = True, mode: str = "vector",
+                                     rerank: bool = True) -> List[Dict]:
+        """
+        search_many_with_info() の非同期版。語彙検索と埋め込みは asyncio.gather で並行して実行する。
+        Returns:
+            List[Dict]: search_many_with_info() と同じ形式
+        """
+        if not queries:
+            return []
+        started = time.perf_counter()
+        n_list, t_list = self._expand_per_query(queries, n_results, threshold)
+        self._check_mode(mode)
+        rerank = rerank and self.reranker is not None
+        infos, pending = self._cache_lookup_many(queries, n_list, t_list, mode, rerank)
+        if pending:
+            texts = [queries[entry[0]] for entry in pending]
+            n_candidates = self._candidate_count(max(n_list[entry[0]] for entry in pending), mode, rerank)
+            tasks = []
+            if mode != "lexical":
+                tasks.append(self.embedder.aembed_array(texts))
+            if mode != "vector":
+                tasks.append(run_blocking("chroma", self._lexical_search, texts, n_candidates))
+            outputs = await asyncio.gather(*tasks)
+            lexical = outputs[-1] if mode != "vector" else None
+            remaining, result = [(entry, None) for entry in pending], None
+            if mode != "lexical":
+                remaining = self._semantic_lookup(infos, pending, outputs[0], n_list, t_list,
+                                                  allow_semantic and mode == "vector", rerank)
+                if remaining:
+                    result = await run_blocking("chroma", self._query, query_texts=None, n_results=n_candidates,
+                                                embeddings=[e for _, e in remaining])
+            if rerank:
+                # CrossEncoder の推論はイベントループ外（埋め込み用スレッドプール）で実行
+                await run_blocking("embed", self._fill_pending, infos, remaining, result, queries, n_list, t_list,
+                                   mode, lexical, rerank)
+            else:
+                self._fill_pending(infos, remaining, result, queries, n_list, t_list, mode, lexical)
+        self._record_search(mode, infos, started)
+        return infos
+
+    @staticmethod
+    def _record_search(mode: str, infos: List[Dict], started: float) -> None:
+        """
+        検索全体の所要時間とクエリごとのキャッシュの利用状況を services.metrics に記録する。
+        内部メソッド。埋め込み・ChromaDB 検索の所要時間は InstrumentedEmbedder・InstrumentedCollection が記録する。
+        """
+        SEARCH_SECONDS.observe(time.perf_counter() - started, mode=mode)
+        for info in infos:
+            SEARCH_QUERIES.inc(mode=mode, cache=info["cache"])
+
+    @staticmethod
+    def _expand_per_query(queries: List[str], n_results, threshold):
+        """
+        返却件数・スコア閾値をクエリごとのリストに展開する。
+        内部メソッド。
+        """
+        n_list = list(n_results) if isinstance(n_results, (list, tuple)) else [n_results] * len(queries)
+        t_list = list(threshold) if isinstance(threshold, (list, tuple)) else [threshold] * len(queries)
+        if len(n_list) != len(queries) or len(t_list) != len(queries):
+            raise ValueError("n_results・threshold をクエリごとに指定する場合は queries と同じ件数にしてください。")
+        return n_list, t_list
+
+    def _check_mode(self, mode: str) -> None:
+        """
+        検索方式を検証する。
+        内部メソッド。
+        Raises:
+            ValueError: 不正な mode、または語彙インデックスが無効な状態で lexical / hybrid を指定した場合
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode は {', '.join(SEARCH_MODES)} のいずれかである必要があります: {mode}")
+        if mode != "vector" and self.lexical_index is None:
+            raise ValueError(f"語彙インデックス（lexical_index）が無効なため mode={mode} は使用できません。")
+
+    def _candidate_count(self, n_results: int, mode: str, rerank: bool = False) -> int:
+        """
+        各検索方式で取得する候補件数を返す。hybrid では統合前に、再ランキング時は並べ替え前に
+        n_results より多めに取得する。
+        内部メソッド。
+        """
+        count = n_results
+        if mode == "hybrid":
+            count = n_results * self.candidate_multiplier
+        if rerank:
+            count = max(count, self.reranker.candidate_count(n_results))
+        return count
+
+    def _cache_lookup_many(self, queries: List[str], n_list: List[int], t_list: List[float], mode: str = "vector",
+                           rerank: bool = False):
+        """
+        複数クエリについて検索結果キャッシュ（完全一致）を参照する。
+        内部メソッド。バージョンは検索前に読み取るため、検索中に更新があった結果は次回の参照で無効となる。
+        Returns:
+            Tuple: (クエリ順の search_with_info() 形式のリスト（未ヒットは None）,
+                    未ヒットの (位置, キャッシュキー, コレクションバージョン) リスト)
+        """
+        infos = [None] * len(queries)
+        pending = []
+        caching = self.search_cache is not None or self.semantic_cache is not None
+        version = self.version.current() if caching else None
+        for i, query in enumerate(queries):
+            key = None
+            if self.search_cache is not None:
+                key = self.search_cache.make_key(query, n_list[i], t_list[i], self.embedder.model_id, mode,
+                                                 self._reranker_id(rerank))
+                cached = self.search_cache.get(key, version)
+                if cached is not None:
+                    infos[i] = {"results": cached, "cache": "exact", "similarity": None, "rerank": None}
+                    continue
+            pending.append((i, key, version))
+        return infos, pending
+
+    def _semantic_lookup(self, infos: List, pending: List, embeddings: List[List[float]], n_list: List[int],
+                         t_list: List[float], allow_semantic: bool, rerank: bool = False) -> List:
+        """
+        埋め込み済みのクエリについてセマンティックキャッシュを参照し、ヒットした結果を infos に格納する。
+        内部メソッド。
+        Returns:
+            List: ChromaDB で検索が必要な ((位置, キャッシュキー, バージョン), 埋め込みベクトル) のリスト
+        """
+        remaining = []
+        for entry, embedding in zip(pending, embeddings):
+            i, _, version = entry
+            if self.semantic_cache is not None and allow_semantic:
+                hit = self.semantic_cache.lookup(embedding, self._semantic_params(n_list[i], t_list[i], rerank), version)
+                if hit is not None:
+                    infos[i] = {"results": hit[0], "cache": "semantic", "similarity": hit[1], "rerank": None}
+                    continue
+            remaining.append((entry, embedding))
+        return remaining
+
+    def _fill_pending(self, infos: List, remaining: List, result: Dict, queries: List[str], n_list: List[int],
+                      t_list: List[float], mode: str = "vector", lexical: List[List[Dict]] = None,
+                      rerank: bool = False) -> None:
+        """
+        キャッシュにヒットしなかったクエリの結果を整形（再ランキング時は並べ替え）して infos に格納し、
+        各キャッシュに保存する。
+        内部メソッド。result（ベクトル検索）と lexical（語彙検索）の各行は remaining の順に対応する。
+        """
+        for row, ((i, key, version), embedding) in enumerate(remaining):
+            n_candidates = self._candidate_count(n_list[i], mode, rerank)
+            if mode == "lexical":
+                results = lexical[row][:n_candidates]
+            elif mode == "hybrid":
+                vector_results = self._build_search_results(result, t_list[i], index=row)
+                results = self._fuse_rankings(vector_results, lexical[row], n_candidates)
+            else:
+                results = self._build_search_results(result, t_list[i], index=row, limit=n_candidates)
+            rerank_info = None
+            if rerank and results:
+                results, rerank_info = self.reranker.rerank(queries[i], results, n_list[i])
+            results = results[:n_list[i]]
+            infos[i] = {"results": results, "cache": "miss", "similarity": None, "rerank": rerank_info}
+            if self.search_cache is not None and key is not None:
+                self.search_cache.put(key, version, results)
+            if self.semantic_cache is not None and mode == "vector":
+                self.semantic_cache.add(embedding, self._semantic_params(n_list[i], t_list[i], rerank), version, results)
+
+    def _semantic_params(self, n_results: int, threshold: float, rerank: bool = False) -> Tuple:
+        """セマンティックキャッシュで一致を要求する検索条件を返す。内部メソッド。"""
+        return (int(n_results), round(float(threshold), 6), self.embedder.model_id, self._reranker_id(rerank))
+
+    def _reranker_id(self, rerank: bool) -> str:
+        """キャッシュキーに含める再ランキングモデルの識別子を返す（再ランキングしない場合は空文字）。内部メソッド。"""
+        return self.reranker.model_name if rerank else ""
+
+    def _lexical_search(self, queries: List[str], n_results: int) -> List[List[Dict]]:
+        """
+        語彙インデックス（BM25）で検索し、ChromaDB から本文・メタデータを取得して返却形式に整形する。
+        内部メソッド。
+        Args:
+            queries (List[str]): 検索クエリリスト
+            n_results (int): クエリごとの最大件数
+        Returns:
+            List[List[Dict]]: クエリ順の検索結果リスト（score は BM25 スコア）
+        """
+        hits = [self.lexical_index.search(query, n_results) for query in queries]
+        ids = list(dict.fromkeys(doc_id for query_hits in hits for doc_id, _ in query_hits))
+        if not ids:
+            return [[] for _ in queries]
+        result = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        records = {
+            doc_id: (doc, meta)
+            for doc_id, doc, meta in zip(result.get("ids", []), result.get("documents", []), result.get("metadatas", []))
+        }
+        outputs = []
+        for query_hits in hits:
+            # インデックスにあってコレクションに無いID（他プロセスで削除直後など）は除外
+            outputs.append([
+                self._to_search_result(records[doc_id][0], records[doc_id][1], round(score, 4))
+                for doc_id, score in query_hits if doc_id in records
+            ])
+        return outputs
+
+    def _fuse_rankings(self, vector_results: List[Dict], lexical_results: List[Dict], n_results: int) -> List[Dict]:
+        """
+        ベクトル検索と語彙検索の順位を Reciprocal Rank Fusion（score = Σ 1 / (k + 順位)）で統合する。
+        内部メソッド。
+        Args:
+            vector_results (List[Dict]): ベクトル検索の結果（類似度の降順）
+            lexical_results (List[Dict]): 語彙検索の結果（BM25 スコアの降順）
+            n_results (int): 最大返却件数
+        Returns:
+            List[Dict]: 統合スコアの降順の検索結果リスト（"vector_score", "lexical_score" に元のスコアを保持）
+        """
+        fused: Dict[Tuple, Dict] = {}
+        for source, results in (("vector_score", vector_results), ("lexical_score", lexical_results)):
+            for rank, r in enumerate(results, start=1):
+                key = (r["filename"], r["chunk_index"])
+                entry = fused.get(key)
+                if entry is None:
+                    entry = dict(r, score=0.0, vector_score=None, lexical_score=None)
+                    fused[key] = entry
+                entry["score"] += 1.0 / (self.rrf_k + rank)
+                entry[source] = r["score"]
+        for entry in fused.values():
+            entry["score"] = round(entry["score"], 6)
+        return sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:n_results]
+
+    def _build_search_results(self, result: Dict, threshold: float, index: int = 0, limit: int = None) -> List[Dict]:
+        """
+        ChromaDBの検索結果をスコア変換・閾値フィルタして返却形式に整形する。
+        内部メソッド。
+        Args:
+            result (Dict): collection.query() の戻り値
+            threshold (float): スコア閾値（0.0〜1.0）
+            index (int): 複数クエリ検索の場合、整形するクエリの位置
+            limit (int, optional): 先頭から使用する件数（未指定時は全件）
+        Returns:
+            List[Dict]: 検索結果リスト
+        """
+        docs = (result.get("documents") or [[]])[index][:limit]
+        metadatas = (result.get("metadatas") or [[]])[index][:limit]
+        scores = (result.get("distances") or [[]])[index][:limit]
         
         search_results = []
         for i, (doc, meta, score) in enumerate(zip(docs, metadatas, scores)):
-            # L2距離を類似度に変換
-            # L2距離では距離が小さいほど類似度が高い
-            # 式: similarity = 1 / (1 + distance)
-            # これにより、距離0 → 類似度1, 距離∞ → 類似度0 となる
-            similarity = 1.0 / (1.0 + score)
+            # コレクションの距離空間に応じて距離を類似度（0.0〜1.0）に変換
+            similarity = distance_to_similarity(score, self.space, self.normalize)
             
             if similarity >= threshold:
-                search_results.append({
-                    "filename": meta.get("filename", "(不明)"),
-                    "score": round(similarity, 4),
-                    "document": doc
-                })
+                search_results.append(self._to_search_result(doc, meta, round(similarity, 4)))
         
         return search_results
 
+    @staticmethod
+    def _to_search_result(doc: str, meta: Dict, score: float) -> Dict:
+        """ドキュメント本文・メタデータ・スコアを検索結果の辞書に変換する。内部メソッド。"""
+        return {
+            "filename": meta.get("filename", "(不明)"),
+            "score": score,
+            "document": doc,
+            "chunk_index": meta.get("chunk_index", 0),
+            "start_char": meta.get("start_char"),
+            "end_char": meta.get("end_char"),
+            "created_at": meta.get("created_at")
+        }
+
+    @staticmethod
+    def aggregate_by_file(results: List[Dict]) -> List[Dict]:
+        """
+        チャンク単位の検索結果をファイル単位に集約する。
+        ファイルのスコアはヒットしたチャンクの最大スコアとし、スコアの降順に並べる。
+        Args:
+            results (List[Dict]): search() の戻り値
+        Returns:
+            List[Dict]: ファイル単位の結果リスト（各要素は{"filename", "score", "hit_count", "chunks"}を含む辞書）
+        """
+        files: Dict[str, Dict] = {}
+        for r in results:
+            entry = files.get(r["filename"])
+            if entry is None:
+                entry = {"filename": r["filename"], "score": r["score"], "hit_count": 0, "chunks": []}
+                files[r["filename"]] = entry
+            entry["score"] = max(entry["score"], r["score"])
+            entry["hit_count"] += 1
+            entry["chunks"].append(r)
+        return sorted(files.values(), key=lambda f: f["score"], reverse=True)
+
     def get_file_list(self) -> List[Dict]:
         """
-        登録済みファイル一覧を取得する。
+        登録済みファイル一覧を全件取得する。
+        大量のファイルが登録されている場合は list_files() でページ単位に取得すること。
         Returns:
-            List[Dict]: ファイル情報リスト（各要素は{"filename", "directory", "created_at", "doc_id"}を含む辞書）
+            List[Dict]: ファイル情報リスト（各要素は{"filename", "directory", "created_at", "doc_id", "chunk_count"}を含む辞書）
         """
-        result = self.collection.get()
-        metadatas = result.get("metadatas", [])
-        ids = result.get("ids", [])
-        
         file_list = []
-        for i, meta in enumerate(metadatas):
-            file_list.append({
-                "filename": meta.get("filename", "(不明)"),
-                "directory": meta.get("directory", "/"),
-                "created_at": meta.get("created_at", "-"),
-                "doc_id": ids[i] if i < len(ids) else None
-            })
-        
+        for doc_id, meta in self._iter_file_heads():
+            file_list.append(self._to_file_info(doc_id, meta))
         return file_list
 
-    def update_directories(self, updates: List[Dict]) -> None:
+    def list_files(self, offset: int = 0, limit: int = 100, directory: str = None, sort_order: str = "desc",
+                   cursor: str = None) -> Dict:
+        """
+        登録済みファイル一覧をページ単位で取得する。
+        各ファイルの先頭チャンク（chunk_index == 0）のメタデータのみを取得し、ドキュメント本文は読み込まない。
+        コレクションを一定件数ずつ走査し、ページに必要な件数だけを保持するため、メモリ使用量は登録件数に依存しない。
+        Args:
+            offset (int): 先頭からの読み飛ばし件数（cursor 指定時は cursor からの読み飛ばし件数）
+            limit (int): 取得件数
+            directory (str, optional): 指定した場合はこのディレクトリのファイルのみ返す
+            sort_order (str): 登録日時（created_at）の並び順（"desc": 新しい順, "asc": 古い順）
+            cursor (str, optional): 前ページの next_cursor。指定した場合はその続きから取得する
+        Returns:
+            Dict: {"files", "total_count", "offset", "limit", "next_offset", "next_cursor"}
+                  （next_offset / next_cursor は次ページが無い場合 None）
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
+        """
+        if offset < 0:
+            raise ValueError(f"offset は0以上である必要があります: {offset}")
+        if limit < 1:
+            raise ValueError(f"limit は1以上である必要があります: {limit}")
+        if sort_order not in ("asc", "desc"):
+            raise ValueError(f"sort_order は 'asc' または 'desc' である必要があります: {sort_order}")
+
+        descending = sort_order == "desc"
+        after = self._decode_cursor(cursor) if cursor else None
+        keep = offset + limit + 1
+
+        # 並び順で先頭から keep 件だけを保持するヒープ
+        # （降順は最小ヒープ、昇順はキーを反転した最大ヒープとして扱う）
+        heap = []
+        total_count = 0
+        for doc_id, meta in self._iter_file_heads(directory):
+            total_count += 1
+            key = (meta.get("created_at", ""), doc_id)
+            if after is not None and ((key >= after) if descending else (key <= after)):
+                continue
+            item = (key if descending else _Reversed(key), doc_id, meta)
+            if len(heap) < keep:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+        ordered = sorted(heap, key=lambda x: x[0], reverse=True)
+        page = ordered[offset:offset + limit]
+        has_next = len(ordered) > offset + limit
+
+        files = [self._to_file_info(doc_id, meta) for _, doc_id, meta in page]
+        next_cursor = None
+        if has_next and page:
+            last_meta, last_id = page[-1][2], page[-1][1]
+            next_cursor = self._encode_cursor((last_meta.get("created_at", ""), last_id))
+        return {
+            "files": files,
+            "total_count": total_count,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if has_next and cursor is None else None,
+            "next_cursor": next_cursor
+        }
+
+    def _iter_file_heads(self, directory: str = None, batch_size: int = 1000):
+        """
+        各ファイルの先頭チャンクの（ID, メタデータ）を batch_size 件ずつ取得して順に返す。
+        メタデータのみを取得し、ドキュメント本文・埋め込みは読み込まない。
+        内部メソッド。
+        Args:
+            directory (str, optional): 指定した場合はこのディレクトリのファイルのみ返す
+            batch_size (int): 1回の取得件数
+        Yields:
+            Tuple[str, Dict]: (ドキュメントID, メタデータ)
+        """
+        where = {"chunk_index": 0}
+        if directory is not None:
+            where = {"$and": [{"chunk_index": 0}, {"directory": directory}]}
+        page_offset = 0
+        while True:
+            result = self.collection.get(where=where, include=["metadatas"], limit=batch_size, offset=page_offset)
+            ids = result.get("ids", [])
+            for doc_id, meta in zip(ids, result.get("metadatas", [])):
+                yield doc_id, meta
+            if len(ids) < batch_size:
+                break
+            page_offset += batch_size
+
+    @staticmethod
+    def _to_file_info(doc_id: str, meta: Dict) -> Dict:
+        """先頭チャンクのメタデータをファイル情報の辞書に変換する。内部メソッド。"""
+        return {
+            "filename": meta.get("filename", "(不明)"),
+            "directory": meta.get("directory", "/"),
+            "created_at": meta.get("created_at", "-"),
+            "doc_id": doc_id,
+            "chunk_count": meta.get("chunk_count", 1)
+        }
+
+    @staticmethod
+    def _encode_cursor(key) -> str:
+        """ページングカーソル（登録日時・ID）を文字列に変換する。内部メソッド。"""
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """ページングカーソル文字列を（登録日時・ID）に戻す。内部メソッド。"""
+        try:
+            created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+            return (created_at, doc_id)
+        except Exception:
+            raise ValueError(f"不正な cursor です: {cursor}")
+
+    async def aget_file_list(self) -> List[Dict]:
+        """
+        get_file_list() の非同期版。ChromaDB 用スレッドプールで実行する。
+        Returns:
+            List[Dict]: ファイル情報リスト（get_file_list() と同じ形式）
+        """
+        return await run_blocking("chroma", self.get_file_list)
+
+    async def alist_files(self, **kwargs) -> Dict:
+        """
+        list_files() の非同期版。ChromaDB 用スレッドプールで実行する。
+        Returns:
+            Dict: list_files() と同じ形式
+        """
+        return await run_blocking("chroma", self.list_files, **kwargs)
+
+    def update_directories(self, updates: List[Dict]) -> int:
         """
         複数ファイルのディレクトリを一括更新する。
+        doc_id で指定したファイルの全チャンクに同じディレクトリを設定する。
+        現在のディレクトリと同じ指定は無視し、変更があった行のみをまとめて更新する。
         Args:
             updates (List[Dict]): 更新情報リスト（各要素は{"doc_id", "new_directory"}を含む辞書）
+        Returns:
+            int: 更新したドキュメント（チャンク）数
         Raises:
             Exception: 更新処理でエラーが発生した場合
         """
-        result = self.collection.get()
-        metadatas = result.get("metadatas", [])
-        ids = result.get("ids", [])
-        
-        for update in updates:
-            doc_id = update.get("doc_id")
-            new_directory = update.get("new_directory")
-            
-            if doc_id and doc_id in ids:
-                idx = ids.index(doc_id)
-                new_meta = dict(metadatas[idx])
-                new_meta["directory"] = new_directory
-                self._update_metadata(doc_id, new_meta)
+        requested = {u["doc_id"]: u.get("new_directory", "/") for u in updates if u.get("doc_id")}
+        if not requested:
+            return 0
+
+        # 指定された doc_id のメタデータを1回で取得し、ファイル名 → 新ディレクトリの対応を作る
+        result = self.collection.get(ids=list(requested), include=["metadatas"])
+        changes = {}
+        for doc_id, meta in zip(result.get("ids", []), result.get("metadatas", [])):
+            new_directory = requested[doc_id]
+            if meta.get("directory", "/") != new_directory and meta.get("filename"):
+                changes[meta["filename"]] = {"directory": new_directory}
+        return self.update_file_metadata(changes)
+
+    def update_file_metadata(self, changes: Dict[str, Dict]) -> int:
+        """
+        ファイル単位のメタデータを一括更新する。
+        対象ファイルの全チャンクを where 条件付きで1回取得し、値が変わる行のみをまとめて更新する。
+        Args:
+            changes (Dict[str, Dict]): ファイル名 → 更新するメタデータ項目の辞書
+        Returns:
+            int: 更新したドキュメント（チャンク）数
+        Raises:
+            Exception: 更新処理でエラーが発生した場合
+        """
+        if not changes:
+            return 0
+
+        result = self.collection.get(where=self._filename_filter(list(changes)), include=["metadatas"])
+        ids = []
+        metadatas = []
+        for doc_id, meta in zip(result.get("ids", []), result.get("metadatas", [])):
+            patch = changes.get(meta.get("filename"), {})
+            if all(meta.get(key) == value for key, value in patch.items()):
+                continue
+            new_meta = dict(meta)
+            new_meta.update(patch)
+            ids.append(doc_id)
+            metadatas.append(new_meta)
+
+        try:
+            for start in range(0, len(ids), self._max_batch_size()):
+                end = start + self._max_batch_size()
+                self.collection.update(ids=ids[start:end], metadatas=metadatas[start:end])
+        except Exception as e:
+            raise Exception(f"メタデータ更新エラー: {e}")
+        if ids:
+            self.version.bump()
+        return len(ids)
+
+    def _max_batch_size(self) -> int:
+        """
+        ChromaDB が1回の書き込みで受け付ける最大件数を返す。
+        内部メソッド。
+        """
+        get_max = getattr(self.client, "get_max_batch_size", None)
+        if callable(get_max):
+            return get_max()
+        return getattr(self.client, "max_batch_size", 5000)
+
+
+class _Reversed:
+    """ヒープ上で比較順を反転させるためのラッパー（昇順ページングに使用）。"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+    def __gt__(self, other):
+        return self.key < other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
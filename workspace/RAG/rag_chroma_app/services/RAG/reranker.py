@@ -0,0 +1,139 @@
+"""
+クロスエンコーダーによる検索結果の再ランキング。
+ChromaDB 検索で多めに取得した候補について、（クエリ, パッセージ）のペアを
+sentence-transformers の CrossEncoder で CPU 上でバッチ単位にスコアリングし、上位 k 件を返す。
+処理時間の上限（latency budget）を超えた場合は、それまでにスコアリングした候補のみで並べ替える。
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class CrossEncoderReranker:
+    """
+    CrossEncoder を使った再ランキングクラス。
+    モデルは初回使用時（または load() 呼び出し時）に読み込むため、無効時・未使用時に sentence_transformers を import しない。
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", batch_size: int = 16,
+                 candidate_multiplier: int = 4, max_candidates: int = 50, latency_budget_ms: float = 300,
+                 max_length: int = 512, device: str = "cpu"):
+        """
+        CrossEncoderRerankerの初期化。
+        Args:
+            model_name (str): 使用する CrossEncoder モデル名
+            batch_size (int): 1回の推論でスコアリングする（クエリ, パッセージ）ペア数
+            candidate_multiplier (int): 再ランキング前に取得する候補数の n_results に対する倍率
+            max_candidates (int): 取得する候補数の上限
+            latency_budget_ms (float): 1クエリあたりの再ランキング時間の上限（ミリ秒、0以下で無制限）
+            max_length (int): CrossEncoder に入力する最大トークン数
+            device (str): 推論デバイス
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
+        """
+        if batch_size < 1:
+            raise ValueError(f"reranker.batch_size は1以上である必要があります: {batch_size}")
+        if candidate_multiplier < 1:
+            raise ValueError(f"reranker.candidate_multiplier は1以上である必要があります: {candidate_multiplier}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.candidate_multiplier = candidate_multiplier
+        self.max_candidates = max_candidates
+        self.latency_budget_ms = latency_budget_ms
+        self.max_length = max_length
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        CrossEncoder モデルを読み込む（読み込み済みの場合はそのまま返す）。
+        Returns:
+            CrossEncoder: 読み込んだモデル
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self._model
+
+    def candidate_count(self, n_results: int) -> int:
+        """
+        再ランキング前に取得する候補数を返す。
+        Args:
+            n_results (int): 最終的に返却する件数
+        Returns:
+            int: 候補数（n_results 以上）
+        """
+        return max(n_results, min(n_results * self.candidate_multiplier, self.max_candidates))
+
+    def rerank(self, query: str, results: List[Dict], top_k: int) -> Tuple[List[Dict], Dict]:
+        """
+        検索結果を CrossEncoder のスコアで並べ替え、上位 top_k 件を返す。
+        候補は元の順位の高い順にバッチ単位でスコアリングし、latency budget を超えた時点で打ち切る。
+        打ち切った場合、スコアリング済みの候補を先に、未スコアリングの候補を元の順位のまま後ろに並べる。
+        Args:
+            query (str): 検索クエリ
+            results (List[Dict]): 元の順位で並んだ検索結果（"document" を含む辞書）
+            top_k (int): 返却する件数
+        Returns:
+            Tuple[List[Dict], Dict]: (各要素に "rerank_score" を追加した上位 top_k 件,
+                                      {"candidates", "reranked", "truncated", "elapsed_ms"})
+        Raises:
+            Exception: 推論処理に失敗した場合
+        """
+        model = self.load()
+        start = time.perf_counter()
+        scores: List[float] = []
+        truncated = False
+        try:
+            for offset in range(0, len(results), self.batch_size):
+                if scores and self._elapsed_ms(start) >= self.latency_budget_ms > 0:
+                    truncated = True
+                    break
+                batch = results[offset:offset + self.batch_size]
+                pairs = [(query, r.get("document") or "") for r in batch]
+                scores.extend(float(s) for s in model.predict(pairs, batch_size=self.batch_size,
+                                                              show_progress_bar=False))
+        except Exception as e:
+            raise Exception(f"再ランキング処理に失敗: {e}。モデル: {self.model_name}、候補数: {len(results)}")
+
+        scored = [dict(r, rerank_score=round(score, 4)) for r, score in zip(results, scores)]
+        scored.sort(key=lambda r: r["rerank_score"], reverse=True)
+        unscored = [dict(r, rerank_score=None) for r in results[len(scores):]]
+        info = {
+            "candidates": len(results),
+            "reranked": len(scores),
+            "truncated": truncated,
+            "elapsed_ms": round(self._elapsed_ms(start), 1)
+        }
+        return (scored + unscored)[:top_k], info
+
+    @staticmethod
+    def _elapsed_ms(start: float) -> float:
+        """start からの経過時間（ミリ秒）を返す。内部メソッド。"""
+        return (time.perf_counter() - start) * 1000
+
+
+def create_reranker(config: dict) -> Optional[CrossEncoderReranker]:
+    """
+    config.yaml の reranker セクションから CrossEncoderReranker を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Optional[CrossEncoderReranker]: 再ランキングクラス（無効な場合は None）
+    """
+    reranker_config = (config or {}).get('reranker', {}) or {}
+    if not reranker_config.get('enabled', False):
+        return None
+    return CrossEncoderReranker(
+        model_name=reranker_config.get('model_name', "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"),
+        batch_size=int(reranker_config.get('batch_size', 16)),
+        candidate_multiplier=int(reranker_config.get('candidate_multiplier', 4)),
+        max_candidates=int(reranker_config.get('max_candidates', 50)),
+        latency_budget_ms=float(reranker_config.get('latency_budget_ms', 300)),
+        max_length=int(reranker_config.get('max_length', 512)),
+        device=reranker_config.get('device', "cpu")
+    )
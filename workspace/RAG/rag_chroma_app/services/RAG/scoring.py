@@ -0,0 +1,50 @@
+"""
+ChromaDB の距離から類似度スコア（0.0〜1.0）への変換と、埋め込みベクトルの正規化。
+変換式はコレクションの距離空間（hnsw:space）ごとに異なる。
+
+- cosine: 距離 = 1 - cos → 類似度 = cos
+- ip:     距離 = 1 - 内積 → 類似度 = 内積（正規化済みベクトルでは cos と同じ）
+- l2:     距離 = 二乗ユークリッド距離。正規化済みベクトルでは 距離 = 2 - 2cos となるため 類似度 = 1 - 距離 / 2、
+          正規化していない場合は上限が無いため 1 / (1 + 距離) で単調変換する
+"""
+
+from typing import List, Union
+
+import numpy as np
+
+from services.Vector.base_embedder import l2_normalize
+
+# 対応する距離空間
+SPACES = ("l2", "cosine", "ip")
+
+
+def distance_to_similarity(distance: float, space: str = "l2", normalized: bool = False) -> float:
+    """
+    ChromaDB の距離を類似度スコアに変換する。
+    Args:
+        distance (float): collection.query() が返す距離
+        space (str): コレクションの距離空間（"l2", "cosine", "ip"）
+        normalized (bool): 登録・検索に正規化済み（ノルム1）のベクトルを使用しているか
+    Returns:
+        float: 類似度スコア（0.0〜1.0、大きいほど類似）
+    Raises:
+        ValueError: 不正な space が指定された場合
+    """
+    if space == "l2":
+        similarity = 1.0 - distance / 2.0 if normalized else 1.0 / (1.0 + distance)
+    elif space in ("cosine", "ip"):
+        similarity = 1.0 - distance
+    else:
+        raise ValueError(f"space は {', '.join(SPACES)} のいずれかである必要があります: {space}")
+    return min(1.0, max(0.0, similarity))
+
+
+def normalize_vectors(vectors: Union[np.ndarray, List[List[float]]]) -> np.ndarray:
+    """
+    埋め込みベクトルを L2 ノルム 1 に正規化する（ゼロベクトルはそのまま返す）。
+    Args:
+        vectors (Union[np.ndarray, List[List[float]]]): 埋め込みベクトルの配列またはリスト
+    Returns:
+        np.ndarray: 正規化した float32 の配列（ChromaDB にそのまま渡せる）
+    """
+    return l2_normalize(vectors)
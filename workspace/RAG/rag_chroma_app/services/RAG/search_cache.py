@@ -0,0 +1,148 @@
+"""
+検索結果キャッシュ。
+（正規化したクエリ・返却件数・閾値・埋め込みモデル）をキーに検索結果を保持する LRU/TTL キャッシュ。
+各エントリは登録時のコレクションバージョンを持ち、バージョンが進んだエントリは自動的に無効となる。
+"""
+
+import copy
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    キャッシュキー用にクエリを正規化する（NFKC 正規化・前後空白除去・連続空白の1文字化）。
+    大文字・小文字は埋め込み結果に影響し得るため区別する。
+    Args:
+        query (str): 検索クエリ
+    Returns:
+        str: 正規化したクエリ
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query)).strip()
+
+
+class SearchResultCache:
+    """
+    LRU/TTL 方式の検索結果キャッシュ。
+    スレッドセーフであり、API サーバーの複数リクエストから同時に使用できる。
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        """
+        SearchResultCacheの初期化。
+        Args:
+            max_entries (int): 保持する最大エントリ数
+            ttl_seconds (float): エントリの有効期間（秒、0以下で無期限）
+        Raises:
+            ValueError: max_entries が1未満の場合
+        """
+        if max_entries < 1:
+            raise ValueError(f"search_cache.max_entries は1以上である必要があります: {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, n_results: int, threshold: float, model_id: str, *extra) -> Tuple:
+        """
+        キャッシュキーを作成する。
+        Args:
+            query (str): 検索クエリ
+            n_results (int): 返却件数
+            threshold (float): スコア閾値
+            model_id (str): 埋め込みモデルの識別子
+            *extra: 検索モードなど、結果に影響するその他の条件
+        Returns:
+            Tuple: キャッシュキー
+        """
+        return (normalize_query(query), int(n_results), round(float(threshold), 6), model_id) + tuple(extra)
+
+    def get(self, key: Tuple, version: int) -> Optional[List[Dict]]:
+        """
+        キャッシュから検索結果を取得する。
+        Args:
+            key (Tuple): make_key() で作成したキー
+            version (int): 現在のコレクションバージョン
+        Returns:
+            Optional[List[Dict]]: 検索結果のコピー（無い・期限切れ・バージョン不一致の場合は None）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, stored_at, results = entry
+                expired = self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds
+                if entry_version != version or expired:
+                    del self._entries[key]
+                    self.invalidations += 1
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(results)
+
+    def put(self, key: Tuple, version: int, results: List[Dict]) -> None:
+        """
+        検索結果をキャッシュに保存する。
+        Args:
+            key (Tuple): make_key() で作成したキー
+            version (int): 検索時のコレクションバージョン
+            results (List[Dict]): 検索結果
+        """
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """全エントリを削除する。"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        キャッシュの統計情報を返す。
+        Returns:
+            Dict: {"hits", "misses", "hit_rate", "size", "evictions", "invalidations"}
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+def create_search_cache(config: dict) -> Optional[SearchResultCache]:
+    """
+    config.yaml の search_cache セクションから SearchResultCache を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Optional[SearchResultCache]: キャッシュ（無効な場合は None）
+    """
+    cache_config = (config or {}).get('search_cache', {}) or {}
+    if not cache_config.get('enabled', False):
+        return None
+    return SearchResultCache(
+        max_entries=int(cache_config.get('max_entries', 1024)),
+        ttl_seconds=float(cache_config.get('ttl_seconds', 300))
+    )
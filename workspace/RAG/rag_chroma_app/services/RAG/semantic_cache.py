@@ -0,0 +1,152 @@
+"""
+セマンティッククエリキャッシュ。
+直近の検索クエリの埋め込みベクトルをメモリ上に保持し、新しいクエリの埋め込みとのコサイン類似度が
+閾値以上の既存クエリがあれば、その検索結果を再利用する（言い換えクエリで ChromaDB 検索を省略する）。
+クエリの埋め込み自体は常に行うため、埋め込み処理の結果が変わることはない。
+"""
+
+import copy
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """
+    埋め込みベクトルの近さで検索結果を再利用するキャッシュ。
+    最大 max_entries 件のクエリベクトルを正規化した行列として保持し、参照時は1回の行列積で全件と比較する。
+    件数を超えた場合は最も古いエントリから上書きする。
+    """
+
+    def __init__(self, similarity_threshold: float = 0.97, max_entries: int = 256, ttl_seconds: float = 300):
+        """
+        SemanticQueryCacheの初期化。
+        Args:
+            similarity_threshold (float): 結果を再利用するコサイン類似度の下限（0.0〜1.0）
+            max_entries (int): 保持するクエリの最大件数
+            ttl_seconds (float): エントリの有効期間（秒、0以下で無期限）
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
+        """
+        if not 0.0 < similarity_threshold <= 1.0:
+            raise ValueError(f"semantic_cache.similarity_threshold は0より大きく1以下である必要があります: {similarity_threshold}")
+        if max_entries < 1:
+            raise ValueError(f"semantic_cache.max_entries は1以上である必要があります: {max_entries}")
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        # 各行に対応する（検索条件, コレクションバージョン, 登録時刻, 検索結果）
+        self._entries: List[Optional[Tuple[Tuple, int, float, List[Dict]]]] = []
+        self._next = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: List[float], params: Tuple, version: int) -> Optional[Tuple[List[Dict], float]]:
+        """
+        検索条件とコレクションバージョンが同じで、埋め込みが最も近い既存クエリの検索結果を返す。
+        Args:
+            embedding (List[float]): クエリの埋め込みベクトル
+            params (Tuple): 検索条件（返却件数・閾値・埋め込みモデルなど）
+            version (int): 現在のコレクションバージョン
+        Returns:
+            Optional[Tuple[List[Dict], float]]: (検索結果のコピー, コサイン類似度)。該当が無い場合は None
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            best = None
+            if self._vectors is not None and self._vectors.shape[1] == query.shape[0]:
+                similarities = self._vectors[:len(self._entries)] @ query
+                now = time.monotonic()
+                for row in np.argsort(-similarities):
+                    similarity = float(similarities[row])
+                    if similarity < self.similarity_threshold:
+                        break
+                    entry = self._entries[row]
+                    if entry is None or entry[0] != params or entry[1] != version:
+                        continue
+                    if self.ttl_seconds > 0 and now - entry[2] > self.ttl_seconds:
+                        continue
+                    best = (entry[3], similarity)
+                    break
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(best[0]), round(best[1], 4)
+
+    def add(self, embedding: List[float], params: Tuple, version: int, results: List[Dict]) -> None:
+        """
+        クエリの埋め込みと検索結果を登録する。
+        Args:
+            embedding (List[float]): クエリの埋め込みベクトル
+            params (Tuple): 検索条件
+            version (int): 検索時のコレクションバージョン
+            results (List[Dict]): 検索結果
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # 埋め込みモデルの変更で次元が変わった場合は作り直す
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._entries = []
+                self._next = 0
+            row = self._next
+            self._vectors[row] = vector
+            entry = (params, version, time.monotonic(), copy.deepcopy(results))
+            if row < len(self._entries):
+                self._entries[row] = entry
+            else:
+                self._entries.append(entry)
+            self._next = (row + 1) % self.max_entries
+
+    def clear(self) -> None:
+        """全エントリを削除する。"""
+        with self._lock:
+            self._vectors = None
+            self._entries = []
+            self._next = 0
+
+    def stats(self) -> Dict:
+        """
+        キャッシュの統計情報を返す。
+        Returns:
+            Dict: {"hits", "misses", "hit_rate", "size"}
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries)
+            }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """埋め込みベクトルを float32 の単位ベクトルに変換する。内部メソッド。"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+
+def create_semantic_cache(config: dict) -> Optional[SemanticQueryCache]:
+    """
+    config.yaml の semantic_cache セクションから SemanticQueryCache を作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Optional[SemanticQueryCache]: キャッシュ（無効な場合は None）
+    """
+    cache_config = (config or {}).get('semantic_cache', {}) or {}
+    if not cache_config.get('enabled', False):
+        return None
+    return SemanticQueryCache(
+        similarity_threshold=float(cache_config.get('similarity_threshold', 0.97)),
+        max_entries=int(cache_config.get('max_entries', 256)),
+        ttl_seconds=float(cache_config.get('ttl_seconds', 300))
+    )
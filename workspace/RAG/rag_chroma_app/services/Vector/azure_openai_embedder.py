@@ -4,7 +4,9 @@ Azure OpenAI埋め込みクライアント
 
 from typing import List
 import requests
+from requests.adapters import HTTPAdapter
 from .base_embedder import BaseEmbedder
+from .batching import EmbeddingBatcher, order_by_index
 
 
 class AzureOpenAIEmbedder(BaseEmbedder):
@@ -14,7 +16,8 @@ class AzureOpenAIEmbedder(BaseEmbedder):
     Azure OpenAI Service のデプロイメントエンドポイントを使用します。
     """
 
-    def __init__(self, api_key: str, endpoint: str, deployment_name: str, api_version: str = "2024-02-01"):
+    def __init__(self, api_key: str, endpoint: str, deployment_name: str, api_version: str = "2024-02-01",
+                 batcher: EmbeddingBatcher = None):
         """
         AzureOpenAIEmbedderの初期化。
         
@@ -23,6 +26,7 @@ class AzureOpenAIEmbedder(BaseEmbedder):
             endpoint (str): Azure OpenAIエンドポイントURL（例: https://your-resource.openai.azure.com）
             deployment_name (str): デプロイメント名（例: text-embedding-ada-002）
             api_version (str): APIバージョン（デフォルト: 2024-02-01）
+            batcher (EmbeddingBatcher, optional): リクエストの分割・並列送信・リトライ設定（未指定時はデフォルト設定）
         """
         self.api_key = api_key
         self.endpoint = endpoint.rstrip('/')
@@ -32,9 +36,21 @@ class AzureOpenAIEmbedder(BaseEmbedder):
         # Azure OpenAI Embeddings エンドポイントURL
         self.embeddings_url = f"{self.endpoint}/openai/deployments/{self.deployment_name}/embeddings?api-version={self.api_version}"
 
+        self.batcher = batcher or EmbeddingBatcher()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.batcher.max_concurrency, pool_maxsize=self.batcher.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def model_id(self) -> str:
+        """エンドポイント・デプロイメント名による識別子。"""
+        return f"azure-openai:{self.endpoint}:{self.deployment_name}"
+
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
         テキストリストをAzure OpenAI APIでベクトル化する。
+        テキストは件数・推定トークン数の上限でサブバッチに分割され、並列に送信される。
         
         Args:
             texts (List[str]): ベクトル化するテキストのリスト
@@ -43,7 +59,24 @@ class AzureOpenAIEmbedder(BaseEmbedder):
             List[List[float]]: 埋め込みベクトルのリスト
             
         Raises:
-            Exception: 埋め込み処理に失敗した場合
+            Exception: 埋め込み処理に失敗した場合（リトライ上限到達を含む）
+        """
+        try:
+            return self.batcher.run(texts, self._post_batch)
+            
+        except requests.exceptions.RequestException as e:
+            raise Exception(
+                f"Azure OpenAI API呼び出しに失敗: {e}。"
+                f"エンドポイント: {self.embeddings_url}、テキスト数: {len(texts)}"
+            )
+
+    def _post_batch(self, batch: List[str]) -> List[List[float]]:
+        """
+        1サブバッチ分のテキストを Azure OpenAI API に送信する。内部メソッド。
+        
+        Raises:
+            requests.exceptions.RequestException: API呼び出しに失敗した場合（リトライ判定に使用）
+            Exception: レスポンスの解析に失敗した場合
         """
         headers = {
             "Content-Type": "application/json",
@@ -51,18 +84,18 @@ class AzureOpenAIEmbedder(BaseEmbedder):
         }
         
         payload = {
-            "input": texts
+            "input": batch
         }
         
+        response = self.session.post(
+            self.embeddings_url,
+            json=payload,
+            headers=headers,
+            timeout=30
+        )
+        response.raise_for_status()
+        
         try:
-            response = requests.post(
-                self.embeddings_url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
             result = response.json()
             
             # Azure OpenAI APIのレスポンス形式:
@@ -76,18 +109,10 @@ class AzureOpenAIEmbedder(BaseEmbedder):
                 raise ValueError(f"予期しないレスポンスフォーマット: {result}")
             
             # インデックス順にソートして埋め込みを抽出
-            embeddings_data = sorted(result["data"], key=lambda x: x["index"])
-            embeddings = [item["embedding"] for item in embeddings_data]
-            
-            return embeddings
+            return order_by_index(result["data"])
             
-        except requests.exceptions.RequestException as e:
-            raise Exception(
-                f"Azure OpenAI API呼び出しに失敗: {e}。"
-                f"エンドポイント: {self.embeddings_url}、テキスト数: {len(texts)}"
-            )
         except (KeyError, ValueError) as e:
             raise Exception(
                 f"Azure OpenAI APIレスポンスの解析に失敗: {e}。"
-                f"レスポンス: {response.text if 'response' in locals() else 'N/A'}"
+                f"レスポンス: {response.text}"
             )
@@ -6,6 +6,26 @@
 from abc import ABC, abstractmethod
 from typing import List
 
+import numpy as np
+
+from ..concurrency import run_blocking
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """
+    行ごとに L2 ノルム 1 に正規化する（ゼロベクトルはそのまま返す）。
+    Args:
+        matrix (np.ndarray): (件数, 次元数) の行列
+    Returns:
+        np.ndarray: 正規化した float32 の行列
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
 
 class BaseEmbedder(ABC):
     """
@@ -13,6 +33,17 @@ class BaseEmbedder(ABC):
     OpenRouter、Ollama など、異なるバックエンドの Embedder はこれを継承する。
     """
 
+    @property
+    def model_id(self) -> str:
+        """
+        埋め込み結果を一意に識別するための「バックエンド:モデル」識別子。
+        キャッシュのキーなどに使用する。同じ識別子の Embedder は同じテキストに対し同じベクトルを返すこと。
+        
+        Returns:
+            str: 識別子（サブクラスでオーバーライドする）
+        """
+        return type(self).__name__
+
     @abstractmethod
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
@@ -28,3 +59,50 @@ class BaseEmbedder(ABC):
             Exception: 埋め込み処理に失敗した場合
         """
         pass
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        テキストリストを非同期にベクトル化する。
+        デフォルト実装では embed() を埋め込み用スレッドプールで実行し、イベントループをブロックしない。
+        ネイティブな非同期クライアントを持つ Embedder はオーバーライドしてよい。
+        
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+            
+        Returns:
+            List[List[float]]: 各テキストに対応する埋め込みベクトルリスト
+            
+        Raises:
+            Exception: 埋め込み処理に失敗した場合
+        """
+        return await run_blocking("embed", self.embed, texts)
+
+    def embed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        テキストリストをベクトル化し、(件数, 次元数) の float32 の numpy 配列で返す。
+        ベクトルごとに Python の float オブジェクトを作らないため、大量のチャンクの登録ではこちらを使用する。
+        デフォルト実装では embed() の結果を変換する。numpy 配列を直接得られる Embedder はオーバーライドしてよい。
+        
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+            normalize (bool): L2 ノルム 1 に正規化するか
+            
+        Returns:
+            np.ndarray: 各行がテキストに対応する埋め込みベクトル（texts が空の場合は (0, 0) の配列）
+            
+        Raises:
+            Exception: 埋め込み処理に失敗した場合
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        embeddings = np.asarray(self.embed(texts), dtype=np.float32)
+        return l2_normalize(embeddings) if normalize else embeddings
+
+    async def aembed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        embed_array() の非同期版。埋め込み用スレッドプールで実行し、イベントループをブロックしない。
+        
+        Returns:
+            np.ndarray: embed_array() と同じ形式
+        """
+        return await run_blocking("embed", self.embed_array, texts, normalize)
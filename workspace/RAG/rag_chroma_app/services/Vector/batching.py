@@ -0,0 +1,200 @@
+"""
+埋め込みリクエストの分割・並列送信を行う共通バッチ処理。
+入力テキストを件数と推定トークン数の上限でサブバッチに分割し、上限付きの並列数で送信する。
+リトライはサブバッチ単位で行うため、一部の失敗で全体をやり直すことはない。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import requests
+
+# 再試行対象とする HTTP ステータス（レート制限・サーバーエラー）
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する。
+    CJK 文字などの非 ASCII 文字は1文字1トークン、ASCII 文字は4文字1トークンとして数える。
+    Args:
+        text (str): 対象テキスト
+    Returns:
+        int: 推定トークン数（最低1）
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return max(1, (len(text) - ascii_chars) + (ascii_chars + 3) // 4)
+
+
+def order_by_index(data: List[dict]) -> List[List[float]]:
+    """
+    OpenAI 互換レスポンスの data 配列を index フィールド順に並べ、埋め込みベクトルを取り出す。
+    Args:
+        data (List[dict]): {"embedding": [...], "index": n} のリスト
+    Returns:
+        List[List[float]]: index 順の埋め込みベクトルリスト
+    """
+    return [item["embedding"] for item in sorted(data, key=lambda x: x["index"])]
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    例外がリトライで回復し得るものかを判定する。
+    Args:
+        error (Exception): 発生した例外
+    Returns:
+        bool: 接続エラー・タイムアウト・レート制限・サーバーエラーの場合 True
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS
+    return False
+
+
+class EmbeddingBatcher:
+    """
+    埋め込みリクエストをサブバッチに分割して並列送信し、入力順に結果を組み立てるクラス。
+    各 Embedder は1サブバッチ分のテキストを埋め込む関数を渡すだけでよい。
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_batch_tokens: int = 8000, max_concurrency: int = 4,
+                 max_retries: int = 3, retry_backoff: float = 1.0):
+        """
+        EmbeddingBatcherの初期化。
+        Args:
+            max_batch_size (int): 1サブバッチに含める最大テキスト数
+            max_batch_tokens (int): 1サブバッチの推定トークン数の上限（1テキストで超える場合は単独で送信）
+            max_concurrency (int): 同時に送信するサブバッチ数の上限
+            max_retries (int): サブバッチごとの最大リトライ回数
+            retry_backoff (float): リトライ待機時間の基準秒数（試行ごとに2倍）
+        Raises:
+            ValueError: 不正な値が指定された場合
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size は1以上である必要があります: {max_batch_size}")
+        if max_batch_tokens < 1:
+            raise ValueError(f"max_batch_tokens は1以上である必要があります: {max_batch_tokens}")
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency は1以上である必要があります: {max_concurrency}")
+        if max_retries < 0:
+            raise ValueError(f"max_retries は0以上である必要があります: {max_retries}")
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def split(self, texts: List[str]) -> List[List[int]]:
+        """
+        テキストリストを件数・推定トークン数の上限でサブバッチに分割する。
+        Args:
+            texts (List[str]): 分割対象のテキストリスト
+        Returns:
+            List[List[int]]: サブバッチごとの入力インデックスリスト（入力順）
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.max_batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(self, texts: List[str], embed_batch: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """
+        テキストリストをサブバッチに分割して並列に埋め込み、入力順の結果を返す。
+        Args:
+            texts (List[str]): 埋め込み対象のテキストリスト
+            embed_batch (Callable): 1サブバッチ分のテキストを受け取り、同じ順序の埋め込みベクトルリストを返す関数
+        Returns:
+            List[List[float]]: 入力順の埋め込みベクトルリスト
+        Raises:
+            Exception: リトライ上限に達したサブバッチ、またはリトライ対象外のエラーが発生した場合
+        """
+        if not texts:
+            return []
+
+        batches = self.split(texts)
+
+        def process(indices: List[int]) -> List[List[float]]:
+            batch_texts = [texts[i] for i in indices]
+            embeddings = self._call_with_retry(embed_batch, batch_texts)
+            if len(embeddings) != len(indices):
+                raise ValueError(f"埋め込み件数が一致しません: 入力 {len(indices)} 件、出力 {len(embeddings)} 件")
+            return embeddings
+
+        if len(batches) == 1 or self.max_concurrency == 1:
+            batch_results = [process(indices) for indices in batches]
+        else:
+            batch_results = list(self._get_pool().map(process, batches))
+
+        results: List[List[float]] = [None] * len(texts)
+        for indices, embeddings in zip(batches, batch_results):
+            for i, embedding in zip(indices, embeddings):
+                results[i] = embedding
+        return results
+
+    def _call_with_retry(self, embed_batch: Callable, batch_texts: List[str]) -> List[List[float]]:
+        """
+        1サブバッチの埋め込みを指数バックオフ付きで再試行する。内部メソッド。
+        Retry-After ヘッダーが返された場合はその秒数を優先して待機する。
+        """
+        attempt = 0
+        while True:
+            try:
+                return embed_batch(batch_texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """リトライまでの待機秒数を求める。内部メソッド。"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return self.retry_backoff * (2 ** attempt)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """サブバッチ送信用のスレッドプールを取得する（初回呼び出し時に生成）。内部メソッド。"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed-batch")
+            return self._pool
+
+
+def create_batcher(section: dict, default_batch_size: int = 64) -> EmbeddingBatcher:
+    """
+    config.yaml の埋め込みバックエンド設定（generic / azure_openai セクション）から EmbeddingBatcher を作成する。
+    Args:
+        section (dict): バックエンドの設定セクション
+        default_batch_size (int): batch_size 未指定時の値
+    Returns:
+        EmbeddingBatcher: バッチ処理クラス
+    """
+    section = section or {}
+    return EmbeddingBatcher(
+        max_batch_size=int(section.get('batch_size', default_batch_size)),
+        max_batch_tokens=int(section.get('max_batch_tokens', 8000)),
+        max_concurrency=int(section.get('concurrency', 4)),
+        max_retries=int(section.get('max_retries', 3)),
+        retry_backoff=float(section.get('retry_backoff', 1.0))
+    )
@@ -0,0 +1,225 @@
+"""
+埋め込み結果をキャッシュする Embedder ラッパー。
+任意の BaseEmbedder をラップし、（バックエンド・モデル・テキストのハッシュ）をキーに
+ベクトルを SQLite（float32 のバイナリ）へ永続化する。前段にメモリ上の LRU キャッシュを持つ。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .base_embedder import BaseEmbedder, l2_normalize
+
+# SQLite の IN 句に渡すキー数の上限
+_LOOKUP_CHUNK = 500
+
+
+class CachingEmbedder(BaseEmbedder):
+    """
+    埋め込みキャッシュ付き Embedder。
+    キャッシュに無いテキストのみをラップ対象の Embedder でベクトル化する。
+    同じファイルの再登録や同一クエリの再検索では埋め込み API・モデル推論を呼び出さない。
+    """
+
+    def __init__(self, embedder: BaseEmbedder, cache_path: str, memory_items: int = 10000):
+        """
+        CachingEmbedderの初期化。
+        Args:
+            embedder (BaseEmbedder): ラップする Embedder
+            cache_path (str): キャッシュを保存する SQLite ファイルのパス
+            memory_items (int): メモリ上の LRU キャッシュに保持する最大件数（0で無効）
+        Raises:
+            ValueError: embedder が BaseEmbedder でない場合、または cache_path が未指定の場合
+        """
+        if not isinstance(embedder, BaseEmbedder):
+            raise ValueError(f"embedder は BaseEmbedder の実装である必要があります。受け取ったタイプ: {type(embedder)}")
+        if not cache_path:
+            raise ValueError("埋め込みキャッシュのパス（embedding_cache.path）が未指定である。")
+
+        self.embedder = embedder
+        self.cache_path = cache_path
+        self.memory_items = memory_items
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(cache_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        # API サーバーと Streamlit が同じファイルを共有できるよう WAL モードを使用
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def model_id(self) -> str:
+        """ラップ対象の Embedder の識別子をそのまま返す。"""
+        return self.embedder.model_id
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        テキストリストをベクトル化する。キャッシュ済みのテキストは保存済みベクトルを返す。
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+        Returns:
+            List[List[float]]: 各テキストに対応する埋め込みベクトルリスト
+        Raises:
+            Exception: ラップ対象の Embedder で埋め込み処理に失敗した場合
+        """
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        テキストリストをベクトル化し、float32 の numpy 配列で返す。キャッシュ済みのテキストは保存済みベクトルを使用する。
+        キャッシュには正規化前のベクトルを保存するため、normalize の指定に関わらず同じキャッシュを共有する。
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+            normalize (bool): L2 ノルム 1 に正規化するか
+        Returns:
+            np.ndarray: (テキスト数, 次元数) の埋め込みベクトル
+        Raises:
+            Exception: ラップ対象の Embedder で埋め込み処理に失敗した場合
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        model_id = self.model_id
+        keys = [self._make_key(text, model_id) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        # メモリ上の LRU キャッシュ
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+
+        # ディスク（SQLite）キャッシュ
+        pending = [key for key in dict.fromkeys(keys) if key not in found]
+        if pending:
+            from_disk = self._load(pending)
+            with self._lock:
+                self.disk_hits += len(from_disk)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+            found.update(from_disk)
+
+        # キャッシュに無いテキストのみ埋め込む（同一テキストは1回だけ）
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embedder.embed_array(list(missing.values()))
+            # 行ごとにコピーし、LRU に残った1行のためにバッチ全体の配列が保持されないようにする
+            new_entries = {key: vector.copy() for key, vector in zip(missing.keys(), vectors)}
+            found.update(new_entries)
+            # 埋め込み中に識別子が確定した場合（Ollama のエンドポイント判定など）は確定後の識別子のキーで保存する
+            current_id = self.model_id
+            if current_id != model_id:
+                new_entries = {self._make_key(text, current_id): new_entries[key] for key, text in missing.items()}
+            self._store(new_entries)
+            with self._lock:
+                self.misses += len(new_entries)
+                for key, vector in new_entries.items():
+                    self._remember(key, vector)
+
+        matrix = np.stack([found[key] for key in keys])
+        return l2_normalize(matrix) if normalize else matrix
+
+    def stats(self) -> Dict:
+        """
+        キャッシュのヒット・ミス件数を返す。
+        Returns:
+            Dict: {"memory_hits", "disk_hits", "misses", "hit_rate", "memory_size"}
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "memory_size": len(self._memory)
+            }
+
+    def close(self) -> None:
+        """SQLite 接続を閉じる。"""
+        with self._lock:
+            self._conn.close()
+
+    # ===================== 内部処理 =====================
+
+    @staticmethod
+    def _make_key(text: str, model_id: str) -> str:
+        """（バックエンド・モデル・テキスト）のハッシュからキャッシュキーを作成する。内部メソッド。"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model_id}\0{digest}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """メモリ上の LRU キャッシュに追加する（ロック取得済みで呼び出すこと）。内部メソッド。"""
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """SQLite からベクトルを一括取得する。内部メソッド。"""
+        result = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    result[key] = np.frombuffer(blob, dtype=np.float32)
+        return result
+
+    def _store(self, entries: Dict[str, np.ndarray]) -> None:
+        """ベクトルを float32 のバイナリとして SQLite に保存する。内部メソッド。"""
+        rows = [(key, int(vector.shape[0]), np.asarray(vector, dtype=np.float32).tobytes())
+                for key, vector in entries.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+
+def wrap_with_cache(embedder: BaseEmbedder, config: dict) -> BaseEmbedder:
+    """
+    config.yaml の embedding_cache セクションが有効な場合、Embedder をキャッシュ付きでラップする。
+    Args:
+        embedder (BaseEmbedder): ラップする Embedder
+        config (dict): 設定値辞書
+    Returns:
+        BaseEmbedder: CachingEmbedder（無効な場合は embedder をそのまま返す）
+    """
+    cache_config: Optional[dict] = (config or {}).get('embedding_cache', {}) or {}
+    if not cache_config.get('enabled', False):
+        return embedder
+    return CachingEmbedder(
+        embedder=embedder,
+        cache_path=cache_config.get('path', '../embedding_cache.sqlite3'),
+        memory_items=int(cache_config.get('memory_items', 10000))
+    )
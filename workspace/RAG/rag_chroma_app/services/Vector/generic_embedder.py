@@ -4,26 +4,30 @@ OpenRouter、Ollama、Azure OpenAI など、OpenAI API 互換エンドポイン
 """
 
 from typing import List
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from .base_embedder import BaseEmbedder
+from .batching import EmbeddingBatcher, order_by_index
 
 
 class GenericEmbedder(BaseEmbedder):
     """
     OpenAI API 互換エンドポイント用汎用埋め込みクライアントクラス。
-    
+
     対応サービス:
     - OpenRouter（https://openrouter.ai/）
     - Ollama（http://localhost:11434）
     - その他 OpenAI API 互換エンドポイント
-    
+
     指定モデル・エンドポイントでテキストから埋め込みベクトルを取得する。
     """
 
-    def __init__(self, api_key: str, embedding_url: str, model: str):
+    def __init__(self, api_key: str, embedding_url: str, model: str, batcher: EmbeddingBatcher = None,
+                 use_batch_endpoint: bool = True):
         """
         汎用埋め込みクライアントの初期化。
-        
+
         Args:
             api_key (str): APIキー（Ollama などのローカルサーバーでは空文字列でOK）
             embedding_url (str): 埋め込みAPIエンドポイントURL
@@ -34,62 +38,171 @@ class GenericEmbedder(BaseEmbedder):
                 例:
                 - OpenRouter: text-embedding-nomic-embed-text-v1.5@q8_0
                 - Ollama: nomic-embed-text, mxbai-embed-large など
+            batcher (EmbeddingBatcher, optional): リクエストの分割・並列送信・リトライ設定（未指定時はデフォルト設定）
+            use_batch_endpoint (bool): Ollama の一括埋め込みエンドポイント（/api/embed）を使用するか。
+                /api/embed は正規化済みベクトルを返すため、/api/embeddings で登録済みのコレクションと
+                混在させる場合は False にするか再登録すること。
         """
         self.api_key = api_key
         self.embedding_url = embedding_url
         self.model = model
+        self.use_batch_endpoint = use_batch_endpoint
+        self.batcher = batcher or EmbeddingBatcher()
+
+        # /api/embed が無い古い Ollama 向けに、1テキストずつ並列送信するバッチャー
+        self._single_batcher = EmbeddingBatcher(
+            max_batch_size=1,
+            max_batch_tokens=self.batcher.max_batch_tokens,
+            max_concurrency=self.batcher.max_concurrency,
+            max_retries=self.batcher.max_retries,
+            retry_backoff=self.batcher.retry_backoff
+        )
+
+        # 接続を再利用するため、同時リクエスト数分のコネクションプールを持つセッションを使用
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.batcher.max_concurrency, pool_maxsize=self.batcher.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Ollama の一括埋め込みエンドポイント（/api/embed）が使えるか（None は未判定）
+        self._ollama_batch_supported = None if use_batch_endpoint else False
+        self._probe_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """
+        エンドポイント・モデル名による識別子。
+        Ollama は使用するエンドポイントで区別する（/api/embed は正規化済み、/api/embeddings は未正規化のベクトルを返す）。
+        設定から決まる値を返し、通信は行わない。/api/embed の使用を設定していても、
+        最初の埋め込み時に存在しないと判定された場合は以降 /api/embeddings の識別子を返す。
+        """
+        if "/api/embeddings" in (self.embedding_url or "") and self._ollama_batch_supported is not False:
+            return f"generic:{self.embedding_url}:{self.model}:embed"
+        return f"generic:{self.embedding_url}:{self.model}"
+
+    def _headers(self) -> dict:
+        """リクエストヘッダーを作成する。内部メソッド。"""
+        headers = {
+            "Content-Type": "application/json"
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _resolve_ollama_batch_support(self) -> bool:
+        """
+        Ollama の /api/embed が使えるかを返す（未判定の場合は短いテキストを1件送信して確認する）。
+        内部メソッド。embed() からのみ呼び出し、判定結果は以降の model_id に反映される。
+        Raises:
+            requests.HTTPError: 確認のリクエストが /api/embed の有無以外の理由で失敗した場合
+        """
+        if self._ollama_batch_supported is None:
+            with self._probe_lock:
+                if self._ollama_batch_supported is None:
+                    try:
+                        self._post_ollama_batch(["probe"], self._headers())
+                        self._ollama_batch_supported = True
+                    except _BatchEndpointUnavailable:
+                        self._ollama_batch_supported = False
+        return self._ollama_batch_supported
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
         テキストリストから埋め込みベクトルを取得する。
-        
+        テキストは件数・推定トークン数の上限でサブバッチに分割され、並列に送信される。
+
         Args:
             texts (List[str]): 埋め込み対象のテキストリスト
-            
+
         Returns:
             List[List[float]]: 各テキストに対応する埋め込みベクトルリスト
-            
+
         Raises:
             ValueError: モデルまたはエンドポイント未指定時
-            requests.HTTPError: APIリクエスト失敗時
+            requests.HTTPError: APIリクエスト失敗時（リトライ上限到達を含む）
         """
-        headers = {
-            "Content-Type": "application/json"
-        }
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
+        headers = self._headers()
 
         if not self.model:
             raise ValueError("埋め込みモデルが未指定である。コンストラクタ引数で指定すること。")
         if not self.embedding_url:
             raise ValueError("埋め込みエンドポイントURLが未指定である。コンストラクタ引数で指定すること。")
 
-        embeddings = []
-        
         # Ollama の場合（/api/embeddings エンドポイント）
         if "/api/embeddings" in self.embedding_url:
-            # Ollama は1テキストずつ処理する必要がある
-            for text in texts:
-                data = {
-                    "model": self.model,
-                    "prompt": text
-                }
-                response = requests.post(self.embedding_url, headers=headers, json=data, timeout=30)
-                response.raise_for_status()
-                result = response.json()
-                embeddings.append(result["embedding"])
-        else:
-            # OpenAI API 互換形式（OpenRouter など）
-            data = {
-                "input": texts,
-                "model": self.model
-            }
-            response = requests.post(self.embedding_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            embeddings = [item["embedding"] for item in result["data"]]
-        
-        return embeddings
+            return self._embed_ollama(texts, headers)
+
+        # OpenAI API 互換形式（OpenRouter など）
+        return self.batcher.run(texts, lambda batch: self._post_openai(batch, headers))
+
+    def _post_openai(self, batch: List[str], headers: dict) -> List[List[float]]:
+        """OpenAI API 互換エンドポイントに1サブバッチを送信する。内部メソッド。"""
+        data = {
+            "input": batch,
+            "model": self.model
+        }
+        response = self.session.post(self.embedding_url, headers=headers, json=data, timeout=30)
+        response.raise_for_status()
+        return order_by_index(response.json()["data"])
+
+    def _embed_ollama(self, texts: List[str], headers: dict) -> List[List[float]]:
+        """
+        Ollama でテキストリストをベクトル化する。
+        一括埋め込みエンドポイント（/api/embed）が使える場合はサブバッチごとにまとめて送信し、
+        使えない古い Ollama では1テキストずつのリクエストを並列に送信する。
+        内部メソッド。
+        """
+        if not texts:
+            return []
+
+        if self._resolve_ollama_batch_support():
+            return self.batcher.run(texts, lambda batch: self._post_ollama_batch(batch, headers))
+        return self._single_batcher.run(texts, lambda batch: [self._post_ollama_single(batch[0], headers)])
+
+    def _post_ollama_batch(self, batch: List[str], headers: dict) -> List[List[float]]:
+        """Ollama の /api/embed に複数テキストをまとめて送信する。内部メソッド。"""
+        batch_url = self.embedding_url.replace("/api/embeddings", "/api/embed")
+        data = {
+            "model": self.model,
+            "input": batch
+        }
+        response = self.session.post(batch_url, headers=headers, json=data, timeout=30)
+        if self._ollama_batch_supported is None and self._endpoint_missing(response):
+            raise _BatchEndpointUnavailable()
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    @staticmethod
+    def _endpoint_missing(response: requests.Response) -> bool:
+        """
+        /api/embed のレスポンスがエンドポイントの不在を示すかを判定する。内部メソッド。
+        /api/embed はモデルが無い場合も 404 を返す（{"error": "model ... not found"}）ため、
+        その場合はエンドポイントの不在とみなさず、HTTP エラーとして送出させる。
+        """
+        if response.status_code == 405:
+            return True
+        if response.status_code != 404:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        error = str(body.get("error", "")) if isinstance(body, dict) else ""
+        return "model" not in error.lower()
+
+    def _post_ollama_single(self, text: str, headers: dict) -> List[float]:
+        """Ollama の /api/embeddings に1テキストを送信する。内部メソッド。"""
+        data = {
+            "model": self.model,
+            "prompt": text
+        }
+        response = self.session.post(self.embedding_url, headers=headers, json=data, timeout=30)
+        response.raise_for_status()
+        return response.json()["embedding"]
+
+
+class _BatchEndpointUnavailable(Exception):
+    """Ollama の一括埋め込みエンドポイントが存在しないことを示す内部例外。"""
 
 
 # 互換性のためのエイリアス
@@ -0,0 +1,88 @@
+"""
+埋め込みバックエンドの呼び出しを計測する Embedder ラッパー。
+バックエンドごとの1回の呼び出しの所要時間・テキスト数・推定トークン数を services.metrics に記録する。
+埋め込みキャッシュの内側（実際にバックエンドを呼び出す位置）に挟むため、キャッシュにヒットしたテキストは計測しない。
+"""
+
+import time
+from typing import List
+
+import numpy as np
+
+from ..metrics import EMBED_ERRORS, EMBED_SECONDS, EMBED_TEXTS, EMBED_TOKENS, METRICS
+from .base_embedder import BaseEmbedder
+from .batching import estimate_tokens
+
+
+class InstrumentedEmbedder(BaseEmbedder):
+    """
+    計測付き Embedder。
+    embed() / embed_array() をラップ対象の同名メソッドにそのまま委譲し、前後で所要時間を記録する。
+    """
+
+    def __init__(self, embedder: BaseEmbedder, backend: str):
+        """
+        InstrumentedEmbedderの初期化。
+        Args:
+            embedder (BaseEmbedder): ラップする Embedder
+            backend (str): メトリクスの backend ラベル（embedder.type）
+        Raises:
+            ValueError: embedder が BaseEmbedder でない場合
+        """
+        if not isinstance(embedder, BaseEmbedder):
+            raise ValueError(f"embedder は BaseEmbedder の実装である必要があります。受け取ったタイプ: {type(embedder)}")
+        self.embedder = embedder
+        self.backend = backend
+
+    def __getattr__(self, name: str):
+        # close()・batch_size などバックエンド固有の属性はラップ対象をそのまま参照する
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    @property
+    def model_id(self) -> str:
+        """ラップ対象の Embedder の識別子をそのまま返す。"""
+        return self.embedder.model_id
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        ラップ対象の embed() を呼び出し、所要時間を記録する。
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+        Returns:
+            List[List[float]]: 各テキストに対応する埋め込みベクトルリスト
+        Raises:
+            Exception: ラップ対象の Embedder で埋め込み処理に失敗した場合
+        """
+        return self._measure(self.embedder.embed, texts)
+
+    def embed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        ラップ対象の embed_array() を呼び出し、所要時間を記録する。
+        Args:
+            texts (List[str]): ベクトル化するテキストリスト
+            normalize (bool): L2 ノルム 1 に正規化するか
+        Returns:
+            np.ndarray: (テキスト数, 次元数) の埋め込みベクトル
+        Raises:
+            Exception: ラップ対象の Embedder で埋め込み処理に失敗した場合
+        """
+        return self._measure(self.embedder.embed_array, texts, normalize)
+
+    def _measure(self, func, texts: List[str], *args):
+        """func(texts, *args) を呼び出し、所要時間・テキスト数・推定トークン数を記録する。内部メソッド。"""
+        if not texts or not METRICS.enabled:
+            return func(texts, *args)
+        labels = {"backend": self.backend, "model": self.embedder.model_id}
+        start = time.perf_counter()
+        try:
+            result = func(texts, *args)
+        except Exception:
+            EMBED_ERRORS.inc(**labels)
+            raise
+        finally:
+            EMBED_SECONDS.observe(time.perf_counter() - start, **labels)
+        EMBED_TEXTS.inc(len(texts), **labels)
+        EMBED_TOKENS.inc(sum(estimate_tokens(text) for text in texts), **labels)
+        return result
@@ -0,0 +1,227 @@
+"""
+ONNX Runtime 埋め込みクライアント
+export_onnx_model.py で Sentence-Transformers のモデルを変換した ONNX モデルを CPU で推論する。
+動的 int8 量子化したモデルを使用でき、トークナイズは tokenizers（Rust 実装）で一括して行う。
+"""
+
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from .base_embedder import BaseEmbedder, l2_normalize
+
+# モデルディレクトリ内のファイル名（export_onnx_model.py が作成する）
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "onnx_config.json"
+
+
+def quantize_model(model_path: str, quantized_path: str) -> None:
+    """
+    ONNX モデルを動的 int8 量子化する（重みを int8 で保持し、活性化は推論時に量子化する）。
+    Args:
+        model_path (str): 量子化元（float32）のモデルのパス
+        quantized_path (str): 量子化したモデルの保存先
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # 他のプロセスが同時に量子化しても不完全なファイルを読み込まないよう、一時ファイルに書き出してから置き換える
+    tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+    try:
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, quantized_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class OnnxEmbedder(BaseEmbedder):
+    """
+    ONNX Runtime を使ってテキストをベクトル化するクラス。
+
+    PyTorch を使用せずに CPU で推論するため、SentenceTransformerEmbedder より読み込み・推論が速い。
+    quantize を有効にすると動的 int8 量子化したモデルを使用する（float32 のモデルとの精度差は check_parity() で確認する）。
+    onnxruntime・tokenizers はこのクラスを使用する場合のみ import する。
+    """
+
+    def __init__(self, model_directory: str, quantize: bool = True, threads: int = 0, batch_size: int = 32,
+                 max_length: int = None):
+        """
+        OnnxEmbedderの初期化。
+
+        Args:
+            model_directory (str): export_onnx_model.py で作成したモデルディレクトリ
+            quantize (bool): 動的 int8 量子化したモデルを使用するか（量子化済みのモデルが無い場合は作成する）
+            threads (int): 1回の推論で使用するスレッド数（0 の場合は ONNX Runtime の既定値＝物理コア数）
+            batch_size (int): 1回の推論でまとめるテキスト数
+            max_length (int, optional): 最大トークン数（未指定時は変換元モデルの max_seq_length）
+
+        Raises:
+            ValueError: モデルディレクトリに必要なファイルが無い場合、または不正なパラメータが指定された場合
+        """
+        if batch_size < 1:
+            raise ValueError(f"onnx.batch_size は1以上である必要があります: {batch_size}")
+        if threads < 0:
+            raise ValueError(f"onnx.threads は0以上である必要があります: {threads}")
+        for filename in (MODEL_FILE, TOKENIZER_FILE, CONFIG_FILE):
+            if not os.path.exists(os.path.join(model_directory, filename)):
+                raise ValueError(
+                    f"ONNX モデルディレクトリに {filename} がありません: {model_directory}"
+                    "（export_onnx_model.py でモデルを変換してください）"
+                )
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_directory, CONFIG_FILE), "r", encoding="utf-8") as f:
+            model_config = json.load(f)
+        self.model_directory = model_directory
+        self.model_name = model_config["model_name"]
+        self.pooling = model_config.get("pooling", "mean")
+        self.normalize_output = bool(model_config.get("normalize", False))
+        self.pad_token_id = int(model_config.get("pad_token_id", 0))
+        self.max_length = int(max_length or model_config.get("max_length", 512))
+        self.quantize = quantize
+        self.threads = threads
+        self.batch_size = batch_size
+
+        model_path = os.path.join(model_directory, MODEL_FILE)
+        if quantize:
+            quantized_path = os.path.join(model_directory, QUANTIZED_MODEL_FILE)
+            if not os.path.exists(quantized_path):
+                quantize_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {item.name for item in self.session.get_inputs()}
+
+        # パディングは長さ順に並べたバッチごとに行うため、トークナイザーでは切り詰めのみ設定する
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_directory, TOKENIZER_FILE))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+
+    @property
+    def model_id(self) -> str:
+        """
+        変換元のモデル名と量子化の有無による識別子。
+        量子化したモデルはベクトルがわずかに異なるため、float32 のモデルとは別の識別子とする。
+        """
+        return f"onnx:{self.model_name}" + (":int8" if self.quantize else "")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        テキストリストを ONNX Runtime でベクトル化する。
+
+        Args:
+            texts (List[str]): ベクトル化するテキストのリスト
+
+        Returns:
+            List[List[float]]: 埋め込みベクトルのリスト
+
+        Raises:
+            Exception: 埋め込み処理に失敗した場合
+        """
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        テキストリストを ONNX Runtime でベクトル化し、float32 の numpy 配列で返す。
+        全テキストを一括でトークナイズし、トークン数の順に並べてバッチにまとめる（バッチ内のパディングを最小にする）。
+
+        Args:
+            texts (List[str]): ベクトル化するテキストのリスト
+            normalize (bool): L2 ノルム 1 に正規化するか（変換元のモデルが正規化する場合は常に正規化される）
+
+        Returns:
+            np.ndarray: (テキスト数, 次元数) の埋め込みベクトル
+
+        Raises:
+            Exception: 埋め込み処理に失敗した場合
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        try:
+            # Sentence-Transformers と同様に前後の空白を除いてトークナイズする
+            encodings = self.tokenizer.encode_batch([text.strip() for text in texts])
+            order = np.argsort([-len(encoding.ids) for encoding in encodings], kind="stable")
+            embeddings = None
+            for start in range(0, len(order), self.batch_size):
+                indices = order[start:start + self.batch_size]
+                batch = self._run([encodings[i] for i in indices])
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+                embeddings[indices] = batch
+            if self.normalize_output or normalize:
+                embeddings = l2_normalize(embeddings)
+            return embeddings
+
+        except Exception as e:
+            raise Exception(
+                f"ONNX Runtime 埋め込み処理に失敗: {e}。"
+                f"モデル: {self.model_name}、テキスト数: {len(texts)}"
+            )
+
+    def _run(self, encodings: List) -> np.ndarray:
+        """1バッチ分のトークン列をパディングして推論し、プーリングしたベクトルを返す。内部メソッド。"""
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.full((len(encodings), length), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.pooling == "cls":
+            return hidden[:, 0].astype(np.float32)
+        # パディングを除いたトークンの平均（Sentence-Transformers の mean pooling と同じ）
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return ((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+def check_parity(reference: BaseEmbedder, candidate: BaseEmbedder, texts: List[str],
+                 min_cosine: float = 0.99) -> Dict:
+    """
+    2つの Embedder（PyTorch のモデルと ONNX・量子化したモデルなど）の埋め込みの一致度を確認する。
+    各テキストのベクトルのコサイン類似度と、テキスト間で最も類似するテキスト（最近傍）が一致する割合を求める。
+    Args:
+        reference (BaseEmbedder): 基準とする Embedder
+        candidate (BaseEmbedder): 比較する Embedder
+        texts (List[str]): 比較に使用するテキスト（最近傍の比較には2件以上必要）
+        min_cosine (float): 合格とするコサイン類似度の最小値
+    Returns:
+        Dict: {"texts", "min_cosine", "mean_cosine", "nearest_neighbor_agreement", "passed"}
+    Raises:
+        ValueError: 次元数が一致しない場合
+    """
+    expected = reference.embed_array(texts, normalize=True)
+    actual = candidate.embed_array(texts, normalize=True)
+    if expected.shape != actual.shape:
+        raise ValueError(f"埋め込みの次元数が一致しません: {expected.shape} と {actual.shape}")
+    cosines = (expected * actual).sum(axis=1)
+
+    agreement = 1.0
+    if len(texts) > 1:
+        expected_sim = expected @ expected.T
+        actual_sim = actual @ actual.T
+        np.fill_diagonal(expected_sim, -np.inf)
+        np.fill_diagonal(actual_sim, -np.inf)
+        agreement = float((expected_sim.argmax(axis=1) == actual_sim.argmax(axis=1)).mean())
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "nearest_neighbor_agreement": round(agreement, 4),
+        "passed": bool(cosines.min() >= min_cosine)
+    }
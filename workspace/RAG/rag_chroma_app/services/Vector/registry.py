@@ -0,0 +1,139 @@
+"""
+埋め込みバックエンドのレジストリ。
+config.yaml の embedder.type からバックエンドのクラスと設定セクションを引き、選択されたバックエンドのモジュールのみを import する。
+sentence_transformers（torch）・onnxruntime などの重いライブラリは、そのバックエンドを使用する場合のみ読み込まれる。
+"""
+
+import importlib
+from typing import Callable, Dict, List, NamedTuple
+
+from .base_embedder import BaseEmbedder
+from .caching_embedder import wrap_with_cache
+from .instrumented_embedder import InstrumentedEmbedder
+
+
+class EmbedderSpec(NamedTuple):
+    """埋め込みバックエンドの登録情報。"""
+    module: str  # バックエンドのクラスを定義するモジュール（"." を含まない場合は services.Vector からの相対名）
+    class_name: str  # クラス名
+    options: Callable[[dict], dict]  # config からコンストラクタの引数を作成する関数
+
+
+def _generic_options(config: dict) -> dict:
+    """generic セクションから GenericEmbedder の引数を作成する。内部関数。"""
+    from .batching import create_batcher
+    section = config['generic']
+    return {
+        "api_key": section['api_key'],
+        "embedding_url": section['embedding_url'],
+        "model": section['model'],
+        "batcher": create_batcher(section, default_batch_size=32),
+        "use_batch_endpoint": section.get('use_batch_endpoint', True)
+    }
+
+
+def _azure_openai_options(config: dict) -> dict:
+    """azure_openai セクションから AzureOpenAIEmbedder の引数を作成する。内部関数。"""
+    from .batching import create_batcher
+    section = config['azure_openai']
+    return {
+        "api_key": section['api_key'],
+        "endpoint": section['endpoint'],
+        "deployment_name": section['deployment_name'],
+        "api_version": section.get('api_version', '2024-02-01'),
+        "batcher": create_batcher(section)
+    }
+
+
+def _sentence_transformer_options(config: dict) -> dict:
+    """sentence_transformer セクションから SentenceTransformerEmbedder の引数を作成する。内部関数。"""
+    section = config['sentence_transformer']
+    return {
+        "model_name": section['model_name'],
+        "batch_size": int(section.get('batch_size', 32)),
+        "processes": int(section.get('processes', 0)),
+        "multi_process_min_texts": int(section.get('multi_process_min_texts', 256))
+    }
+
+
+def _onnx_options(config: dict) -> dict:
+    """onnx セクションから OnnxEmbedder の引数を作成する。内部関数。"""
+    section = config['onnx']
+    return {
+        "model_directory": section['model_directory'],
+        "quantize": section.get('quantize', True),
+        "threads": int(section.get('threads', 0)),
+        "batch_size": int(section.get('batch_size', 32)),
+        "max_length": section.get('max_length')
+    }
+
+
+# embedder.type → バックエンドの登録情報
+_REGISTRY: Dict[str, EmbedderSpec] = {
+    "generic": EmbedderSpec("generic_embedder", "GenericEmbedder", _generic_options),
+    "azure-openai": EmbedderSpec("azure_openai_embedder", "AzureOpenAIEmbedder", _azure_openai_options),
+    "sentence-transformer": EmbedderSpec("sentence_transformer_service", "SentenceTransformerEmbedder",
+                                         _sentence_transformer_options),
+    "onnx": EmbedderSpec("onnx_embedder", "OnnxEmbedder", _onnx_options),
+}
+
+
+def register_embedder(name: str, module: str, class_name: str, options: Callable[[dict], dict]) -> None:
+    """
+    埋め込みバックエンドを登録する（同名の登録は上書きする）。
+    Args:
+        name (str): embedder.type に指定する名前
+        module (str): クラスを定義するモジュール（"." を含まない場合は services.Vector からの相対名）
+        class_name (str): BaseEmbedder を継承したクラス名
+        options (Callable[[dict], dict]): config からコンストラクタの引数を作成する関数
+    """
+    _REGISTRY[name] = EmbedderSpec(module, class_name, options)
+
+
+def available_embedders() -> List[str]:
+    """
+    登録されている embedder.type の一覧を返す。
+    Returns:
+        List[str]: embedder.type に指定できる名前
+    """
+    return list(_REGISTRY)
+
+
+def load_embedder_class(name: str) -> type:
+    """
+    バックエンドのモジュールを import し、Embedder クラスを返す。
+    Args:
+        name (str): embedder.type
+    Returns:
+        type: BaseEmbedder を継承したクラス
+    Raises:
+        ValueError: 登録されていない embedder.type の場合
+    """
+    spec = _REGISTRY.get(name)
+    if spec is None:
+        raise ValueError(
+            f"不正な embedder.type: {name}。{', '.join(repr(n) for n in _REGISTRY)} のいずれかを指定してください。"
+        )
+    if "." in spec.module:
+        module = importlib.import_module(spec.module)
+    else:
+        module = importlib.import_module(f".{spec.module}", __package__)
+    return getattr(module, spec.class_name)
+
+
+def create_embedder(config: dict) -> BaseEmbedder:
+    """
+    config.yaml の embedder.type に基づいて Embedder を作成する。
+    バックエンドの呼び出しは InstrumentedEmbedder で計測し（metrics.enabled が false の場合は記録しない）、
+    埋め込みキャッシュ（embedding_cache）が有効な場合はさらにキャッシュ付きでラップする。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        BaseEmbedder: 作成した Embedder
+    Raises:
+        ValueError: 不正な embedder.type が指定された場合
+    """
+    name = (config or {}).get('embedder', {}).get('type', 'generic')
+    embedder_class = load_embedder_class(name)
+    embedder = InstrumentedEmbedder(embedder_class(**_REGISTRY[name].options(config)), backend=name)
+    return wrap_with_cache(embedder, config)
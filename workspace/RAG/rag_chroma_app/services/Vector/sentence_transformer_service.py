@@ -2,7 +2,11 @@
 Sentence-Transformers埋め込みクライアント
 """
 
+import atexit
+import threading
 from typing import List
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from .base_embedder import BaseEmbedder
 
@@ -10,46 +14,115 @@ from .base_embedder import BaseEmbedder
 class SentenceTransformerEmbedder(BaseEmbedder):
     """
     Sentence-Transformers を使ってテキストをベクトル化するクラス。
-    
+
     ローカルで動作し、事前学習済みモデルを自動ダウンロードして使用します。
+    processes に2以上を指定すると、件数の多い入力はマルチプロセスのエンコードプールで CPU の各コアに分散して処理します。
     """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", batch_size: int = 32, processes: int = 0,
+                 multi_process_min_texts: int = 256):
         """
         SentenceTransformerEmbedderの初期化。
-        
+
         Args:
             model_name (str): 使用するモデル名（デフォルト: all-MiniLM-L6-v2）
                               推奨モデル:
                               - all-MiniLM-L6-v2: 軽量・高速（384次元）
                               - paraphrase-multilingual-MiniLM-L12-v2: 多言語対応（384次元）
                               - all-mpnet-base-v2: 高精度（768次元）
+            batch_size (int): 1回の推論でまとめるテキスト数
+            processes (int): エンコードプールのプロセス数（0・1 の場合はこのプロセスで推論する）
+            multi_process_min_texts (int): エンコードプールを使用する最小テキスト数
+                                           （プロセス間のデータ転送のほうが高くつく少量の入力・検索クエリはこのプロセスで推論する）
+
+        Raises:
+            ValueError: 不正なパラメータが指定された場合
         """
+        if batch_size < 1:
+            raise ValueError(f"sentence_transformer.batch_size は1以上である必要があります: {batch_size}")
+        if processes < 0:
+            raise ValueError(f"sentence_transformer.processes は0以上である必要があります: {processes}")
         self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes
+        self.multi_process_min_texts = multi_process_min_texts
         self.model = SentenceTransformer(model_name)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """モデル名による識別子。"""
+        return f"sentence-transformer:{self.model_name}"
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
         テキストリストをSentence-Transformersでベクトル化する。
-        
+
         Args:
             texts (List[str]): ベクトル化するテキストのリスト
-            
+
         Returns:
             List[List[float]]: 埋め込みベクトルのリスト
-            
+
         Raises:
             Exception: 埋め込み処理に失敗した場合
         """
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        テキストリストをSentence-Transformersでベクトル化し、float32 の numpy 配列で返す。
+        テキストは長さ順に並べてバッチにまとめるため、バッチ内のパディングが少なくなる。
+
+        Args:
+            texts (List[str]): ベクトル化するテキストのリスト
+            normalize (bool): L2 ノルム 1 に正規化するか
+
+        Returns:
+            np.ndarray: (テキスト数, 次元数) の埋め込みベクトル
+
+        Raises:
+            Exception: 埋め込み処理に失敗した場合
+        """
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension() or 0), dtype=np.float32)
         try:
-            # Sentence-Transformersでテキストを埋め込み
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
-            
-            # numpy配列をリストに変換
-            return embeddings.tolist()
-                
+            if self.processes > 1 and len(texts) >= self.multi_process_min_texts:
+                # encode_multi_process は入力順にチャンク分割するため、長さ順に並べてから渡し、結果を元の順序に戻す
+                order = np.argsort([-len(text) for text in texts], kind="stable")
+                sorted_embeddings = self.model.encode_multi_process(
+                    [texts[i] for i in order], self._get_pool(),
+                    batch_size=self.batch_size, normalize_embeddings=normalize
+                )
+                embeddings = np.empty_like(sorted_embeddings)
+                embeddings[order] = sorted_embeddings
+            else:
+                # encode は内部で長さ順に並べてバッチにまとめ、入力順で返す
+                embeddings = self.model.encode(
+                    texts, batch_size=self.batch_size, convert_to_numpy=True,
+                    normalize_embeddings=normalize, show_progress_bar=False
+                )
+            return np.asarray(embeddings, dtype=np.float32)
+
         except Exception as e:
             raise Exception(
                 f"Sentence-Transformers埋め込み処理に失敗: {e}。"
                 f"モデル: {self.model_name}、テキスト数: {len(texts)}"
             )
+
+    def close(self) -> None:
+        """エンコードプールのプロセスを停止する（起動していない場合は何もしない）。"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+    def _get_pool(self) -> dict:
+        """エンコードプールを取得する（初回呼び出し時に起動）。内部メソッド。"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+                # 子プロセスが残らないよう終了時に停止する
+                atexit.register(self.close)
+            return self._pool
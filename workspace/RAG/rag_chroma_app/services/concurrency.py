@@ -0,0 +1,104 @@
+"""
+ブロッキング処理をイベントループ外で実行するためのスレッドプール管理。
+埋め込み（HTTP 呼び出し・モデル推論）・ChromaDB 操作・アップロードファイルのテキスト抽出・リソースの再構築で
+別々の上限付きプールを使用し、いずれかが詰まっても他の処理は進むようにする。
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# プール名ごとのデフォルトスレッド数
+DEFAULT_MAX_WORKERS = {
+    "embed": 8,
+    "chroma": 4,
+    "ingest": 2,
+    "reload": 1,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_max_workers: Dict[str, int] = dict(DEFAULT_MAX_WORKERS)
+_lock = threading.Lock()
+
+
+def resolve_max_workers(config: dict) -> Dict[str, int]:
+    """
+    config.yaml の executor セクションからプールごとのスレッド数を求める（プールは変更しない）。
+    Args:
+        config (dict): 設定値辞書（executor.embed_workers, executor.chroma_workers, executor.ingest_workers,
+                       executor.reload_workers を参照）
+    Returns:
+        Dict[str, int]: プール名ごとのスレッド数
+    Raises:
+        ValueError: 1未満のスレッド数が指定された場合
+    """
+    executor_config = (config or {}).get('executor', {}) or {}
+    sizes = {}
+    for name in DEFAULT_MAX_WORKERS:
+        size = int(executor_config.get(f"{name}_workers", DEFAULT_MAX_WORKERS[name]))
+        if size < 1:
+            raise ValueError(f"executor.{name}_workers は1以上である必要があります: {size}")
+        sizes[name] = size
+    return sizes
+
+
+def configure_executors(config: dict) -> None:
+    """
+    config.yaml の executor セクションからプールサイズを設定する。
+    すべてのサイズを検証してから適用するため、不正な設定の場合はどのプールも変更しない。
+    既に生成済みのプールはサイズが変わった場合のみ新しいプールに差し替える。
+    旧プールは停止せず、取得済みの呼び出し元（実行中の再読み込みを含む）が使い終わった後にガベージコレクションで解放される。
+    Args:
+        config (dict): 設定値辞書（resolve_max_workers() を参照）
+    Raises:
+        ValueError: 1未満のスレッド数が指定された場合
+    """
+    sizes = resolve_max_workers(config)
+    with _lock:
+        for name, size in sizes.items():
+            if _max_workers.get(name) != size:
+                _max_workers[name] = size
+                _executors.pop(name, None)
+
+
+def get_executor(name: str = "embed") -> ThreadPoolExecutor:
+    """
+    名前付きの上限付きスレッドプールを取得する（初回呼び出し時に生成）。
+    Args:
+        name (str): プール名（"embed", "chroma", "ingest" または "reload"）
+    Returns:
+        ThreadPoolExecutor: スレッドプール
+    """
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=_max_workers.get(name, DEFAULT_MAX_WORKERS["embed"]),
+                thread_name_prefix=f"rag-{name}"
+            )
+            _executors[name] = executor
+        return executor
+
+
+async def run_blocking(pool: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    ブロッキング関数を指定プールで実行し、完了を await する。
+    Args:
+        pool (str): 使用するプール名
+        func (Callable): 実行する関数
+        *args, **kwargs: 関数に渡す引数
+    Returns:
+        Any: 関数の戻り値
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(pool), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """生成済みのスレッドプールをすべて停止する。"""
+    with _lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False)
+        _executors.clear()
@@ -0,0 +1,540 @@
+"""
+処理段階ごとのレイテンシ・スループットを計測するメトリクス。
+埋め込み（バックエンド別）・ChromaDB 操作・登録・検索の所要時間をヒストグラムに、処理件数をカウンターに記録し、
+API サーバーの /metrics エンドポイントから Prometheus のテキスト形式で公開する。
+Streamlit・スクリプトなど Prometheus から収集できないプロセスでは、シンク（MetricsSink）で記録ごとに出力先へ送る。
+外部ライブラリに依存せず、すべての操作はスレッドセーフである。
+"""
+
+import json
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# レイテンシ用ヒストグラムの既定のバケット（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """Prometheus のラベル値をエスケープする。内部関数。"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """ラベルを {name="value",...} 形式に整形する（ラベルが無い場合は空文字）。内部関数。"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Prometheus の数値表記に整形する。内部関数。"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsSink(ABC):
+    """
+    メトリクスの記録の出力先の基底クラス。
+    MetricsRegistry.add_sink() で登録すると、カウンター・ゲージ・ヒストグラムへの記録ごとに record() が呼び出される。
+    記録は計測対象の処理のスレッドで同期的に呼び出されるため、重い処理はバッファリングするなどして短時間で返すこと。
+    """
+
+    @abstractmethod
+    def record(self, kind: str, name: str, labels: Dict[str, str], value: float) -> None:
+        """
+        1件の記録を受け取る。
+        Args:
+            kind (str): メトリクスの種類（"counter", "gauge", "histogram"）
+            name (str): メトリクス名
+            labels (Dict[str, str]): ラベル
+            value (float): カウンターは増分、ゲージは設定値、ヒストグラムは観測値
+        """
+        pass
+
+    def close(self) -> None:
+        """出力先を閉じる。"""
+
+
+class JsonLinesSink(MetricsSink):
+    """
+    記録を JSON Lines 形式でファイルに追記するシンク。
+    Streamlit・スクリプトの計測結果を後から集計する用途に使用する（1行が1件の記録）。
+    """
+
+    def __init__(self, path: str, flush_every: int = 100):
+        """
+        JsonLinesSinkの初期化。
+        Args:
+            path (str): 出力先のファイルパス（存在する場合は追記する）
+            flush_every (int): ファイルへ書き出す間隔（記録件数）
+        """
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, labels: Dict[str, str], value: float) -> None:
+        """記録を1行の JSON として書き込む。"""
+        line = json.dumps({"ts": round(time.time(), 3), "kind": kind, "name": name, "labels": labels, "value": value},
+                          ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self) -> None:
+        """バッファを書き出してファイルを閉じる。"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class _Metric:
+    """ラベルの組み合わせごとに値を保持するメトリクスの共通処理。内部クラス。"""
+
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """ラベルを labelnames の順の値のタプルに変換する。内部メソッド。"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"メトリクス {self.name} のラベルは {', '.join(self.labelnames) or 'なし'} である必要があります: "
+                             f"{', '.join(labels) or 'なし'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self) -> None:
+        """記録済みの値をすべて消去する。"""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """単調増加する累計値（処理件数・トークン数など）。1秒あたりの値は Prometheus の rate() で求める。"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        累計値を増やす。
+        Args:
+            amount (float): 増分（0以上）
+            **labels: ラベル
+        """
+        if not self.registry.enabled:
+            return
+        if amount < 0:
+            raise ValueError(f"カウンター {self.name} は減らせません: {amount}")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry._emit(self.kind, self.name, self.labelnames, key, amount)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """任意に増減する現在値（キャッシュのヒット率・コレクションのレコード数など）。"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """
+        現在値を設定する。
+        Args:
+            value (float): 設定する値
+            **labels: ラベル
+        """
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+        self.registry._emit(self.kind, self.name, self.labelnames, key, float(value))
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """観測値（所要時間など）の分布。バケットごとの累積件数・合計・件数を保持する。"""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        if not self.buckets:
+            raise ValueError(f"ヒストグラム {name} のバケットが空です。")
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        観測値を記録する。
+        Args:
+            value (float): 観測値（所要時間は秒）
+            **labels: ラベル
+        """
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [バケットごとの件数..., +Inf の件数], 合計
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            state[1] += value
+        self.registry._emit(self.kind, self.name, self.labelnames, key, value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        with ブロックの所要時間（秒）を記録する。ブロックで例外が発生した場合も記録する。
+        Args:
+            **labels: ラベル
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels) -> Dict:
+        """
+        指定したラベルの件数・合計・平均を返す（Streamlit・スクリプトでの表示用）。
+        Returns:
+            Dict: {"count", "sum", "mean"}（記録が無い場合はすべて 0）
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                return {"count": 0, "sum": 0.0, "mean": 0.0}
+            count = sum(state[0])
+            return {"count": count, "sum": state[1], "mean": state[1] / count if count else 0.0}
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative))
+                samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+                samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    メトリクスとシンク・コレクターを管理するレジストリ。
+    コレクターは出力（render_prometheus() / snapshot()）の直前に呼び出され、
+    キャッシュのヒット率・コレクションのレコード数のように都度計算するゲージを更新する。
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        MetricsRegistryの初期化。
+        Args:
+            enabled (bool): False の場合は記録を行わない（計測のオーバーヘッドを無くす）
+        """
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._sinks: List[MetricsSink] = []
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        """
+        カウンターを登録する（同名で登録済みの場合は既存のものを返す）。
+        Returns:
+            Counter: カウンター
+        """
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        """
+        ゲージを登録する（同名で登録済みの場合は既存のものを返す）。
+        Returns:
+            Gauge: ゲージ
+        """
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        """
+        ヒストグラムを登録する（同名で登録済みの場合は既存のものを返す）。
+        Returns:
+            Histogram: ヒストグラム
+        """
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        """
+        記録の出力先を追加する。
+        Args:
+            sink (MetricsSink): 出力先
+        """
+        with self._lock:
+            self._sinks = self._sinks + [sink]
+
+    def remove_sink(self, sink: MetricsSink) -> None:
+        """
+        記録の出力先を取り除き、閉じる。
+        Args:
+            sink (MetricsSink): add_sink() で追加した出力先
+        """
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+        sink.close()
+
+    def clear_sinks(self) -> None:
+        """すべての出力先を取り除き、閉じる。"""
+        with self._lock:
+            sinks, self._sinks = self._sinks, []
+        for sink in sinks:
+            sink.close()
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        出力の直前に呼び出す関数を追加する（同じ関数の重複登録は無視する）。
+        Args:
+            collector (Callable[[], None]): ゲージを更新する関数
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors = self._collectors + [collector]
+
+    def remove_collector(self, collector: Callable[[], None]) -> None:
+        """
+        add_collector() で追加した関数を取り除く。
+        Args:
+            collector (Callable[[], None]): 取り除く関数
+        """
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c != collector]
+
+    def collect(self) -> None:
+        """コレクターを呼び出してゲージを更新する（失敗したコレクターは無視し、他のメトリクスは出力する）。"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+
+    def render_prometheus(self) -> str:
+        """
+        すべてのメトリクスを Prometheus のテキスト形式（version 0.0.4）で返す。
+        Returns:
+            str: /metrics のレスポンス本文
+        """
+        self.collect()
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric._samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """
+        すべてのメトリクスの現在値を辞書で返す（Streamlit・スクリプトでの表示用）。
+        Returns:
+            Dict: メトリクス名 → {"type", "samples": [{"name", "labels", "value"}]}
+        """
+        self.collect()
+        return {
+            metric.name: {
+                "type": metric.kind,
+                "samples": [{"name": name, "labels": labels, "value": value} for name, labels, value in metric._samples()]
+            }
+            for metric in sorted(self._metrics.values(), key=lambda m: m.name)
+        }
+
+    def reset(self) -> None:
+        """記録済みの値をすべて消去する（メトリクスの登録は残す）。"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def _register(self, metric_class: type, name: str, documentation: str, labelnames: Tuple[str, ...], **kwargs):
+        """メトリクスを登録する（同名・同種で登録済みの場合は既存のものを返す）。内部メソッド。"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(self, name, documentation, tuple(labelnames), **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"メトリクス {name} は別の種類・ラベルで登録済みです。")
+            return metric
+
+    def _emit(self, kind: str, name: str, labelnames: Tuple[str, ...], key: Tuple[str, ...], value: float) -> None:
+        """記録をシンクへ送る（シンクの例外は計測対象の処理に影響させない）。内部メソッド。"""
+        sinks = self._sinks
+        if not sinks:
+            return
+        labels = dict(zip(labelnames, key))
+        for sink in sinks:
+            try:
+                sink.record(kind, name, labels, value)
+            except Exception:
+                pass
+
+
+# プロセス全体で共有するレジストリ
+METRICS = MetricsRegistry()
+
+# ===================== 計測するメトリクス =====================
+
+EMBED_SECONDS = METRICS.histogram(
+    "rag_embed_seconds", "埋め込みバックエンドの1回の呼び出しの所要時間（秒）", ("backend", "model"))
+EMBED_TEXTS = METRICS.counter(
+    "rag_embed_texts_total", "埋め込みバックエンドでベクトル化したテキスト数", ("backend", "model"))
+EMBED_TOKENS = METRICS.counter(
+    "rag_embed_tokens_total", "埋め込みバックエンドでベクトル化したテキストの推定トークン数", ("backend", "model"))
+EMBED_ERRORS = METRICS.counter(
+    "rag_embed_errors_total", "埋め込みバックエンドの呼び出しの失敗回数", ("backend", "model"))
+CHROMA_SECONDS = METRICS.histogram(
+    "rag_chroma_seconds", "ChromaDB のコレクション操作の所要時間（秒）", ("operation",))
+SEARCH_SECONDS = METRICS.histogram(
+    "rag_search_seconds", "検索（キャッシュ参照・埋め込み・ChromaDB 検索・整形）全体の所要時間（秒）", ("mode",))
+SEARCH_QUERIES = METRICS.counter(
+    "rag_search_queries_total", "検索したクエリ数（cache はキャッシュの利用状況）", ("mode", "cache"))
+INGEST_SECONDS = METRICS.histogram(
+    "rag_ingest_seconds", "登録の段階ごとの所要時間（秒）", ("stage",))
+INGEST_FILES = METRICS.counter(
+    "rag_ingest_files_total", "登録したファイル数（unchanged は内容が同じため書き込まなかったファイル）", ("status",))
+INGEST_CHUNKS = METRICS.counter(
+    "rag_ingest_chunks_total", "登録時にベクトル化して書き込んだチャンク数")
+INGEST_TOKENS = METRICS.counter(
+    "rag_ingest_tokens_total", "登録時にベクトル化して書き込んだチャンクの推定トークン数")
+INGEST_THROUGHPUT = METRICS.gauge(
+    "rag_ingest_throughput", "直近の登録（vectorize_and_register / パイプライン）の1秒あたりの処理量", ("unit",))
+HTTP_SECONDS = METRICS.histogram(
+    "rag_http_request_seconds", "API のリクエストの処理時間（レスポンスのシリアライズを含む、秒）",
+    ("method", "route", "status"))
+CACHE_HIT_RATE = METRICS.gauge(
+    "rag_cache_hit_rate", "キャッシュのヒット率（プロセス起動後の累計）", ("cache",))
+CACHE_REQUESTS = METRICS.gauge(
+    "rag_cache_requests", "キャッシュの参照回数（プロセス起動後の累計）", ("cache", "result"))
+CACHE_SIZE = METRICS.gauge(
+    "rag_cache_size", "キャッシュの保持件数", ("cache",))
+COLLECTION_RECORDS = METRICS.gauge(
+    "rag_collection_records", "ChromaDB コレクションのレコード（チャンク）数")
+COLLECTION_VERSION = METRICS.gauge(
+    "rag_collection_version", "コレクションのバージョン（登録・削除・メタデータ更新で増える）")
+
+
+class InstrumentedCollection:
+    """
+    ChromaDB のコレクションをラップし、操作ごとの所要時間を rag_chroma_seconds に記録するクラス。
+    計測対象以外の属性（name・metadata・modify() など）はラップ対象のコレクションをそのまま参照する。
+    """
+
+    # 所要時間を記録する操作
+    OPERATIONS = ("query", "get", "add", "upsert", "update", "delete", "count")
+
+    def __init__(self, collection):
+        """
+        InstrumentedCollectionの初期化。
+        Args:
+            collection: chromadb のコレクション
+        """
+        self.collection = collection
+
+    def __getattr__(self, name: str):
+        if name == "collection":
+            raise AttributeError(name)
+        attr = getattr(self.collection, name)
+        if name not in self.OPERATIONS:
+            return attr
+
+        def timed(*args, **kwargs):
+            with CHROMA_SECONDS.time(operation=name):
+                return attr(*args, **kwargs)
+        return timed
+
+
+def record_ingest_throughput(chunks: int, tokens: int, files: int, elapsed: float) -> None:
+    """
+    1回の登録（vectorize_and_register / パイプライン）の1秒あたりの処理量を rag_ingest_throughput に記録する。
+    Args:
+        chunks (int): ベクトル化して書き込んだチャンク数
+        tokens (int): そのチャンクの推定トークン数
+        files (int): 登録したファイル数
+        elapsed (float): 登録全体の所要時間（秒）
+    """
+    if elapsed <= 0 or not chunks:
+        return
+    INGEST_THROUGHPUT.set(chunks / elapsed, unit="chunks_per_second")
+    INGEST_THROUGHPUT.set(tokens / elapsed, unit="tokens_per_second")
+    INGEST_THROUGHPUT.set(files / elapsed, unit="files_per_second")
+
+
+def create_sink(sink_config: Dict) -> MetricsSink:
+    """
+    config.yaml の metrics.sinks の1要素からシンクを作成する。
+    Args:
+        sink_config (Dict): {"type": "jsonl", "path": 出力先, "flush_every": 書き出し間隔}
+    Returns:
+        MetricsSink: 作成したシンク
+    Raises:
+        ValueError: 不正な type が指定された場合
+    """
+    sink_type = (sink_config or {}).get('type')
+    if sink_type == "jsonl":
+        path = sink_config.get('path')
+        if not path:
+            raise ValueError("metrics.sinks の jsonl には path を指定してください。")
+        return JsonLinesSink(path, flush_every=int(sink_config.get('flush_every', 100)))
+    raise ValueError(f"不正な metrics.sinks の type: {sink_type}。'jsonl' を指定してください。")
+
+
+def configure_metrics(config: dict) -> MetricsRegistry:
+    """
+    config.yaml の metrics セクションから共有レジストリ（METRICS）を設定する。
+    設定済みのシンクは閉じて作り直すため、設定の再読み込み時に呼び出してもよい。
+    Args:
+        config (dict): 設定値辞書（metrics.enabled, metrics.sinks を参照）
+    Returns:
+        MetricsRegistry: 設定した METRICS
+    Raises:
+        ValueError: 不正なシンクの設定の場合
+    """
+    metrics_config = (config or {}).get('metrics', {}) or {}
+    sinks = [create_sink(sink_config) for sink_config in metrics_config.get('sinks') or []]
+    METRICS.enabled = bool(metrics_config.get('enabled', True))
+    METRICS.clear_sinks()
+    for sink in sinks:
+        METRICS.add_sink(sink)
+    return METRICS
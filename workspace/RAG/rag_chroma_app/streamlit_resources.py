@@ -0,0 +1,173 @@
+"""
+Streamlit の各ページで共有するリソースとキャッシュ。
+Embedder（モデル）・RAGService（ChromaDB クライアント）などは st.cache_resource でプロセスに1つだけ作成し、
+ページの再実行・ページ間で再利用する。
+ファイル一覧・検索結果は st.cache_data にコレクションのバージョンをキーとして保持するため、
+登録・削除・メタデータ更新（API サーバーからの変更を含む）があるまでコレクションを読み直さない。
+"""
+
+import threading
+from typing import Dict
+
+import streamlit as st
+
+from app import config
+from services.RAG.chunker import create_chunker
+from services.RAG.collection_factory import create_collection_settings
+from services.RAG.lexical_index import create_lexical_index, hybrid_search_options
+from services.RAG.rag_service import RAGService
+from services.RAG.reranker import create_reranker
+from services.RAG.search_cache import create_search_cache
+from services.RAG.semantic_cache import create_semantic_cache
+from services.Vector.registry import create_embedder
+from services.metrics import METRICS, configure_metrics
+
+
+@st.cache_resource
+def get_metrics():
+    """
+    config の metrics セクションに従ってメトリクス（出力先のシンクを含む）をプロセスで1回だけ設定する。
+    Streamlit は /metrics を公開しないため、計測値は metrics.sinks に指定した出力先へ書き出す。
+    Returns:
+        MetricsRegistry: 設定済みの共有レジストリ
+    """
+    return configure_metrics(config)
+
+
+@st.cache_resource(show_spinner="埋め込みモデルを読み込んでいます...")
+def get_embedder():
+    """
+    config で指定された Embedder を作成する（ローカルモデルの読み込みはプロセスで1回のみ）。
+    Returns:
+        BaseEmbedder: Embedder
+    """
+    get_metrics()
+    return create_embedder(config)
+
+
+@st.cache_resource
+def get_lexical_index():
+    """
+    BM25 語彙インデックスを作成する。
+    Streamlit の再実行をまたいで同じ SQLite 接続を使用するため st.cache_resource で保持する。
+    Returns:
+        LexicalIndex: 語彙インデックス（config で無効な場合は None）
+    """
+    return create_lexical_index(config)
+
+
+@st.cache_resource
+def get_search_cache():
+    """
+    検索結果キャッシュを作成する。
+    Returns:
+        SearchResultCache: 検索結果キャッシュ（config で無効な場合は None）
+    """
+    return create_search_cache(config)
+
+
+@st.cache_resource
+def get_semantic_cache():
+    """
+    セマンティッククエリキャッシュを作成する。
+    Returns:
+        SemanticQueryCache: セマンティッククエリキャッシュ（config で無効な場合は None）
+    """
+    return create_semantic_cache(config)
+
+
+@st.cache_resource
+def get_reranker():
+    """
+    CrossEncoder 再ランキングクラスを作成する（モデルは初回の再ランキング時に読み込む）。
+    Returns:
+        CrossEncoderReranker: 再ランキングクラス（config で無効な場合は None）
+    """
+    return create_reranker(config)
+
+
+@st.cache_resource
+def get_rag_service():
+    """
+    全ページ・登録ジョブのワーカーで共有する RAGService を作成する。
+    Returns:
+        RAGService: config で指定された Embedder・キャッシュ・語彙インデックスを使用する RAGService
+    """
+    rag_service = RAGService(
+        embedder=get_embedder(),
+        chroma_persist_directory=config['chroma']['persist_directory'],
+        chunker=create_chunker(config),
+        search_cache=get_search_cache(),
+        semantic_cache=get_semantic_cache(),
+        lexical_index=get_lexical_index(),
+        reranker=get_reranker(),
+        collection_settings=create_collection_settings(config),
+        **hybrid_search_options(config)
+    )
+    # スナップショット・シンクの出力時にキャッシュのヒット率・コレクションのレコード数を反映する
+    METRICS.add_collector(rag_service.collect_metrics)
+    return rag_service
+
+
+def collection_version() -> int:
+    """
+    コレクションのバージョンを返す（登録・削除・メタデータ更新のたびに増える）。
+    Returns:
+        int: バージョン
+    """
+    return get_rag_service().version.current()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def list_files(version: int, offset: int, limit: int, directory: str = None, sort_order: str = "desc") -> Dict:
+    """
+    登録済みファイル一覧をページ単位で取得する（同じバージョン・条件の結果は再取得しない）。
+    Args:
+        version (int): collection_version() の値（キャッシュのキー）
+        offset (int): 先頭からの読み飛ばし件数
+        limit (int): 取得件数
+        directory (str, optional): 指定した場合はこのディレクトリのファイルのみ返す
+        sort_order (str): 登録日時の並び順（"desc" / "asc"）
+    Returns:
+        Dict: RAGService.list_files() の戻り値
+    """
+    return get_rag_service().list_files(offset=offset, limit=limit, directory=directory, sort_order=sort_order)
+
+
+# 今回の search() の呼び出しで検索を実行したか（st.cache_data から返した場合は False のまま）
+_search_state = threading.local()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_search(version: int, query: str, n_results: int, threshold: float, mode: str, rerank: bool) -> Dict:
+    """
+    検索を実行する（同じバージョン・条件の結果は再検索しない）。内部関数。
+    Returns:
+        Dict: RAGService.search_with_info() の戻り値（cache は初回の検索時の状態）
+    """
+    info = get_rag_service().search_with_info(query, n_results=n_results, threshold=threshold, mode=mode,
+                                              rerank=rerank)
+    _search_state.executed = True
+    return info
+
+
+def search(version: int, query: str, n_results: int, threshold: float, mode: str, rerank: bool) -> Dict:
+    """
+    検索を実行する（同じバージョン・条件の結果は再検索しない）。
+    st.cache_data から返した場合は検索を行っていないため、cache を "exact"（rerank・similarity は None）とし、
+    初回の検索時の状態を表示し続けないようにする。
+    Args:
+        version (int): collection_version() の値（キャッシュのキー）
+        query (str): 検索クエリ
+        n_results (int): 返却する最大件数
+        threshold (float): スコア閾値
+        mode (str): 検索方式（"vector" / "lexical" / "hybrid"）
+        rerank (bool): CrossEncoder で再ランキングするか
+    Returns:
+        Dict: RAGService.search_with_info() の戻り値
+    """
+    _search_state.executed = False
+    info = _cached_search(version, query, n_results, threshold, mode, rerank)
+    if not _search_state.executed:
+        info = {**info, "cache": "exact", "similarity": None, "rerank": None}
+    return info
@@ -0,0 +1,9 @@
+"""
+pytest の共通設定。
+アプリと同じく rag_chroma_app を import パスに追加し、services・utils を直接 import できるようにする。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+"""
+EmbeddingBatcher と関連関数（services/Vector/batching.py）のテスト。
+"""
+
+import threading
+
+import pytest
+import requests
+
+from services.Vector.batching import EmbeddingBatcher, create_batcher, estimate_tokens, is_retryable, order_by_index
+
+
+def _http_error(status, headers=None):
+    """指定したステータスのレスポンスを持つ requests.HTTPError を作成する。"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(response=response)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("検索拡張") == 4
+    assert estimate_tokens("RAG検索") == 3
+
+
+def test_order_by_index():
+    data = [{"index": 2, "embedding": [2.0]}, {"index": 0, "embedding": [0.0]}, {"index": 1, "embedding": [1.0]}]
+    assert order_by_index(data) == [[0.0], [1.0], [2.0]]
+
+
+def test_split_by_batch_size():
+    batcher = EmbeddingBatcher(max_batch_size=2)
+    assert batcher.split(["a", "b", "c", "d", "e"]) == [[0, 1], [2, 3], [4]]
+
+
+def test_split_by_token_budget_keeps_oversized_text_alone():
+    batcher = EmbeddingBatcher(max_batch_size=10, max_batch_tokens=4)
+    # "検索拡張生成" は 6 トークンのため単独のサブバッチになる
+    assert batcher.split(["ab", "cd", "検索拡張生成", "ef"]) == [[0, 1], [2], [3]]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_run_returns_results_in_input_order(concurrency):
+    batcher = EmbeddingBatcher(max_batch_size=2, max_concurrency=concurrency)
+    texts = [f"t{i}" for i in range(7)]
+    assert batcher.run(texts, lambda batch: [[float(t[1:])] for t in batch]) == [[float(i)] for i in range(7)]
+    assert batcher.run([], lambda batch: pytest.fail("空の入力では呼び出さない")) == []
+
+
+def test_run_rejects_mismatched_output_length():
+    batcher = EmbeddingBatcher(max_batch_size=4)
+    with pytest.raises(ValueError):
+        batcher.run(["a", "b"], lambda batch: [[0.0]])
+
+
+def test_retryable_errors_are_retried_per_batch():
+    batcher = EmbeddingBatcher(max_batch_size=1, max_concurrency=1, max_retries=2, retry_backoff=0)
+    attempts = {}
+    lock = threading.Lock()
+
+    def embed(batch):
+        with lock:
+            attempts[batch[0]] = attempts.get(batch[0], 0) + 1
+            count = attempts[batch[0]]
+        if batch[0] == "b" and count < 3:
+            raise _http_error(503)
+        return [[1.0]]
+
+    assert batcher.run(["a", "b"], embed) == [[1.0], [1.0]]
+    assert attempts == {"a": 1, "b": 3}
+
+
+def test_non_retryable_error_is_raised_immediately():
+    batcher = EmbeddingBatcher(max_retries=3, retry_backoff=0)
+    calls = []
+
+    def embed(batch):
+        calls.append(batch)
+        raise _http_error(400)
+
+    with pytest.raises(requests.HTTPError):
+        batcher.run(["a"], embed)
+    assert len(calls) == 1
+
+
+def test_is_retryable():
+    assert is_retryable(requests.exceptions.ConnectionError())
+    assert is_retryable(requests.exceptions.Timeout())
+    assert is_retryable(_http_error(429))
+    assert not is_retryable(_http_error(404))
+    assert not is_retryable(ValueError())
+
+
+def test_retry_delay_prefers_retry_after_header():
+    batcher = EmbeddingBatcher(retry_backoff=0.5)
+    assert batcher._retry_delay(_http_error(429, {"Retry-After": "7"}), 0) == 7.0
+    assert batcher._retry_delay(_http_error(503), 2) == 2.0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_batch_size": 0},
+    {"max_batch_tokens": 0},
+    {"max_concurrency": 0},
+    {"max_retries": -1},
+])
+def test_invalid_parameters_raise_value_error(kwargs):
+    with pytest.raises(ValueError):
+        EmbeddingBatcher(**kwargs)
+
+
+def test_create_batcher_reads_section():
+    batcher = create_batcher({"batch_size": "16", "concurrency": 2, "max_retries": 0}, default_batch_size=32)
+    assert (batcher.max_batch_size, batcher.max_concurrency, batcher.max_retries) == (16, 2, 0)
+    assert create_batcher(None, default_batch_size=32).max_batch_size == 32
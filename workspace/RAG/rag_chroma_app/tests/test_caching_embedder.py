@@ -0,0 +1,97 @@
+"""
+埋め込みキャッシュ（services/Vector/caching_embedder.py）のテスト。
+"""
+
+import numpy as np
+import pytest
+
+from services.Vector.base_embedder import BaseEmbedder
+from services.Vector.caching_embedder import CachingEmbedder, wrap_with_cache
+
+
+class CountingEmbedder(BaseEmbedder):
+    """テキストの長さをベクトルにし、ベクトル化したテキストを記録する Embedder。"""
+
+    def __init__(self, model="m"):
+        self.model = model
+        self.calls = []
+
+    @property
+    def model_id(self):
+        return f"counting:{self.model}"
+
+    def embed(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FallbackEmbedder(CountingEmbedder):
+    """最初のベクトル化で識別子が確定する Embedder（Ollama のエンドポイント判定に相当）。"""
+
+    def __init__(self):
+        super().__init__("embed")
+
+    def embed(self, texts):
+        self.model = "embeddings"
+        return super().embed(texts)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.sqlite3")
+
+
+def test_repeated_texts_are_embedded_once(cache_path):
+    backend = CountingEmbedder()
+    cache = CachingEmbedder(backend, cache_path)
+    assert cache.embed(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert cache.embed(["bb"]) == [[2.0, 1.0]]
+    assert backend.calls == ["a", "bb"]
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"]) == (2, 1)
+    cache.close()
+
+
+def test_vectors_are_shared_through_sqlite(cache_path):
+    first = CachingEmbedder(CountingEmbedder(), cache_path)
+    first.embed(["abc"])
+    first.close()
+    backend = CountingEmbedder()
+    second = CachingEmbedder(backend, cache_path, memory_items=0)
+    assert second.embed(["abc"]) == [[3.0, 1.0]]
+    assert backend.calls == []
+    assert second.stats()["disk_hits"] == 1
+    second.close()
+
+
+def test_cache_is_keyed_by_model_id(cache_path):
+    CachingEmbedder(CountingEmbedder("m1"), cache_path).embed(["abc"])
+    backend = CountingEmbedder("m2")
+    CachingEmbedder(backend, cache_path).embed(["abc"])
+    assert backend.calls == ["abc"]
+
+
+def test_normalize_does_not_change_cached_vectors(cache_path):
+    cache = CachingEmbedder(CountingEmbedder(), cache_path)
+    normalized = cache.embed_array(["abc"], normalize=True)
+    assert np.linalg.norm(normalized[0]) == pytest.approx(1.0)
+    assert cache.embed(["abc"]) == [[3.0, 1.0]]
+
+
+def test_vectors_are_stored_under_model_id_resolved_during_embedding(cache_path):
+    cache = CachingEmbedder(FallbackEmbedder(), cache_path)
+    cache.embed(["abc"])
+    backend = CountingEmbedder("embeddings")
+    CachingEmbedder(backend, cache_path).embed(["abc"])
+    assert backend.calls == []
+    other = CountingEmbedder("embed")
+    CachingEmbedder(other, cache_path).embed(["abc"])
+    assert other.calls == ["abc"]
+
+
+def test_wrap_with_cache(cache_path):
+    backend = CountingEmbedder()
+    assert wrap_with_cache(backend, {}) is backend
+    wrapped = wrap_with_cache(backend, {"embedding_cache": {"enabled": True, "path": cache_path}})
+    assert isinstance(wrapped, CachingEmbedder)
+    assert wrapped.model_id == backend.model_id
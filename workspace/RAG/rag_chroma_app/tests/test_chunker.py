@@ -0,0 +1,93 @@
+"""
+TextChunker（services/RAG/chunker.py）のテスト。
+"""
+
+import pytest
+
+from services.RAG.chunker import TextChunker, create_chunker
+
+
+def _assert_positions(text, chunks):
+    """各チャンクの text が start_char / end_char の位置の部分文字列と一致し、chunk_index が連番であること。"""
+    for i, chunk in enumerate(chunks):
+        assert chunk["chunk_index"] == i
+        assert text[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+
+
+@pytest.mark.parametrize("strategy", TextChunker.STRATEGIES)
+def test_empty_text_returns_one_chunk(strategy):
+    chunks = TextChunker(strategy=strategy, chunk_size=10, chunk_overlap=0).chunk("")
+    assert chunks == [{"text": "", "chunk_index": 0, "start_char": 0, "end_char": 0}]
+
+
+def test_none_strategy_keeps_whole_text():
+    text = "a" * 5000
+    chunks = TextChunker(strategy="none", chunk_size=10, chunk_overlap=0).chunk(text)
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == text
+
+
+def test_paragraph_strategy_merges_short_paragraphs():
+    text = "第一段落。\n\n第二段落。\n\n第三段落。"
+    chunks = TextChunker(strategy="paragraph", chunk_size=800, chunk_overlap=0).chunk(text)
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == text
+
+
+def test_paragraph_strategy_respects_chunk_size():
+    paragraphs = [f"段落{i}の本文です。" * 3 for i in range(10)]
+    text = "\n\n".join(paragraphs)
+    chunks = TextChunker(strategy="paragraph", chunk_size=60, chunk_overlap=0).chunk(text)
+    assert len(chunks) > 1
+    assert all(len(chunk["text"]) <= 60 for chunk in chunks)
+    _assert_positions(text, chunks)
+
+
+def test_oversized_sentence_is_split_into_char_windows():
+    text = "あ" * 250
+    chunks = TextChunker(strategy="sentence", chunk_size=100, chunk_overlap=20).chunk(text)
+    assert [(c["start_char"], c["end_char"]) for c in chunks] == [(0, 100), (80, 180), (160, 250)]
+
+
+def test_sentence_strategy_overlaps_previous_sentence():
+    text = "一文目です。二文目です。三文目です。"
+    chunks = TextChunker(strategy="sentence", chunk_size=12, chunk_overlap=6).chunk(text)
+    _assert_positions(text, chunks)
+    assert [c["text"] for c in chunks] == ["一文目です。二文目です。", "二文目です。三文目です。"]
+
+
+def test_sentence_strategy_splits_english_sentences():
+    text = "First sentence. Second sentence. Third one."
+    chunks = TextChunker(strategy="sentence", chunk_size=20, chunk_overlap=0).chunk(text)
+    _assert_positions(text, chunks)
+    assert [c["text"] for c in chunks] == ["First sentence.", "Second sentence.", "Third one."]
+
+
+def test_token_strategy_windows_and_overlap():
+    text = " ".join(f"w{i}" for i in range(10))
+    chunks = TextChunker(strategy="token", chunk_size=4, chunk_overlap=1).chunk(text)
+    _assert_positions(text, chunks)
+    assert [c["text"] for c in chunks] == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+
+
+def test_token_strategy_counts_cjk_characters_individually():
+    chunks = TextChunker(strategy="token", chunk_size=2, chunk_overlap=0).chunk("検索拡張")
+    assert [c["text"] for c in chunks] == ["検索", "拡張"]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"strategy": "unknown"},
+    {"chunk_size": 0},
+    {"chunk_size": 10, "chunk_overlap": 10},
+    {"chunk_overlap": -1},
+])
+def test_invalid_parameters_raise_value_error(kwargs):
+    with pytest.raises(ValueError):
+        TextChunker(**kwargs)
+
+
+def test_create_chunker_reads_config_section():
+    chunker = create_chunker({"chunking": {"strategy": "token", "chunk_size": "32", "chunk_overlap": "4"}})
+    assert (chunker.strategy, chunker.chunk_size, chunker.chunk_overlap) == ("token", 32, 4)
+    default = create_chunker({})
+    assert (default.strategy, default.chunk_size, default.chunk_overlap) == ("paragraph", 800, 100)
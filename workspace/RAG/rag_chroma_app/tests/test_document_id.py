@@ -0,0 +1,32 @@
+"""
+ドキュメントID・コンテンツハッシュ（services/RAG/document_id.py）のテスト。
+"""
+
+import hashlib
+
+from services.RAG.document_id import content_hash, make_doc_id
+
+
+def test_make_doc_id_is_deterministic():
+    assert make_doc_id("資料/設計書.txt", 3) == make_doc_id("資料/設計書.txt", 3)
+
+
+def test_make_doc_id_format():
+    expected_key = hashlib.sha256("a.txt".encode("utf-8")).hexdigest()[:16]
+    assert make_doc_id("a.txt") == f"{expected_key}_00000"
+    assert make_doc_id("a.txt", 12) == f"{expected_key}_00012"
+
+
+def test_make_doc_id_distinguishes_files_and_chunks():
+    ids = {make_doc_id(filename, index) for filename in ("a.txt", "b.txt", "A.txt") for index in range(3)}
+    assert len(ids) == 9
+
+
+def test_doc_ids_sort_by_chunk_index():
+    ids = [make_doc_id("a.txt", index) for index in (10, 2, 1, 100)]
+    assert sorted(ids) == [make_doc_id("a.txt", index) for index in (1, 2, 10, 100)]
+
+
+def test_content_hash():
+    assert content_hash("本文") == hashlib.sha256("本文".encode("utf-8")).hexdigest()
+    assert content_hash("本文") != content_hash("本文 ")
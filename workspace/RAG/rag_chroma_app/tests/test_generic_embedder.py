@@ -0,0 +1,104 @@
+"""
+GenericEmbedder（services/Vector/generic_embedder.py）の Ollama エンドポイント判定のテスト。
+HTTP 通信はセッションの post を差し替えて行わない。
+"""
+
+import pytest
+
+from services.Vector.generic_embedder import GenericEmbedder
+
+OLLAMA_URL = "http://localhost:11434/api/embeddings"
+
+
+class FakeResponse:
+    """requests.Response の代わりに使用する最小限のレスポンス。"""
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        if isinstance(self.body, (dict, list)):
+            return self.body
+        raise ValueError("not json")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+def _embedder_with(handler, **kwargs):
+    """post を handler(url, json) に差し替えた GenericEmbedder を作成する。"""
+    embedder = GenericEmbedder("", OLLAMA_URL, "nomic-embed-text", **kwargs)
+    calls = []
+
+    def post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        return handler(url, json)
+
+    embedder.session.post = post
+    return embedder, calls
+
+
+@pytest.mark.parametrize("status, body, expected", [
+    (405, None, True),
+    (404, "404 page not found", True),
+    (404, {"error": "not found"}, True),
+    (404, {"error": 'model "nomic-embed-text" not found, try pulling it first'}, False),
+    (404, ["unexpected"], True),
+    (500, {"error": "internal"}, False),
+    (200, {"embeddings": []}, False),
+])
+def test_endpoint_missing(status, body, expected):
+    assert GenericEmbedder._endpoint_missing(FakeResponse(status, body)) is expected
+
+
+def test_model_id_does_not_send_requests():
+    embedder, calls = _embedder_with(lambda url, data: pytest.fail("model_id で通信してはならない"))
+    assert embedder.model_id == f"generic:{OLLAMA_URL}:nomic-embed-text:embed"
+    assert calls == []
+
+
+def test_model_id_without_batch_endpoint():
+    embedder = GenericEmbedder("", OLLAMA_URL, "nomic-embed-text", use_batch_endpoint=False)
+    assert embedder.model_id == f"generic:{OLLAMA_URL}:nomic-embed-text"
+
+
+def test_model_id_for_openai_compatible_endpoint():
+    embedder = GenericEmbedder("key", "https://openrouter.ai/api/v1/embeddings", "m")
+    assert embedder.model_id == "generic:https://openrouter.ai/api/v1/embeddings:m"
+
+
+def test_batch_endpoint_is_used_when_available():
+    def handler(url, data):
+        assert url.endswith("/api/embed")
+        return FakeResponse(200, {"embeddings": [[float(len(text))] for text in data["input"]]})
+
+    embedder, calls = _embedder_with(handler)
+    assert embedder.embed(["a", "bb"]) == [[1.0], [2.0]]
+    assert embedder.model_id.endswith(":embed")
+
+
+def test_falls_back_to_single_endpoint_and_rekeys_model_id():
+    def handler(url, data):
+        if url.endswith("/api/embed"):
+            return FakeResponse(404, "404 page not found")
+        return FakeResponse(200, {"embedding": [float(len(data["prompt"]))]})
+
+    embedder, calls = _embedder_with(handler)
+    assert embedder.embed(["a", "bb"]) == [[1.0], [2.0]]
+    assert embedder.model_id == f"generic:{OLLAMA_URL}:nomic-embed-text"
+    # 判定は1回のみ行い、以降は /api/embeddings のみを使用する
+    embedder.embed(["ccc"])
+    assert sum(1 for url in calls if url.endswith("/api/embed")) == 1
+
+
+def test_missing_model_is_reported_as_http_error():
+    def handler(url, data):
+        return FakeResponse(404, {"error": 'model "nomic-embed-text" not found'})
+
+    embedder, _ = _embedder_with(handler)
+    with pytest.raises(RuntimeError):
+        embedder.embed(["a"])
+    # エンドポイントの不在とは判定しない
+    assert embedder.model_id.endswith(":embed")
@@ -0,0 +1,139 @@
+"""
+登録ジョブキュー（services/Ingest/job_store.py）と登録ワーカー（services/Ingest/worker.py）のテスト。
+"""
+
+import os
+
+import pytest
+
+from services.Ingest.job_store import JobStore
+from services.Ingest.worker import IngestWorkerPool
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "spool"))
+    yield job_store
+    job_store.close()
+
+
+def test_submit_writes_spool_files_and_queues_job(store):
+    job_id = store.submit(["本文A", "本文B"], ["a.txt", "b.txt"])
+    job = store.get(job_id, include_files=True)
+    assert (job["status"], job["total_files"], job["processed_files"]) == ("queued", 2, 0)
+    assert [f["filename"] for f in job["files"]] == ["a.txt", "b.txt"]
+    files = store.pending_files(job_id)
+    with open(files[1]["spool_path"], encoding="utf-8") as f:
+        assert f.read() == "本文B"
+
+
+def test_submit_validates_arguments(store):
+    with pytest.raises(ValueError):
+        store.submit(["a"], ["a.txt", "b.txt"])
+    with pytest.raises(ValueError):
+        store.submit([], [])
+
+
+def test_claim_takes_oldest_job_once(store):
+    first = store.submit(["a"], ["a.txt"])
+    second = store.submit(["b"], ["b.txt"])
+    claimed = store.claim("w1")
+    assert claimed["job_id"] == first
+    assert (claimed["status"], claimed["worker_id"]) == ("running", "w1")
+    assert store.claim("w2")["job_id"] == second
+    assert store.claim("w3") is None
+
+
+def test_update_progress_requires_owner(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    store.claim("w1")
+    assert store.update_progress(job_id, "w1", current_file="a.txt", chunks_to_embed=3, chunks_embedded=2)
+    assert not store.update_progress(job_id, "w2")
+    job = store.get(job_id)
+    assert (job["current_file"], job["chunks_to_embed"], job["chunks_embedded"]) == ("a.txt", 3, 2)
+
+
+def test_finish_files_and_job(store):
+    job_id = store.submit(["a", "b"], ["a.txt", "b.txt"])
+    store.claim("w1")
+    store.finish_files(job_id, [{"seq": 0, "status": "succeeded", "chunks": 2, "embedded": 2},
+                                {"seq": 1, "status": "failed", "error": "boom"}])
+    store.finish_job(job_id, "failed", error="1 件失敗", summary={"chunks": 2})
+    job = store.get(job_id, include_files=True)
+    assert (job["status"], job["processed_files"], job["failed_files"], job["chunks"]) == ("failed", 2, 1, 2)
+    assert job["summary"] == {"chunks": 2}
+    assert job["files"][1]["error"] == "boom"
+    assert store.pending_files(job_id) == []
+    assert not os.path.exists(os.path.join(store.spool_directory, job_id))
+
+
+def test_finish_job_rejects_unknown_status(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    with pytest.raises(ValueError):
+        store.finish_job(job_id, "running")
+
+
+def test_cancel_queued_job_finishes_immediately(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    job = store.cancel(job_id)
+    assert (job["status"], job["cancel_requested"]) == ("canceled", True)
+    assert store.claim("w1") is None
+    assert store.cancel("missing") is None
+
+
+def test_cancel_running_job_requests_stop(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    store.claim("w1")
+    job = store.cancel(job_id)
+    assert (job["status"], job["cancel_requested"]) == ("running", True)
+    # ワーカーは次の進捗更新で中断する
+    assert not store.update_progress(job_id, "w1")
+
+
+def test_requeue_stale_running_jobs(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    canceled_id = store.submit(["b"], ["b.txt"])
+    store.claim("w1")
+    store.claim("w2")
+    store.cancel(canceled_id)
+    assert store.requeue_stale(lease_seconds=3600) == 0
+    assert store.requeue_stale(lease_seconds=-1) == 1
+    assert store.get(job_id)["status"] == "queued"
+    assert store.get(job_id)["worker_id"] is None
+    assert store.get(canceled_id)["status"] == "canceled"
+
+
+def test_list_jobs_filters_by_status(store):
+    ids = [store.submit(["a"], [f"{i}.txt"]) for i in range(3)]
+    store.cancel(ids[0])
+    assert {job["job_id"] for job in store.list_jobs(status="queued")} == set(ids[1:])
+    assert len(store.list_jobs(limit=2)) == 2
+
+
+class _FailingService:
+    """登録時に例外を送出する RAGService の代替。"""
+
+    chunker = None
+
+    def plan_registration(self, texts, filenames):
+        raise RuntimeError("chroma unavailable")
+
+
+def test_worker_marks_claimed_job_failed_when_processing_raises(store):
+    job_id = store.submit(["a"], ["a.txt"])
+
+    def provider():
+        raise RuntimeError("service unavailable")
+
+    job = IngestWorkerPool(store, provider, workers=0).run_once("w1")
+    assert job["job_id"] == job_id
+    assert job["status"] == "failed"
+    assert "service unavailable" in job["error"]
+
+
+def test_worker_reports_pipeline_errors_per_file(store):
+    job_id = store.submit(["a"], ["a.txt"])
+    job = IngestWorkerPool(store, _FailingService, workers=0).run_once("w1")
+    assert (job["status"], job["processed_files"], job["failed_files"]) == ("failed", 1, 1)
+    files = store.get(job_id, include_files=True)["files"]
+    assert (files[0]["status"], files[0]["error"]) == ("failed", "chroma unavailable")
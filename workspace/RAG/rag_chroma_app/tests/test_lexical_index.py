@@ -0,0 +1,107 @@
+"""
+BM25 語彙インデックス（services/RAG/lexical_index.py）と hybrid 検索の RRF 統合のテスト。
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from services.RAG.lexical_index import LexicalIndex, create_lexical_index, hybrid_search_options, tokenize
+from services.RAG.rag_service import RAGService
+
+
+@pytest.fixture
+def index(tmp_path):
+    lexical_index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    yield lexical_index
+    lexical_index.close()
+
+
+def test_tokenize_words_are_lowercased_and_nfkc_normalized():
+    assert tokenize("Hello ＷＯＲＬＤ, e-mail v1.2 don't") == ["hello", "world", "e-mail", "v1.2", "don't"]
+
+
+def test_tokenize_cjk_runs_into_bigrams():
+    assert tokenize("検索拡張") == ["検索", "索拡", "拡張"]
+    assert tokenize("RAGの検索") == ["rag", "の検", "検索"]
+    assert tokenize("犬") == ["犬"]
+    assert tokenize("。、！") == []
+
+
+def test_search_ranks_by_bm25(index):
+    index.add_documents(
+        ["d1", "d2", "d3"],
+        ["ベクトル検索の概要", "語彙検索と検索エンジン 検索", "料理のレシピ"],
+        ["a.txt", "b.txt", "c.txt"]
+    )
+    ranked = index.search("検索", n_results=10)
+    assert [doc_id for doc_id, _ in ranked] == ["d2", "d1"]
+    assert ranked[0][1] > ranked[1][1] > 0
+    assert index.search("存在しない語", n_results=10) == []
+    assert index.search("", n_results=10) == []
+
+
+def test_search_limits_results(index):
+    index.add_documents([f"d{i}" for i in range(5)], ["apple"] * 5, ["a.txt"] * 5)
+    assert len(index.search("apple", n_results=2)) == 2
+
+
+def test_add_documents_replaces_existing_id(index):
+    index.add_documents(["d1"], ["apple"], ["a.txt"])
+    index.add_documents(["d1"], ["banana"], ["a.txt"])
+    assert index.count() == 1
+    assert index.search("apple") == []
+    assert [doc_id for doc_id, _ in index.search("banana")] == ["d1"]
+
+
+def test_delete_ids_and_filenames(index):
+    index.add_documents(["a0", "a1", "b0"], ["apple", "apple", "apple"], ["a.txt", "a.txt", "b.txt"])
+    index.delete_ids(["b0"])
+    assert {doc_id for doc_id, _ in index.search("apple")} == {"a0", "a1"}
+    index.delete_filenames(["a.txt"])
+    assert index.count() == 0
+
+
+def test_index_is_persisted(tmp_path):
+    path = str(tmp_path / "lexical.sqlite3")
+    first = LexicalIndex(path)
+    first.add_documents(["d1"], ["persisted text"], ["a.txt"])
+    first.close()
+    second = LexicalIndex(path)
+    assert [doc_id for doc_id, _ in second.search("persisted")] == ["d1"]
+    second.close()
+
+
+def test_create_lexical_index_and_hybrid_options(tmp_path):
+    assert create_lexical_index({}) is None
+    lexical_index = create_lexical_index({"lexical_index": {"enabled": True, "path": str(tmp_path / "i.sqlite3"),
+                                                            "k1": 1.2}})
+    assert lexical_index.k1 == 1.2
+    lexical_index.close()
+    assert hybrid_search_options({}) == {"rrf_k": 60, "candidate_multiplier": 4}
+    assert hybrid_search_options({"lexical_index": {"rrf_k": "10"}})["rrf_k"] == 10
+
+
+def _hit(filename, score, chunk_index=0):
+    return {"filename": filename, "chunk_index": chunk_index, "score": score, "document": filename}
+
+
+def test_reciprocal_rank_fusion():
+    service = SimpleNamespace(rrf_k=60)
+    vector = [_hit("a", 0.9), _hit("b", 0.8), _hit("c", 0.7)]
+    lexical = [_hit("b", 12.0), _hit("d", 8.0)]
+    fused = RAGService._fuse_rankings(service, vector, lexical, n_results=10)
+
+    assert [r["filename"] for r in fused] == ["b", "a", "d", "c"]
+    by_name = {r["filename"]: r for r in fused}
+    assert by_name["b"]["score"] == round(1 / 62 + 1 / 61, 6)
+    assert (by_name["b"]["vector_score"], by_name["b"]["lexical_score"]) == (0.8, 12.0)
+    assert (by_name["c"]["vector_score"], by_name["c"]["lexical_score"]) == (0.7, None)
+    assert (by_name["d"]["vector_score"], by_name["d"]["lexical_score"]) == (None, 8.0)
+    assert len(RAGService._fuse_rankings(service, vector, lexical, n_results=2)) == 2
+
+
+def test_reciprocal_rank_fusion_distinguishes_chunks():
+    service = SimpleNamespace(rrf_k=60)
+    fused = RAGService._fuse_rankings(service, [_hit("a", 0.9, 0)], [_hit("a", 5.0, 1)], n_results=10)
+    assert len(fused) == 2
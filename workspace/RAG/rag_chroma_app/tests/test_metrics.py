@@ -0,0 +1,151 @@
+"""
+メトリクス（services/metrics.py）の記録・Prometheus 形式の出力・シンクのテスト。
+共有レジストリ（METRICS）を汚さないよう、原則としてテストごとに MetricsRegistry を作成する。
+"""
+
+import json
+
+import pytest
+
+from services.metrics import (CHROMA_SECONDS, InstrumentedCollection, JsonLinesSink, MetricsRegistry, MetricsSink,
+                              create_sink)
+
+
+class ListSink(MetricsSink):
+    """記録をリストに保持するシンク。"""
+
+    def __init__(self):
+        self.records = []
+        self.closed = False
+
+    def record(self, kind, name, labels, value):
+        self.records.append((kind, name, labels, value))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_render_counter_and_gauge(registry):
+    counter = registry.counter("rag_test_total", "テスト用カウンター", ("mode",))
+    gauge = registry.gauge("rag_test_gauge", "テスト用ゲージ")
+    counter.inc(mode="vector")
+    counter.inc(2, mode="vector")
+    counter.inc(mode='hy"brid')
+    gauge.set(0.25)
+    assert registry.render_prometheus() == (
+        "# HELP rag_test_gauge テスト用ゲージ\n"
+        "# TYPE rag_test_gauge gauge\n"
+        "rag_test_gauge 0.25\n"
+        "# HELP rag_test_total テスト用カウンター\n"
+        "# TYPE rag_test_total counter\n"
+        'rag_test_total{mode="hy\\"brid"} 1\n'
+        'rag_test_total{mode="vector"} 3\n'
+    )
+
+
+def test_render_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram("rag_test_seconds", "テスト用ヒストグラム", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="plan")
+    lines = registry.render_prometheus().splitlines()
+    assert lines[2:] == [
+        'rag_test_seconds_bucket{stage="plan",le="0.1"} 1',
+        'rag_test_seconds_bucket{stage="plan",le="1"} 3',
+        'rag_test_seconds_bucket{stage="plan",le="+Inf"} 4',
+        'rag_test_seconds_sum{stage="plan"} 4.25',
+        'rag_test_seconds_count{stage="plan"} 4',
+    ]
+    assert histogram.summary(stage="plan") == {"count": 4, "sum": 4.25, "mean": 1.0625}
+    assert histogram.summary(stage="write") == {"count": 0, "sum": 0.0, "mean": 0.0}
+
+
+def test_histogram_time_records_even_on_error(registry):
+    histogram = registry.histogram("rag_test_seconds", "テスト用ヒストグラム")
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError("boom")
+    assert histogram.summary()["count"] == 1
+
+
+def test_label_and_value_validation(registry):
+    counter = registry.counter("rag_test_total", "テスト用カウンター", ("mode",))
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, mode="vector")
+    with pytest.raises(ValueError):
+        registry.gauge("rag_test_total", "同名の別種類")
+    assert registry.counter("rag_test_total", "再登録", ("mode",)) is counter
+
+
+def test_disabled_registry_records_nothing(registry):
+    counter = registry.counter("rag_test_total", "テスト用カウンター")
+    registry.enabled = False
+    counter.inc()
+    assert registry.snapshot()["rag_test_total"]["samples"] == []
+
+
+def test_collectors_run_before_output_and_failures_are_ignored(registry):
+    gauge = registry.gauge("rag_test_gauge", "テスト用ゲージ")
+
+    def failing():
+        raise RuntimeError("collector failed")
+
+    registry.add_collector(failing)
+    registry.add_collector(lambda: gauge.set(7))
+    assert "rag_test_gauge 7" in registry.render_prometheus()
+    registry.remove_collector(failing)
+    assert registry.snapshot()["rag_test_gauge"]["samples"] == [{"name": "rag_test_gauge", "labels": "", "value": 7.0}]
+
+
+def test_sinks_receive_records_and_are_closed(registry):
+    sink = ListSink()
+    registry.add_sink(sink)
+    registry.counter("rag_test_total", "テスト用カウンター", ("mode",)).inc(mode="vector")
+    assert sink.records == [("counter", "rag_test_total", {"mode": "vector"}, 1)]
+    registry.clear_sinks()
+    assert sink.closed
+
+
+def test_metrics_sink_is_abstract():
+    with pytest.raises(TypeError):
+        MetricsSink()
+
+
+def test_json_lines_sink(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    sink = create_sink({"type": "jsonl", "path": str(path), "flush_every": 1})
+    assert isinstance(sink, JsonLinesSink)
+    sink.record("gauge", "rag_test_gauge", {"cache": "search"}, 0.5)
+    sink.close()
+    sink.record("gauge", "rag_test_gauge", {}, 1.0)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert (record["kind"], record["name"], record["labels"], record["value"]) == (
+        "gauge", "rag_test_gauge", {"cache": "search"}, 0.5)
+
+
+@pytest.mark.parametrize("sink_config", [{"type": "statsd"}, {"type": "jsonl"}, None])
+def test_create_sink_rejects_invalid_config(sink_config):
+    with pytest.raises(ValueError):
+        create_sink(sink_config)
+
+
+def test_instrumented_collection_times_operations():
+    class Collection:
+        name = "rag_collection"
+
+        def count(self):
+            return 3
+
+    before = CHROMA_SECONDS.summary(operation="count")["count"]
+    collection = InstrumentedCollection(Collection())
+    assert collection.count() == 3
+    assert collection.name == "rag_collection"
+    assert CHROMA_SECONDS.summary(operation="count")["count"] == before + 1
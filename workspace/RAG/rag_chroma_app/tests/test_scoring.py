@@ -0,0 +1,95 @@
+"""
+距離→類似度の変換（services/RAG/scoring.py）とコレクション設定（services/RAG/collection_factory.py）のテスト。
+コレクションは chromadb を使わず、必要な属性・メソッドのみを持つ代替オブジェクトで確認する。
+"""
+
+import numpy as np
+import pytest
+
+from services.RAG.collection_factory import (create_collection_settings, current_hnsw_metadata,
+                                             _update_search_params)
+from services.RAG.scoring import distance_to_similarity, normalize_vectors
+
+
+@pytest.mark.parametrize("distance, space, normalized, expected", [
+    (0.0, "l2", False, 1.0),
+    (1.0, "l2", False, 0.5),
+    (0.5, "l2", True, 0.75),
+    (4.0, "l2", True, 0.0),
+    (0.2, "cosine", False, 0.8),
+    (0.2, "ip", True, 0.8),
+    (1.5, "cosine", False, 0.0),
+    (-0.1, "ip", False, 1.0),
+])
+def test_distance_to_similarity(distance, space, normalized, expected):
+    assert distance_to_similarity(distance, space, normalized) == pytest.approx(expected)
+
+
+def test_distance_to_similarity_rejects_unknown_space():
+    with pytest.raises(ValueError):
+        distance_to_similarity(0.1, "manhattan")
+
+
+def test_normalize_vectors():
+    normalized = normalize_vectors([[3.0, 4.0], [0.0, 0.0]])
+    assert normalized.dtype == np.float32
+    assert normalized.tolist() == [pytest.approx([0.6, 0.8]), [0.0, 0.0]]
+
+
+def test_create_collection_settings():
+    settings = create_collection_settings({"chroma": {"space": "cosine", "normalize": True,
+                                                      "hnsw": {"search_ef": "80", "M": 32}}})
+    assert settings == {
+        "space": "cosine",
+        "normalize": True,
+        "metadata": {"hnsw:space": "cosine", "hnsw:search_ef": 80, "hnsw:M": 32}
+    }
+    assert create_collection_settings({})["metadata"] == {"hnsw:space": "l2"}
+
+
+@pytest.mark.parametrize("chroma", [
+    {"space": "dot"},
+    {"hnsw": {"ef": 10}},
+    {"hnsw": {"search_ef": 0}},
+])
+def test_create_collection_settings_rejects_invalid_values(chroma):
+    with pytest.raises(ValueError):
+        create_collection_settings({"chroma": chroma})
+
+
+class FakeCollection:
+    """metadata・configuration・modify() を持つコレクションの代替。"""
+
+    def __init__(self, metadata, configuration=None, accepts_configuration=True):
+        self.metadata = metadata
+        self.configuration = configuration
+        self.accepts_configuration = accepts_configuration
+        self.modified = []
+
+    def modify(self, metadata=None, configuration=None):
+        if configuration is not None and not self.accepts_configuration:
+            raise TypeError("unexpected keyword argument 'configuration'")
+        self.modified.append({"metadata": metadata, "configuration": configuration})
+
+
+def test_current_hnsw_metadata_prefers_configuration():
+    collection = FakeCollection({"hnsw:space": "l2", "hnsw:search_ef": 50},
+                                {"hnsw": {"space": "cosine", "ef_search": 80, "max_neighbors": None}})
+    assert current_hnsw_metadata(collection) == {"hnsw:space": "cosine", "hnsw:search_ef": 80}
+
+
+def test_current_hnsw_metadata_without_configuration():
+    assert current_hnsw_metadata(FakeCollection({"hnsw:space": "ip"})) == {"hnsw:space": "ip"}
+    assert current_hnsw_metadata(FakeCollection(None)) == {}
+
+
+def test_update_search_params_uses_configuration():
+    collection = FakeCollection({"hnsw:space": "l2"})
+    _update_search_params(collection, {"hnsw:search_ef": 80})
+    assert collection.modified == [{"metadata": None, "configuration": {"hnsw": {"ef_search": 80}}}]
+
+
+def test_update_search_params_falls_back_to_full_metadata():
+    collection = FakeCollection({"hnsw:space": "l2", "hnsw:search_ef": 50}, accepts_configuration=False)
+    _update_search_params(collection, {"hnsw:search_ef": 80})
+    assert collection.modified == [{"metadata": {"hnsw:space": "l2", "hnsw:search_ef": 80}, "configuration": None}]
@@ -0,0 +1,85 @@
+"""
+検索結果キャッシュ（services/RAG/search_cache.py）とコレクションバージョン（services/RAG/collection_version.py）のテスト。
+"""
+
+import pytest
+
+from services.RAG import search_cache as search_cache_module
+from services.RAG.collection_version import CollectionVersion
+from services.RAG.search_cache import SearchResultCache, create_search_cache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  ＲＡＧ　の\t検索  ") == "RAG の 検索"
+    # 大文字・小文字は区別する
+    assert normalize_query("RAG") != normalize_query("rag")
+
+
+def test_make_key_normalizes_query_and_threshold():
+    key = SearchResultCache.make_key(" 検索 ", 5, 0.30000000001, "model", "hybrid")
+    assert key == ("検索", 5, 0.3, "model", "hybrid")
+    assert key != SearchResultCache.make_key("検索", 5, 0.3, "other-model", "hybrid")
+    assert key != SearchResultCache.make_key("検索", 5, 0.3, "model", "vector")
+
+
+def test_get_returns_copy_and_counts_hits():
+    cache = SearchResultCache()
+    key = SearchResultCache.make_key("q", 5, 0.0, "m")
+    assert cache.get(key, version=1) is None
+    cache.put(key, 1, [{"filename": "a.txt", "score": 0.9}])
+    results = cache.get(key, version=1)
+    results[0]["score"] = 0.0
+    assert cache.get(key, version=1) == [{"filename": "a.txt", "score": 0.9}]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entry_is_invalidated_by_newer_version():
+    cache = SearchResultCache()
+    cache.put("k", 1, [])
+    assert cache.get("k", version=2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "monotonic", lambda: now[0])
+    cache = SearchResultCache(ttl_seconds=10)
+    cache.put("k", 1, [])
+    now[0] += 5
+    assert cache.get("k", version=1) == []
+    now[0] += 6
+    assert cache.get("k", version=1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchResultCache(max_entries=2)
+    cache.put("a", 1, [])
+    cache.put("b", 1, [])
+    cache.get("a", version=1)
+    cache.put("c", 1, [])
+    assert cache.get("b", version=1) is None
+    assert cache.get("a", version=1) == []
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalid_max_entries():
+    with pytest.raises(ValueError):
+        SearchResultCache(max_entries=0)
+
+
+def test_create_search_cache():
+    assert create_search_cache({}) is None
+    cache = create_search_cache({"search_cache": {"enabled": True, "max_entries": 8, "ttl_seconds": 0}})
+    assert (cache.max_entries, cache.ttl_seconds) == (8, 0.0)
+
+
+def test_collection_version_is_shared_through_file(tmp_path):
+    writer = CollectionVersion(str(tmp_path))
+    reader = CollectionVersion(str(tmp_path))
+    assert reader.current() == 0
+    assert writer.bump() == 1
+    assert writer.bump() == 2
+    assert reader.current() == 2
+    assert CollectionVersion(str(tmp_path), "other").current() == 0
@@ -0,0 +1,83 @@
+"""
+セマンティッククエリキャッシュ（services/RAG/semantic_cache.py）のテスト。
+"""
+
+import pytest
+
+from services.RAG import semantic_cache as semantic_cache_module
+from services.RAG.semantic_cache import SemanticQueryCache, create_semantic_cache
+
+PARAMS = (5, 0.3, "model", None)
+
+
+def test_similar_query_reuses_results():
+    cache = SemanticQueryCache(similarity_threshold=0.95)
+    cache.add([1.0, 0.0], PARAMS, 1, [{"filename": "a.txt"}])
+    results, similarity = cache.lookup([10.0, 0.5], PARAMS, 1)
+    assert results == [{"filename": "a.txt"}]
+    assert 0.95 <= similarity <= 1.0
+
+
+def test_dissimilar_query_misses():
+    cache = SemanticQueryCache(similarity_threshold=0.95)
+    cache.add([1.0, 0.0], PARAMS, 1, [])
+    assert cache.lookup([0.0, 1.0], PARAMS, 1) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_params_and_version_must_match():
+    cache = SemanticQueryCache()
+    cache.add([1.0, 0.0], PARAMS, 1, [])
+    assert cache.lookup([1.0, 0.0], (10, 0.3, "model", None), 1) is None
+    assert cache.lookup([1.0, 0.0], PARAMS, 2) is None
+
+
+def test_best_matching_entry_with_same_params_is_returned():
+    cache = SemanticQueryCache(similarity_threshold=0.9)
+    cache.add([1.0, 0.0], ("other",), 1, ["other"])
+    cache.add([1.0, 0.1], PARAMS, 1, ["near"])
+    cache.add([1.0, 0.3], PARAMS, 1, ["far"])
+    assert cache.lookup([1.0, 0.0], PARAMS, 1)[0] == ["near"]
+
+
+def test_oldest_entry_is_overwritten():
+    cache = SemanticQueryCache(max_entries=2)
+    cache.add([1.0, 0.0, 0.0], PARAMS, 1, ["x"])
+    cache.add([0.0, 1.0, 0.0], PARAMS, 1, ["y"])
+    cache.add([0.0, 0.0, 1.0], PARAMS, 1, ["z"])
+    assert cache.lookup([1.0, 0.0, 0.0], PARAMS, 1) is None
+    assert cache.lookup([0.0, 0.0, 1.0], PARAMS, 1)[0] == ["z"]
+    assert cache.stats()["size"] == 2
+
+
+def test_dimension_change_resets_entries():
+    cache = SemanticQueryCache()
+    cache.add([1.0, 0.0], PARAMS, 1, ["2d"])
+    cache.add([1.0, 0.0, 0.0], PARAMS, 1, ["3d"])
+    assert cache.lookup([1.0, 0.0], PARAMS, 1) is None
+    assert cache.stats()["size"] == 1
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(semantic_cache_module.time, "monotonic", lambda: now[0])
+    cache = SemanticQueryCache(ttl_seconds=10)
+    cache.add([1.0, 0.0], PARAMS, 1, [])
+    now[0] += 11
+    assert cache.lookup([1.0, 0.0], PARAMS, 1) is None
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"similarity_threshold": 0.0},
+    {"similarity_threshold": 1.5},
+    {"max_entries": 0},
+])
+def test_invalid_parameters_raise_value_error(kwargs):
+    with pytest.raises(ValueError):
+        SemanticQueryCache(**kwargs)
+
+
+def test_create_semantic_cache():
+    assert create_semantic_cache({"semantic_cache": {"enabled": False}}) is None
+    cache = create_semantic_cache({"semantic_cache": {"enabled": True, "similarity_threshold": 0.9}})
+    assert cache.similarity_threshold == 0.9
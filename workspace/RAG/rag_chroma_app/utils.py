@@ -1,18 +1,340 @@
-
 """
 PDFファイルからテキスト抽出を行うユーティリティ関数群。
+PDF はページ単位で順に抽出し（ページ数が多い場合はプロセスプールでページ範囲ごとに並列抽出）、
+抽出結果をファイル内容のハッシュをキーとしてキャッシュする。抽出に失敗したページはエラーとして報告する。
 """
 
+import codecs
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
 from PyPDF2 import PdfReader
 
-def extract_text_from_pdf(file) -> str:
+# 登録できるファイルの拡張子
+SUPPORTED_EXTENSIONS = (".txt", ".pdf")
+
+# ファイル内容のハッシュ計算・コピーで読み込む単位（バイト）
+_READ_CHUNK = 1024 * 1024
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+
+class PdfTextCache:
+    """
+    PDF の抽出結果をファイル内容の SHA-256 ハッシュをキーとしてディスクに保存するキャッシュ。
+    同じ内容の PDF の再アップロードではテキスト抽出を省略する。全ページの抽出に成功した場合のみ保存する。
+    """
+
+    def __init__(self, directory: str):
+        """
+        PdfTextCacheの初期化。
+        Args:
+            directory (str): キャッシュの保存先ディレクトリ
+        Raises:
+            ValueError: directory が未指定の場合
+        """
+        if not directory:
+            raise ValueError("PDF テキストキャッシュのディレクトリ（pdf.cache_directory）が未指定である。")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        """
+        キャッシュファイルのパスを返す。
+        Args:
+            digest (str): PDF の内容のハッシュ
+        Returns:
+            str: キャッシュファイル（1行1ページの JSON Lines）のパス
+        """
+        return os.path.join(self.directory, digest[:2], f"{digest}.jsonl")
+
+    def read(self, digest: str) -> Optional[Iterator[Dict]]:
+        """
+        キャッシュ済みのページを順に返す。
+        Args:
+            digest (str): PDF の内容のハッシュ
+        Returns:
+            Optional[Iterator[Dict]]: {"page", "text", "error"} のイテレータ（キャッシュが無い場合は None）
+        """
+        path = self.path(digest)
+        if not os.path.exists(path):
+            return None
+
+        def pages():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+        return pages()
+
+    def writer(self, digest: str) -> "_CacheWriter":
+        """
+        ページを1件ずつ書き込むライターを返す（commit() で確定するまでキャッシュとして読み込まれない）。
+        Args:
+            digest (str): PDF の内容のハッシュ
+        Returns:
+            _CacheWriter: キャッシュライター
+        """
+        return _CacheWriter(self.path(digest))
+
+
+class _CacheWriter:
+    """PdfTextCache に一時ファイル経由でページを書き込むライター。内部クラス。"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+
+    def write(self, page: Dict) -> None:
+        self._file.write(json.dumps(page, ensure_ascii=False) + "\n")
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    PDF 抽出用のプロセスプールを取得する（初回呼び出し時、またはプロセス数が変わった場合に生成）。
+    API サーバー・Streamlit・登録ワーカーはスレッドと SQLite/ChromaDB の接続を保持しているため、
+    fork ではなく spawn で子プロセスを起動する。
+    プロセス数が変わった場合、旧プールは停止せず（投入中の他スレッドの抽出を中断しないため）、
+    参照が無くなった時点で解放される。
+    Args:
+        workers (int): プロセス数
+    Returns:
+        ProcessPoolExecutor: プロセスプール
+    """
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _process_pool_workers = workers
+        return _process_pool
+
+
+def _extract_page(reader: PdfReader, index: int) -> Dict:
+    """1ページのテキストを抽出する（失敗した場合は error にエラー内容を入れる）。内部関数。"""
+    try:
+        return {"page": index + 1, "text": reader.pages[index].extract_text() or '', "error": None}
+    except Exception as e:
+        return {"page": index + 1, "text": '', "error": f"{type(e).__name__}: {e}"}
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[Dict]:
+    """
+    PDF の指定したページ範囲のテキストを抽出する（プロセスプールで実行する）。内部関数。
+    Args:
+        path (str): PDF ファイルのパス
+        start (int): 開始ページ（0始まり）
+        end (int): 終了ページ（このページを含まない）
+    Returns:
+        List[Dict]: {"page", "text", "error"} のリスト
+    """
+    reader = PdfReader(path)
+    return [_extract_page(reader, i) for i in range(start, end)]
+
+
+def _file_digest(file) -> str:
+    """ファイル（パスまたはファイルオブジェクト）の内容の SHA-256 ハッシュを返す。内部関数。"""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for data in iter(lambda: f.read(_READ_CHUNK), b""):
+                digest.update(data)
+    else:
+        position = file.tell()
+        for data in iter(lambda: file.read(_READ_CHUNK), b""):
+            digest.update(data)
+        file.seek(position)
+    return digest.hexdigest()
+
+
+def iter_pdf_pages(file, workers: int = 0, pages_per_task: int = 8, parallel_min_pages: int = 16,
+                   cache: PdfTextCache = None) -> Iterator[Dict]:
+    """
+    PDFファイルのテキストをページ単位で順に抽出する。
+    ページ数が parallel_min_pages 以上で workers が2以上の場合は、pages_per_task ページずつプロセスプールで並列に抽出し、
+    ページ順に返す（同時に処理するページ範囲は workers の2倍までとし、メモリ使用量を抑える）。
+    Args:
+        file: PDF ファイルのパス、またはファイルオブジェクト（Streamlitのアップロードファイルなど）
+        workers (int): 並列抽出のプロセス数（0・1 の場合は呼び出し元のスレッドで抽出する）
+        pages_per_task (int): 1タスクで抽出するページ数
+        parallel_min_pages (int): 並列抽出を行う最小ページ数
+        cache (PdfTextCache, optional): 抽出結果のキャッシュ（指定時はファイル内容のハッシュで参照・保存する）
+    Returns:
+        Iterator[Dict]: 各ページの {"page"（1始まり）, "text", "error"（成功時は None）}
+    Raises:
+        ValueError: PDF として読み込めない場合
+    """
+    digest = None
+    if cache is not None:
+        digest = _file_digest(file)
+        cached = cache.read(digest)
+        if cached is not None:
+            yield from cached
+            return
+
+    try:
+        reader = PdfReader(file)
+        page_count = len(reader.pages)
+    except Exception as e:
+        raise ValueError(f"PDF の読み込みに失敗しました: {e}")
+
+    writer = cache.writer(digest) if cache is not None else None
+    failed = False
+    try:
+        if workers > 1 and page_count >= parallel_min_pages:
+            pages = _iter_pages_parallel(file, page_count, workers, max(1, pages_per_task))
+        else:
+            pages = (_extract_page(reader, i) for i in range(page_count))
+        for page in pages:
+            failed = failed or page["error"] is not None
+            if writer is not None:
+                writer.write(page)
+            yield page
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if writer is not None:
+            # 一部のページの抽出に失敗した場合は次回も抽出し直すため保存しない
+            if failed:
+                writer.discard()
+            else:
+                writer.commit()
+
+
+def _iter_pages_parallel(file, page_count: int, workers: int, pages_per_task: int) -> Iterator[Dict]:
+    """
+    ページ範囲ごとにプロセスプールで抽出し、ページ順に返す。内部関数。
+    ファイルオブジェクトの場合は子プロセスから読み込めるよう一時ファイルにコピーする。
+    """
+    tmp_path = None
+    if isinstance(file, (str, os.PathLike)):
+        path = file
+    else:
+        file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(file, tmp, _READ_CHUNK)
+            tmp_path = tmp.name
+        path = tmp_path
+    try:
+        pool = _get_process_pool(workers)
+        ranges = deque((start, min(start + pages_per_task, page_count))
+                       for start in range(0, page_count, pages_per_task))
+        in_flight = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append((start, end, pool.submit(_extract_page_range, path, start, end)))
+            start, end, future = in_flight.popleft()
+            try:
+                yield from future.result()
+            except Exception as e:
+                # 子プロセスの異常終了などでページ範囲全体が失敗した場合も、ページごとのエラーとして返す
+                for i in range(start, end):
+                    yield {"page": i + 1, "text": '', "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if tmp_path is not None:
+            os.remove(tmp_path)
+
+
+def extract_text_from_pdf(file, page_errors: List[Dict] = None, **options) -> str:
     """
     PDFファイルからテキストを抽出する関数。
     Args:
         file: Streamlitのアップロードファイルまたはファイルオブジェクト
+        page_errors (List[Dict], optional): 抽出に失敗したページの {"page", "error"} を追加するリスト
+        **options: iter_pdf_pages() に渡すオプション（workers, pages_per_task, parallel_min_pages, cache）
     Returns:
         str: 抽出されたテキスト全文
     """
-    reader = PdfReader(file)
-    text = "\n".join([page.extract_text() or '' for page in reader.pages])
-    return text
+    texts = []
+    for page in iter_pdf_pages(file, **options):
+        if page["error"] is not None and page_errors is not None:
+            page_errors.append({"page": page["page"], "error": page["error"]})
+        texts.append(page["text"])
+    return "\n".join(texts)
+
+
+def extract_text_to_file(file, filename: str, dest_path: str, chunk_size: int = _READ_CHUNK, **pdf_options) -> Dict:
+    """
+    アップロードファイルからテキストを抽出し、UTF-8 のテキストファイルに少しずつ書き出す。
+    テキストファイルは chunk_size バイトずつ、PDF はページ単位で書き出すため、ファイル全体のテキストをメモリに保持しない。
+    Args:
+        file: ファイルオブジェクト（バイナリ読み込み）
+        filename (str): 元のファイル名（拡張子で形式を判定する）
+        dest_path (str): 書き出し先のパス
+        chunk_size (int): テキストファイルを読み込む単位（バイト）
+        **pdf_options: iter_pdf_pages() に渡すオプション（workers, pages_per_task, parallel_min_pages, cache）
+    Returns:
+        Dict: {"chars"（書き出した文字数）, "page_errors"（抽出に失敗したページの {"page", "error"} のリスト）}
+    Raises:
+        ValueError: 対応していない拡張子の場合、または PDF として読み込めない場合
+        UnicodeDecodeError: テキストファイルが UTF-8 でない場合
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"対応していないファイル形式です: {filename}（{', '.join(SUPPORTED_EXTENSIONS)} のみ登録可能）")
+    written = 0
+    page_errors = []
+    with open(dest_path, "w", encoding="utf-8") as out:
+        if extension == ".txt":
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            while True:
+                data = file.read(chunk_size)
+                text = decoder.decode(data or b"", final=not data)
+                out.write(text)
+                written += len(text)
+                if not data:
+                    break
+        else:
+            for i, page in enumerate(iter_pdf_pages(file, **pdf_options)):
+                if page["error"] is not None:
+                    page_errors.append({"page": page["page"], "error": page["error"]})
+                if i > 0:
+                    out.write("\n")
+                    written += 1
+                out.write(page["text"])
+                written += len(page["text"])
+    return {"chars": written, "page_errors": page_errors}
+
+
+def pdf_extraction_options(config: dict) -> Dict:
+    """
+    config.yaml の pdf セクションから iter_pdf_pages() のオプションを作成する。
+    Args:
+        config (dict): 設定値辞書
+    Returns:
+        Dict: {"workers", "pages_per_task", "parallel_min_pages", "cache"}（キャッシュ無効時は cache が None）
+    Raises:
+        ValueError: 不正なパラメータが指定された場合
+    """
+    pdf_config = (config or {}).get('pdf', {}) or {}
+    workers = int(pdf_config.get('workers', 0))
+    if workers < 0:
+        raise ValueError(f"pdf.workers は0以上である必要があります: {workers}")
+    cache_directory = pdf_config.get('cache_directory')
+    return {
+        "workers": workers,
+        "pages_per_task": int(pdf_config.get('pages_per_task', 8)),
+        "parallel_min_pages": int(pdf_config.get('parallel_min_pages', 16)),
+        "cache": PdfTextCache(cache_directory) if pdf_config.get('cache_enabled', True) and cache_directory else None
+    }